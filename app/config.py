@@ -1,20 +1,183 @@
+"""
+Configuración de ID-Reader a partir de variables de entorno
+
+Importar este módulo no tiene efectos: los valores se leen de las variables de entorno
+la primera vez que se consulta alguno (p. ej. con from app.config import OUTPUT_DIR).
+Los puntos de entrada llaman antes a load() para aplicar el archivo .env, y a
+ensure_directories() cuando van a leer imágenes y escribir resultados.
+"""
 import os
-from dotenv import load_dotenv
 
-# Cargar variables de entorno desde .env
-load_dotenv()
+# Valores resueltos (None hasta la primera consulta)
+_values = None
+
+def load(dotenv_path=None):
+    """
+    Aplica el archivo .env a las variables de entorno (sin sustituir las ya definidas)
+
+    Los módulos que se importen después verán los valores del archivo.
+
+    Args:
+        dotenv_path (str, optional): Ruta del archivo. Por defecto se busca .env
+                                     desde el directorio actual hacia arriba
+    """
+    global _values
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path)
+    _values = None
+
+def ensure_directories():
+    """Crea INPUT_DIR y OUTPUT_DIR si no existen"""
+    os.makedirs(__getattr__('INPUT_DIR'), exist_ok=True)
+    os.makedirs(__getattr__('OUTPUT_DIR'), exist_ok=True)
+
+def _resolve():
+    """
+    Lee todos los valores de configuración de las variables de entorno
+
+    Returns:
+        dict: Valores por nombre
+    """
+    # Directorios - Configuración ajustada a tus carpetas existentes
+    INPUT_DIR = os.getenv('INPUT_DIR', 'input_images')
+    OUTPUT_DIR = os.getenv('OUTPUT_DIR', 'OUTPUT')
+
+    # Resto del código de configuración permanece igual...
+    TESSERACT_CMD = os.getenv('TESSERACT_CMD', '')
+    TESSERACT_LANG = os.getenv('TESSERACT_LANG', 'spa')
+    VALID_EXTENSIONS = {'jpg', 'jpeg', 'png', 'tif', 'tiff'}
+    OCR_CONFIG = f'--psm 3 --oem 3 -l {TESSERACT_LANG}'
+    MIN_CONFIDENCE = int(os.getenv('MIN_CONFIDENCE', 60))
+
+    # Motor OCR: 'tesserocr' mantiene Tesseract cargado en cada proceso, 'pytesseract'
+    # lanza un proceso por llamada y 'auto' usa tesserocr si está instalado
+    OCR_BACKEND = os.getenv('OCR_BACKEND', 'auto')
+
+    # OCR agrupado: en los lotes, cada pasada de la escalera se ejecuta a la vez para hasta
+    # OCR_BATCH_SIZE imágenes, con un solo proceso tesseract por configuración (1 = desactivado)
+    OCR_BATCH_SIZE = int(os.getenv('OCR_BATCH_SIZE', 1))
+
+    # Pasadas concurrentes: al procesar una sola imagen, hasta OCR_CONCURRENCY peldaños de
+    # la escalera se ejecutan a la vez como procesos tesseract (1 = uno tras otro)
+    OCR_CONCURRENCY = int(os.getenv('OCR_CONCURRENCY', 1))
+
+    # Modo de memoria acotada: decodificar en escala de grises (el color no se usa para el OCR),
+    # limitar el lado mayor de la foto cuando no se detecta la cédula, no guardar la foto
+    # original tras recortarla y no crear la copia anotada de depuración
+    LOW_MEMORY = os.getenv('LOW_MEMORY', '0') == '1'
+    LOW_MEMORY_MAX_SIDE = int(os.getenv('LOW_MEMORY_MAX_SIDE', 2000))
+
+    # Artefactos de depuración: 'none' (producción, solo resultados), 'text' (textos OCR)
+    # o 'full' (textos e imágenes intermedias). Se escriben en segundo plano con una cola acotada
+    ARTIFACT_LEVEL = os.getenv('ARTIFACT_LEVEL', 'full')
+    ARTIFACT_QUEUE_SIZE = int(os.getenv('ARTIFACT_QUEUE_SIZE', 4 if LOW_MEMORY else 32))
+
+    # Informe por imagen del pico de memoria (tracemalloc y RSS del proceso)
+    MEMORY_REPORT = os.getenv('MEMORY_REPORT', '0') == '1'
+
+    # Métricas por etapa (tiempo de pared y CPU, llamadas a Tesseract, bytes escritos y
+    # estrategia ganadora) exportadas como JSON lines por imagen y textfile de Prometheus
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '0') == '1'
+    METRICS_JSONL_PATH = os.getenv('METRICS_JSONL_PATH', os.path.join(OUTPUT_DIR, 'metrics.jsonl'))
+    METRICS_PROM_PATH = os.getenv('METRICS_PROM_PATH', os.path.join(OUTPUT_DIR, 'metrics.prom'))
+
+    # Procesamiento por lotes: número de procesos trabajadores (0 = todos los núcleos)
+    WORKERS = int(os.getenv('WORKERS', 1))
+
+    # Formato del archivo combinado de resultados: 'csv' o 'parquet' (requiere pyarrow,
+    # se escribe por grupos de RESULTS_ROW_GROUP_SIZE filas)
+    RESULTS_FORMAT = os.getenv('RESULTS_FORMAT', 'csv')
+    RESULTS_ROW_GROUP_SIZE = int(os.getenv('RESULTS_ROW_GROUP_SIZE', 1000))
+
+    # Manifiesto de imágenes procesadas, para reanudar lotes interrumpidos
+    MANIFEST_PATH = os.getenv('MANIFEST_PATH', os.path.join(OUTPUT_DIR, 'manifest.jsonl'))
+
+    # Modo vigilancia (--watch): segundos entre revisiones de INPUT_DIR y segundos que un
+    # archivo debe permanecer sin cambios antes de procesarlo
+    WATCH_INTERVAL = float(os.getenv('WATCH_INTERVAL', 1.0))
+    WATCH_DEBOUNCE = float(os.getenv('WATCH_DEBOUNCE', 2.0))
+
+    # Modo servicio (--serve): servidor HTTP local con procesos trabajadores ya cargados.
+    # Las peticiones que llegan a la vez se agrupan en bloques de hasta SERVER_BATCH_SIZE
+    # imágenes (esperando como mucho SERVER_BATCH_WAIT_MS a completar un bloque) y se
+    # rechazan con 503 si ya hay SERVER_MAX_PENDING imágenes esperando o en proceso
+    SERVER_HOST = os.getenv('SERVER_HOST', '127.0.0.1')
+    SERVER_PORT = int(os.getenv('SERVER_PORT', 8080))
+    SERVER_BATCH_SIZE = int(os.getenv('SERVER_BATCH_SIZE', 8))
+    SERVER_BATCH_WAIT_MS = float(os.getenv('SERVER_BATCH_WAIT_MS', 10))
+    SERVER_MAX_PENDING = int(os.getenv('SERVER_MAX_PENDING', 64))
+    SERVER_MAX_BYTES = int(os.getenv('SERVER_MAX_BYTES', 20 * 1024 * 1024))
+    SERVER_TIMEOUT = float(os.getenv('SERVER_TIMEOUT', 120))
+
+    # Modo compartido (--shared): varios nodos procesan el mismo INPUT_DIR reservando cada
+    # imagen con un archivo en SHARED_WORK_DIR (en el almacenamiento compartido). Una reserva
+    # sin renovar durante SHARED_LEASE_SECONDS se da por abandonada; cuando no quedan imágenes
+    # libres, el nodo revisa cada SHARED_POLL_INTERVAL segundos las que reservan otros nodos
+    SHARED_WORK_DIR = os.getenv('SHARED_WORK_DIR', os.path.join(INPUT_DIR, '.idreader-work'))
+    SHARED_LEASE_SECONDS = float(os.getenv('SHARED_LEASE_SECONDS', 120))
+    SHARED_POLL_INTERVAL = float(os.getenv('SHARED_POLL_INTERVAL', 10))
+    NODE_ID = os.getenv('NODE_ID', '')
+
+    # Caché persistente de resultados OCR (clave: hash de la imagen + rama + configuración)
+    OCR_CACHE_ENABLED = os.getenv('OCR_CACHE_ENABLED', '1') == '1'
+    OCR_CACHE_PATH = os.getenv('OCR_CACHE_PATH', os.path.join(OUTPUT_DIR, 'ocr_cache.sqlite3'))
+    OCR_CACHE_MAX_MB = int(os.getenv('OCR_CACHE_MAX_MB', 256))
+
+    # Memo en memoria de la ejecución: resultados OCR por resumen de los píxeles y configuración,
+    # para no repetir llamadas idénticas desde ramas distintas (0 = desactivado)
+    OCR_MEMO_SIZE = int(os.getenv('OCR_MEMO_SIZE', 256))
+
+    # Cédulas repetidas (desactivado por defecto): antes de procesar una imagen se busca en un
+    # índice persistente de cédulas ya procesadas; si la misma cédula ya se procesó (otra foto,
+    # recomprimida o con otro tamaño) se reutiliza su resultado. Candidatos: huella perceptual
+    # a menos de DEDUP_MAX_DISTANCE bits (de 256) y miniaturas con una correlación de al menos
+    # DEDUP_MIN_SIMILARITY; se aceptan si el número de documento y los nombres leídos coinciden.
+    # Con benchmarks.bench_dedup, las fotos de la misma cédula quedan a distancia <= 18 y con
+    # similitud >= 0.65. Los valores por defecto son más holgados a propósito: las fotos reales
+    # varían más que las sintéticas, y estos umbrales solo preseleccionan candidatos. Lo que
+    # impide reutilizar la cédula de otra persona es la lectura del número y los nombres
+    # (app/core/dedup.py); un umbral más holgado solo añade lecturas de candidatos
+    DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', '0') == '1'
+    DEDUP_INDEX_PATH = os.getenv('DEDUP_INDEX_PATH', os.path.join(OUTPUT_DIR, 'dedup_index.sqlite3'))
+    DEDUP_MAX_DISTANCE = int(os.getenv('DEDUP_MAX_DISTANCE', 24))
+    DEDUP_MIN_SIMILARITY = float(os.getenv('DEDUP_MIN_SIMILARITY', 0.5))
+    DEDUP_CANDIDATES = int(os.getenv('DEDUP_CANDIDATES', 2))
+
+    # Detección barata de orientación: ancho de la copia reducida y confianza mínima de Tesseract OSD
+    ORIENTATION_MAX_WIDTH = int(os.getenv('ORIENTATION_MAX_WIDTH', 1200))
+    OSD_MIN_CONFIDENCE = float(os.getenv('OSD_MIN_CONFIDENCE', 2.0))
+
+    # Detección y recorte de la cédula antes del OCR (si no se encuentra se usa la foto completa)
+    CARD_DETECTION = os.getenv('CARD_DETECTION', '1') == '1'
+    CARD_WIDTH = int(os.getenv('CARD_WIDTH', 1400))
+    CARD_DETECT_MAX_SIDE = int(os.getenv('CARD_DETECT_MAX_SIDE', 800))
+    CARD_MIN_AREA_RATIO = float(os.getenv('CARD_MIN_AREA_RATIO', 0.05))
+
+    # Modo plantilla: con la cédula detectada, reconocer solo la región fija de cada campo
+    LAYOUT_MODE = os.getenv('LAYOUT_MODE', '0') == '1'
 
-# Directorios - Configuración ajustada a tus carpetas existentes
-INPUT_DIR = os.getenv('INPUT_DIR', 'input_images')
-OUTPUT_DIR = os.getenv('OUTPUT_DIR', 'OUTPUT')
+    # Escalera de estrategias OCR: peldaños variante:psm que se prueban en orden hasta que
+    # uno encuentra OCR_MIN_KEYWORDS palabras clave con confianza media >= MIN_CONFIDENCE
+    OCR_MIN_KEYWORDS = int(os.getenv('OCR_MIN_KEYWORDS', 3))
+    OCR_FRONT_LADDER = os.getenv(
+        'OCR_FRONT_LADDER',
+        'processed:3,processed:4,processed:6,processed:11,'
+        'rotated:3,rotated:4,rotated:6,rotated:11,negative:3'
+    )
+    OCR_REVERSE_LADDER = os.getenv(
+        'OCR_REVERSE_LADDER',
+        'processed:3,inverted:3,processed:4,inverted:4,processed:6,inverted:6,processed:11,inverted:11,'
+        'rotated:3,rotated:4,rotated:6,rotated:11,negative:3,processed:1'
+    )
 
-# Resto del código de configuración permanece igual...
-TESSERACT_CMD = os.getenv('TESSERACT_CMD', '')
-TESSERACT_LANG = os.getenv('TESSERACT_LANG', 'spa')
-VALID_EXTENSIONS = {'jpg', 'jpeg', 'png', 'tif', 'tiff'}
-OCR_CONFIG = f'--psm 3 --oem 3 -l {TESSERACT_LANG}'
-MIN_CONFIDENCE = int(os.getenv('MIN_CONFIDENCE', 60))
+    return {name: value for name, value in locals().items() if name.isupper()}
 
-# Crear directorios si no existen
-os.makedirs(INPUT_DIR, exist_ok=True)
-os.makedirs(OUTPUT_DIR, exist_ok=True)
\ No newline at end of file
+def __getattr__(name):
+    """Devuelve un valor de configuración, resolviéndolos todos la primera vez"""
+    global _values
+    if _values is None:
+        _values = _resolve()
+    try:
+        return _values[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
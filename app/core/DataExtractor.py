@@ -1,17 +1,57 @@
 import os
-import pandas as pd
 import re
-import dateutil.parser
 from datetime import datetime
 import logging
-import unicodedata
+from app.utils.artifacts import ArtifactWriter
+from app.utils.metrics import Metrics, instrumented
+from app.utils.text import KeywordScorer, parse_spanish_date, strip_accents
+from app.core.results import ExtractedRecord, write_records
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Expresiones regulares compiladas una sola vez para todas las imágenes
+SPECIAL_CHARS_PATTERN = re.compile(r'[—:\\/\"\']+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+DOC_PATTERN = re.compile(r"n[uú]mero[\s\.]*(\d[\d\.\,\s]+\d)", re.IGNORECASE)
+DOC_SEPARATORS_PATTERN = re.compile(r'[,.\s]')
+DIGITS_PATTERN = re.compile(r'\d+')
+NON_DIGITS_PATTERN = re.compile(r'\D')
+NAME_CLEAN_PATTERN = re.compile(r'[^A-Za-zÁÉÍÓÚÜÑáéíóúüñ\s]')
+BIRTH_PATTERN = re.compile(r"FECHA DE (?:NACIMIENTO|RACIMIENTO)[:\s]+(\d+[\'|\-][\w]+[\'|\-]\d+)", re.IGNORECASE)
+EXP_PATTERN = re.compile(r"(\d+\-[\w]+\-\d+)")
+GENDER_M_PATTERN = re.compile(r"[^A-Za-z]M[^A-Za-z]")
+GENDER_F_PATTERN = re.compile(r"[^A-Za-z]F[^A-Za-z]")
+FIELD_DATE_PATTERN = re.compile(r"(\d{1,2})\W*([A-Z]{3})\W*(\d{4})")
+# Código impreso bajo el código de barras del reverso (A-1500100-00223437-M-0012345678-20080101):
+# el quinto grupo es el número de cédula con ceros a la izquierda
+BACK_CODE_PATTERN = re.compile(r"[A-Z]\s*-\s*\d{7}\s*-\s*\d{8}\s*-\s*[MF]\s*-\s*(\d{10})\s*-\s*\d{8}")
+
+# Frases que identifican cada lado de la cédula y palabras del encabezado del anverso
+SIDE_SCORER = KeywordScorer(
+    ['REPUBLICA DE COLOMBIA', 'IDENTIFICACION PERSONAL'],
+    ['FECHA DE NACIMIENTO', 'FECHA DE RACIMIENTO']
+)
+HEADER_SCORER = KeywordScorer(['COLOMBIA', 'REPUBLICA', 'CEDULA', 'CIUDADANIA'])
 
 class DataExtractor:
-    def __init__(self, output_dir="output"):
+    def __init__(self, output_dir="output", artifacts=None, metrics=None):
         self.output_dir = output_dir
+        # Escritor de artefactos de depuración (compartido con ImageProcessor si se indica);
+        # close() solo cierra el que crea el propio extractor
+        self._owns_artifacts = artifacts is None
+        self.artifacts = artifacts or ArtifactWriter(output_dir)
+        # Métricas por etapa (compartidas con ImageProcessor si se indica)
+        self.metrics = metrics or Metrics()
+        self.reset()
+        
+        # Crear directorio de salida si no existe
+        os.makedirs(output_dir, exist_ok=True)
+    
+    def close(self):
+        """Escribe los artefactos pendientes si el escritor es propio del extractor."""
+        if self._owns_artifacts:
+            self.artifacts.close()
+    
+    def reset(self):
+        """Limpia los datos extraídos de la imagen anterior."""
         self.nombre = ""
         self.apellido = ""
         self.documento = ""
@@ -20,53 +60,25 @@ class DataExtractor:
         self.fecha_expedicion = None
         self.texto_completo = ""
         self.filename = ""
-        
-        # Crear directorio de salida si no existe
-        os.makedirs(output_dir, exist_ok=True)
     
     def normalize_text(self, text):
         """Normaliza el texto para comparaciones insensibles a acentos."""
-        text = unicodedata.normalize('NFD', text)
-        text = ''.join([c for c in text if not unicodedata.combining(c)])
-        return text.upper()
+        return strip_accents(text).upper()
     
     def clean_text(self, text):
         """Limpia el texto eliminando caracteres especiales no deseados."""
         # Eliminar caracteres especiales que no sean útiles
-        text = re.sub(r'[—:\\/\"\']+', '', text)
+        text = SPECIAL_CHARS_PATTERN.sub('', text)
         # Eliminar espacios múltiples
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_PATTERN.sub(' ', text)
         return text.strip()
     
     def parse_date(self, date_str):
         """Convierte diferentes formatos de fecha a formato DD/MM/YYYY."""
-        try:
-            # Manejar formato con comillas: 18'ENE'2003
-            if "'" in date_str:
-                day, month, year = re.findall(r"(\d+)'(\w+)'(\d+)", date_str)[0]
-                month_map = {
-                    'ENE': '01', 'FEB': '02', 'MAR': '03', 'ABR': '04', 'MAY': '05', 'JUN': '06',
-                    'JUL': '07', 'AGO': '08', 'SEP': '09', 'OCT': '10', 'NOV': '11', 'DIC': '12'
-                }
-                return f"{day.zfill(2)}/{month_map.get(month, '01')}/{year}"
-            
-            # Manejar formato con guiones: 25-ENE-2021
-            elif "-" in date_str:
-                parts = date_str.split('-')
-                if len(parts) == 3:
-                    day, month, year = parts
-                    month_map = {
-                        'ENE': '01', 'FEB': '02', 'MAR': '03', 'ABR': '04', 'MAY': '05', 'JUN': '06',
-                        'JUL': '07', 'AGO': '08', 'SEP': '09', 'OCT': '10', 'NOV': '11', 'DIC': '12'
-                    }
-                    return f"{day.zfill(2)}/{month_map.get(month, '01')}/{year}"
-            
-            # Intentar con dateutil.parser para otros formatos
-            date_obj = dateutil.parser.parse(date_str, fuzzy=True)
-            return date_obj.strftime("%d/%m/%Y")
-        except Exception as e:
-            logging.warning(f"Error al parsear fecha '{date_str}': {e}")
-            return None
+        date = parse_spanish_date(date_str)
+        if date is None:
+            logging.warning(f"Error al parsear fecha '{date_str}'")
+        return date
 
     def extract_data_from_front(self, front_text):
         """Extrae datos del texto OCR del frente de la cédula."""
@@ -78,16 +90,15 @@ class DataExtractor:
         lines = [line.strip() for line in front_text.split('\n') if line.strip()]
         
         # Buscar número de documento - patrón mejorado para capturar el número completo
-        doc_pattern = r"n[uú]mero[\s\.]*(\d[\d\.\,\s]+\d)"
-        doc_match = re.search(doc_pattern, front_text, re.IGNORECASE)
+        doc_match = DOC_PATTERN.search(front_text)
         if doc_match:
             # Eliminar puntos, comas y espacios del número
-            documento = re.sub(r'[,.\s]', '', doc_match.group(1))
+            documento = DOC_SEPARATORS_PATTERN.sub('', doc_match.group(1))
         
         # Si no se encontró con el patrón anterior o es demasiado corto, buscar cualquier secuencia de dígitos
         if not documento or len(documento) < 7:
             # Extraer todas las secuencias de dígitos
-            digit_sequences = re.findall(r'\d+', front_text)
+            digit_sequences = DIGITS_PATTERN.findall(front_text)
             # Filtrar por longitud (cédulas colombianas tienen típicamente 10 dígitos)
             valid_sequences = [seq for seq in digit_sequences if 7 <= len(seq) <= 12]
             if valid_sequences:
@@ -127,14 +138,14 @@ class DataExtractor:
                         # Si la línea tiene contenido, no tiene dígitos y no tiene palabras clave
                         if (clean_line and 
                             not any(c.isdigit() for c in clean_line) and
-                            not any(word in clean_line.upper() for word in ["COLOMBIA", "REPUBLICA", "CEDULA", "CIUDADANIA"])):
+                            not HEADER_SCORER.score(clean_line)):
                             # Si es una sola palabra, probablemente es un nombre
                             if len(clean_line.split()) == 1:
                                 nombre = clean_line
                                 break
         
         # Limpiar el nombre para eliminar caracteres especiales
-        nombre = re.sub(r'[^A-Za-zÁÉÍÓÚÜÑáéíóúüñ\s]', '', nombre).strip()
+        nombre = NAME_CLEAN_PATTERN.sub('', nombre).strip()
         
         return nombre, apellido, documento
 
@@ -145,27 +156,34 @@ class DataExtractor:
         fecha_expedicion = None
         
         # Buscar fecha de nacimiento - MEJORADO para detectar el formato 18'ENE'2003
-        birth_pattern = r"FECHA DE (?:NACIMIENTO|RACIMIENTO)[:\s]+(\d+[\'|\-][\w]+[\'|\-]\d+)"
-        birth_match = re.search(birth_pattern, back_text, re.IGNORECASE)
+        birth_match = BIRTH_PATTERN.search(back_text)
         if birth_match:
             fecha_nacimiento_str = birth_match.group(1)
             fecha_nacimiento = self.parse_date(fecha_nacimiento_str)
         
         # Buscar fecha de expedición - MEJORADO para detectar el formato 25-ENE-2021
-        exp_pattern = r"(\d+\-[\w]+\-\d+)"
-        exp_match = re.search(exp_pattern, back_text)
+        exp_match = EXP_PATTERN.search(back_text)
         if exp_match:
             fecha_expedicion_str = exp_match.group(1)
             fecha_expedicion = self.parse_date(fecha_expedicion_str)
         
         # Buscar género
-        if re.search(r"[^A-Za-z]M[^A-Za-z]", back_text):
+        if GENDER_M_PATTERN.search(back_text):
             genero = "M"
-        elif re.search(r"[^A-Za-z]F[^A-Za-z]", back_text):
+        elif GENDER_F_PATTERN.search(back_text):
             genero = "F"
         
         return fecha_nacimiento, genero, fecha_expedicion
 
+    def extract_document_from_back(self, back_text):
+        """Extrae el número de cédula del código impreso en el reverso ("" si no aparece)."""
+        code_match = BACK_CODE_PATTERN.search(back_text.upper())
+        if not code_match:
+            return ""
+        # Sin los ceros de relleno, como se imprime en el anverso
+        return code_match.group(1).lstrip('0')
+
+    @instrumented('extraction')
     def process_text(self, text, filename=""):
         """Procesa el texto OCR extraído de la imagen."""
         self.texto_completo = text
@@ -175,8 +193,9 @@ class DataExtractor:
         normalized_text = self.normalize_text(text)
         
         # Determinar si es frente o reverso basado en patrones característicos
-        is_front = "REPUBLICA DE COLOMBIA" in normalized_text or "IDENTIFICACION PERSONAL" in normalized_text
-        is_back = "FECHA DE NACIMIENTO" in normalized_text or "FECHA DE RACIMIENTO" in normalized_text
+        front_score, back_score = SIDE_SCORER.scores(normalized_text)
+        is_front = front_score > 0
+        is_back = back_score > 0
         
         if is_front:
             logging.info(f"Procesando texto del frente de la cédula: {filename}")
@@ -190,39 +209,72 @@ class DataExtractor:
             self.fecha_nacimiento = fecha_nacimiento
             self.genero = genero
             self.fecha_expedicion = fecha_expedicion
+            # El número del reverso permite emparejarlo con su anverso (ver FrontBackPairer)
+            self.documento = self.extract_document_from_back(text)
         else:
             logging.warning(f"No se pudo determinar si es frente o reverso: {filename}")
             
-        # Guardar el texto procesado para depuración
+        # Guardar el texto procesado para depuración (sin pisar el ocr_text_* de ImageProcessor)
         if filename:
-            text_file = os.path.join(self.output_dir, f"ocr_text_{os.path.splitext(filename)[0]}.txt")
-            with open(text_file, 'w', encoding='utf-8') as f:
-                f.write(text)
+            self.artifacts.write_text(f"extractor_text_{os.path.splitext(filename)[0]}.txt", text)
 
-    def to_dataframe(self):
-        """Convierte los datos extraídos a un DataFrame."""
-        data = {
-            'Nombre': [self.nombre],
-            'Apellido': [self.apellido],
-            'Documento': [self.documento],
-            'Fecha_Nacimiento': [self.fecha_nacimiento],
-            'Genero': [self.genero],
-            'Fecha_Expedicion': [self.fecha_expedicion],
-            'Timestamp': [datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
-        }
-        
-        df = pd.DataFrame(data)
+    @instrumented('extraction')
+    def process_fields(self, fields, filename=""):
+        """Procesa los campos reconocidos por región en modo plantilla."""
+        self.texto_completo = "\n".join(f"{name}: {value}" for name, value in fields.items())
+        self.filename = filename
+        
+        if 'Documento' in fields:
+            logging.info(f"Procesando campos del frente de la cédula: {filename}")
+            # Eliminar puntos, comas y espacios del número
+            documento = NON_DIGITS_PATTERN.sub('', fields.get('Documento', ''))
+            if 6 <= len(documento) <= 12:
+                self.documento = documento
+            self.apellido = self.clean_text(fields.get('Apellido', ''))
+            nombre = self.clean_text(fields.get('Nombre', ''))
+            self.nombre = NAME_CLEAN_PATTERN.sub('', nombre).strip()
+        else:
+            logging.info(f"Procesando campos del reverso de la cédula: {filename}")
+            self.fecha_nacimiento = self._parse_field_date(fields.get('Fecha_Nacimiento', ''))
+            self.fecha_expedicion = self._parse_field_date(fields.get('Fecha_Expedicion', ''))
+            genero = fields.get('Genero', '').strip().upper()
+            if genero[:1] in ('M', 'F'):
+                self.genero = genero[:1]
+            self.documento = self.extract_document_from_back(fields.get('Codigo', ''))
+    
+    def _parse_field_date(self, value):
+        """Convierte la fecha de un campo (p. ej. 18-ENE-2003) a formato DD/MM/YYYY."""
+        match = FIELD_DATE_PATTERN.search(value.upper())
+        if not match:
+            return None
+        return self.parse_date("-".join(match.groups()))
+    
+    def to_record(self):
+        """Convierte los datos extraídos a un ExtractedRecord."""
+        record = ExtractedRecord(
+            Nombre=self.nombre,
+            Apellido=self.apellido,
+            Documento=self.documento,
+            Fecha_Nacimiento=self.fecha_nacimiento,
+            Genero=self.genero,
+            Fecha_Expedicion=self.fecha_expedicion,
+            Timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
         
         # Registrar los datos extraídos
-        logging.info(f"Resumen de datos extraídos:\n{df}")
+        logging.info(f"Datos extraídos: {record}")
         
-        return df
+        return record
+    
+    def to_dataframe(self):
+        """Convierte los datos extraídos a un DataFrame."""
+        import pandas as pd
+        return pd.DataFrame([self.to_record().as_dict()])
     
-    def save_to_csv(self, filename):
-        """Guarda los datos en un archivo CSV."""
-        df = self.to_dataframe()
+    def save_to_csv(self, filename, record=None):
+        """Guarda los datos (o el registro indicado) en un archivo CSV."""
         csv_path = os.path.join(self.output_dir, filename)
-        df.to_csv(csv_path, index=False)
+        write_records(csv_path, [record or self.to_record()])
         logging.info(f"Datos guardados en: {csv_path}")
         return csv_path
     
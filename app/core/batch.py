@@ -0,0 +1,610 @@
+import os
+import time
+import hashlib
+import itertools
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from app.core.image_processor import ImageProcessor
+from app.core.DataExtractor import DataExtractor
+from app.core.dedup import reused_since
+from app.core.watcher import FolderWatcher
+from app.core.work_queue import WorkQueue
+from app.core.results import CSVSink
+from app.utils.artifacts import ArtifactWriter
+from app.utils.metrics import Metrics, MetricsExporter
+from app.utils.memory import MemoryTracker
+from app.utils.helpers import setup_logging, get_image_files
+from app.config import (OUTPUT_DIR, METRICS_ENABLED, MEMORY_REPORT, OCR_BATCH_SIZE, DEDUP_ENABLED,
+                        DEDUP_INDEX_PATH, SHARED_POLL_INTERVAL, NODE_ID)
+
+# Resultados del modo vigilancia: una fila por imagen, sin emparejar (ver run_watch)
+WATCH_CSV_NAME = 'watch_extracted_data.csv'
+
+# Instancias propias de cada proceso trabajador (se crean una sola vez en init_worker)
+_worker_processor = None
+_worker_extractor = None
+
+def process_single_image(image_path, processor, extractor, save_individual=True):
+    """
+    Procesa una sola imagen, informando del pico de memoria si config.MEMORY_REPORT está activo
+
+    Args:
+        image_path (str): Ruta a la imagen
+        processor (ImageProcessor): Instancia del procesador de imágenes
+        extractor (DataExtractor): Instancia del extractor de datos
+        save_individual (bool): Si se debe guardar un CSV individual
+
+    Returns:
+        ExtractedRecord: Registro con los datos extraídos
+    """
+    if not MEMORY_REPORT:
+        return _process_single_image(image_path, processor, extractor, save_individual)
+
+    with MemoryTracker() as memory:
+        record = _process_single_image(image_path, processor, extractor, save_individual)
+    print(f"  {memory.summary()}")
+    for name, value in memory.report.items():
+        processor.metrics.gauge(name, value)
+    return record
+
+def _process_single_image(image_path, processor, extractor, save_individual):
+    """Procesa una sola imagen (ver process_single_image)"""
+    filename = os.path.basename(image_path)
+    print(f"Procesando imagen: {filename}")
+
+    # Las métricas se miden por imagen
+    metrics = processor.metrics
+    metrics.reset()
+    bytes_before = processor.artifacts.bytes_written
+
+    # Misma cédula que una imagen ya procesada: reutilizar su resultado sin OCR
+    duplicate, fingerprint = find_duplicate(image_path, processor)
+    if duplicate is not None:
+        return reuse_result(image_path, duplicate, processor, extractor, save_individual)
+
+    # Procesar imagen
+    started = time.perf_counter()
+    result = processor.process_images([image_path])[0]
+    record = extract_record(result, extractor, save_individual)
+    remember_result(image_path, fingerprint, record, processor, time.perf_counter() - started)
+
+    # Bytes de artefactos que el escritor en segundo plano terminó de guardar durante esta imagen
+    metrics.incr('bytes_written', processor.artifacts.bytes_written - bytes_before)
+    return record
+
+def find_duplicate(image_path, processor):
+    """
+    Busca la cédula de una imagen en el índice de cédulas ya procesadas
+
+    Args:
+        image_path (str): Ruta a la imagen
+        processor (ImageProcessor): Procesador con el índice (processor.dedup)
+
+    Returns:
+        tuple: (Duplicate o None, huella para guardar después el resultado o None)
+    """
+    if processor.dedup is None:
+        return None, None
+    try:
+        with processor.metrics.stage('dedup'):
+            fingerprint = processor.dedup.fingerprint(image_path)
+            duplicate = processor.dedup.find(fingerprint, processor.read_fields) if fingerprint is not None else None
+    except Exception as e:
+        # Sin el índice la imagen se procesa igualmente
+        print(f"  Error consultando el índice de cédulas: {str(e)}")
+        return None, None
+    return duplicate, fingerprint
+
+def reuse_result(image_path, duplicate, processor, extractor, save_individual=True):
+    """
+    Entrega como resultado de una imagen el de otra imagen de la misma cédula
+
+    Args:
+        image_path (str): Ruta a la imagen
+        duplicate (Duplicate): Imagen ya procesada con la misma cédula
+        processor (ImageProcessor): Procesador con el índice
+        extractor (DataExtractor): Extractor de datos (para el CSV individual)
+        save_individual (bool): Si se debe guardar un CSV individual
+
+    Returns:
+        ExtractedRecord: Registro extraído de la otra imagen
+    """
+    print(f"  Misma cédula que {os.path.basename(duplicate.image_path)} (distancia {duplicate.distance}, "
+          f"similitud {duplicate.similarity:.2f}): se reutiliza su resultado")
+    processor.dedup.record_reuse(image_path, duplicate)
+    processor.metrics.incr('dedup_hits')
+    processor.metrics.label('strategy', 'DUPLICATE')
+
+    record = duplicate.record
+    if save_individual:
+        csv_file = f"{os.path.splitext(os.path.basename(image_path))[0]}_data.csv"
+        csv_path = extractor.save_to_csv(csv_file, record)
+        extractor.metrics.incr('bytes_written', os.path.getsize(csv_path))
+    return record
+
+def remember_result(image_path, fingerprint, record, processor, seconds):
+    """
+    Guarda en el índice el resultado de una imagen procesada, para sus futuras repeticiones
+
+    Args:
+        image_path (str): Ruta a la imagen
+        fingerprint (Fingerprint): Huella de find_duplicate o None si no se calculó
+        record (ExtractedRecord): Registro extraído o None si no hubo texto
+        processor (ImageProcessor): Procesador con el índice
+        seconds (float): Segundos que costó procesarla
+    """
+    if fingerprint is not None and record is not None:
+        processor.dedup.add(image_path, fingerprint, record, seconds)
+
+def extract_record(result, extractor, save_individual=True):
+    """
+    Extrae los datos del resultado OCR de una imagen
+
+    Args:
+        result (ImageResult): Resultado de ImageProcessor.process_images
+        extractor (DataExtractor): Extractor de datos (limpio)
+        save_individual (bool): Si se debe guardar un CSV individual
+
+    Returns:
+        ExtractedRecord: Registro con los datos extraídos o None si no hubo texto
+    """
+    if result.text is None:
+        print(f"  Error: No se pudo extraer texto de la imagen")
+        return None
+
+    # Extraer datos: de los campos si se usó el modo plantilla, si no del texto completo
+    filename = os.path.basename(result.image_path)
+    if result.fields:
+        extractor.process_fields(result.fields, filename=filename)
+    else:
+        extractor.process_text(result.text, filename=filename)
+
+    # Convertir a registro (una sola vez, también para el CSV individual)
+    record = extractor.to_record()
+    record.source_hash = result.source_hash
+
+    # Guardar en CSV individual si se solicita
+    if save_individual:
+        base_name = os.path.splitext(filename)[0]
+        csv_file = f"{base_name}_data.csv"
+        csv_path = extractor.save_to_csv(csv_file, record)
+        extractor.metrics.incr('bytes_written', os.path.getsize(csv_path))
+
+    return record
+
+def process_chunk(image_paths, processor, extractor, save_individual=True):
+    """
+    Procesa un bloque de imágenes con las pasadas OCR agrupadas (ver config.OCR_BATCH_SIZE)
+
+    Los errores se capturan aquí, como en process_safely. Las métricas de un bloque no
+    se pueden separar por imagen: cada imagen recibe su parte del tiempo y de los
+    contadores del bloque, con su propia estrategia ganadora, y el pico de memoria
+    es el del bloque. Las imágenes cuya cédula ya se procesó antes (ver find_duplicate)
+    no entran en el bloque.
+
+    Args:
+        image_paths (list): Rutas a las imágenes
+        processor (ImageProcessor): Instancia del procesador de imágenes
+        extractor (DataExtractor): Instancia del extractor de datos
+        save_individual (bool): Si se debe guardar un CSV individual por imagen
+
+    Returns:
+        list: (ExtractedRecord o None si hubo error, métricas o None) de cada imagen
+    """
+    if len(image_paths) == 1:
+        return [process_safely(image_paths[0], processor, extractor, save_individual)]
+
+    print(f"Procesando bloque de {len(image_paths)} imágenes: "
+          f"{', '.join(os.path.basename(path) for path in image_paths)}")
+    metrics = processor.metrics
+
+    # Las cédulas ya procesadas se resuelven antes, cada una con sus propias métricas
+    outputs = {}
+    fingerprints = {}
+    for image_path in image_paths:
+        metrics.reset()
+        duplicate, fingerprints[image_path] = find_duplicate(image_path, processor)
+        if duplicate is not None:
+            try:
+                record = reuse_result(image_path, duplicate, processor, extractor, save_individual)
+            except Exception as e:
+                print(f"  Error procesando {os.path.basename(image_path)}: {str(e)}")
+                record = None
+            outputs[image_path] = (record, metrics.snapshot())
+    pending = [image_path for image_path in image_paths if image_path not in outputs]
+    if not pending:
+        return [outputs[image_path] for image_path in image_paths]
+
+    metrics.reset()
+    bytes_before = processor.artifacts.bytes_written
+    started = time.perf_counter()
+
+    memory = MemoryTracker() if MEMORY_REPORT else None
+    try:
+        if memory is not None:
+            with memory:
+                results = processor.process_images(pending)
+            print(f"  {memory.summary()}")
+            for name, value in memory.report.items():
+                metrics.gauge(name, value)
+        else:
+            results = processor.process_images(pending)
+    except Exception as e:
+        # Repetir imagen por imagen para que el error quede en la imagen que lo causa
+        print(f"  Error procesando el bloque: {str(e)}; se procesa imagen por imagen")
+        for image_path in pending:
+            outputs[image_path] = process_safely(image_path, processor, extractor, save_individual)
+        return [outputs[image_path] for image_path in image_paths]
+
+    records = []
+    for result in results:
+        extractor.reset()
+        try:
+            records.append(extract_record(result, extractor, save_individual))
+        except Exception as e:
+            print(f"  Error procesando {os.path.basename(result.image_path)}: {str(e)}")
+            records.append(None)
+    metrics.incr('bytes_written', processor.artifacts.bytes_written - bytes_before)
+
+    # El tiempo del bloque se reparte entre sus imágenes, como las métricas
+    seconds = (time.perf_counter() - started) / len(results)
+    for record, result in zip(records, results):
+        remember_result(result.image_path, fingerprints.get(result.image_path), record, processor, seconds)
+        outputs[result.image_path] = (record, metrics.snapshot(share=len(results), labels={'strategy': result.strategy}))
+    return [outputs[image_path] for image_path in image_paths]
+
+def init_worker(output_dir):
+    """
+    Inicializa un proceso trabajador creando su propio procesador y extractor
+
+    Args:
+        output_dir (str): Directorio para guardar resultados
+    """
+    global _worker_processor, _worker_extractor
+    setup_logging()
+    artifacts = ArtifactWriter(output_dir)
+    metrics = Metrics()
+    _worker_processor = ImageProcessor(output_dir=output_dir, artifacts=artifacts, metrics=metrics)
+    _worker_extractor = DataExtractor(output_dir=output_dir, artifacts=artifacts, metrics=metrics)
+
+    # Los procesos del pool no ejecutan atexit: escribir los artefactos y la caché al salir
+    multiprocessing.util.Finalize(None, artifacts.close, exitpriority=10)
+    multiprocessing.util.Finalize(None, _worker_processor.close, exitpriority=10)
+
+def process_safely(image_path, processor, extractor, save_individual=True):
+    """
+    Procesa una imagen con un extractor limpio, capturando los errores
+
+    Los errores se capturan aquí para que una imagen defectuosa no detenga el lote.
+
+    Args:
+        image_path (str): Ruta a la imagen
+        processor (ImageProcessor): Instancia del procesador de imágenes
+        extractor (DataExtractor): Instancia del extractor de datos
+        save_individual (bool): Si se debe guardar un CSV individual
+
+    Returns:
+        tuple: (ExtractedRecord o None si hubo error, métricas de la imagen o None
+               si están desactivadas)
+    """
+    # Cada imagen empieza con un extractor limpio para que el resultado no dependa
+    # de qué imágenes se procesaron antes: el emparejamiento de anverso y reverso
+    # se hace después sobre todo el lote
+    extractor.reset()
+    try:
+        record = process_single_image(image_path, processor, extractor, save_individual)
+    except Exception as e:
+        print(f"  Error procesando {os.path.basename(image_path)}: {str(e)}")
+        record = None
+    return record, processor.metrics.snapshot()
+
+def process_in_worker(image_path, save_individual=True):
+    """
+    Procesa una imagen dentro de un proceso trabajador
+
+    Args:
+        image_path (str): Ruta a la imagen
+        save_individual (bool): Si se debe guardar un CSV individual
+
+    Returns:
+        tuple: (ExtractedRecord o None si hubo error, métricas de la imagen o None).
+               Las métricas viajan con el resultado: solo el proceso principal las exporta
+    """
+    return process_safely(image_path, _worker_processor, _worker_extractor, save_individual)
+
+def process_chunk_in_worker(image_paths, save_individual=True):
+    """
+    Procesa un bloque de imágenes dentro de un proceso trabajador (ver process_chunk)
+
+    Args:
+        image_paths (list): Rutas a las imágenes
+        save_individual (bool): Si se debe guardar un CSV individual por imagen
+
+    Returns:
+        list: (ExtractedRecord o None si hubo error, métricas o None) de cada imagen
+    """
+    return process_chunk(image_paths, _worker_processor, _worker_extractor, save_individual)
+
+def run_batch(image_files, workers=1, output_dir=None, save_individual=True, on_result=None):
+    """
+    Procesa un lote de imágenes, en serie o repartido en un pool de procesos
+
+    Los resultados no se acumulan: cada uno se entrega a on_result en cuanto termina,
+    así que la memoria no crece con el tamaño del lote. Con config.OCR_BATCH_SIZE > 1
+    las imágenes se procesan en bloques de ese tamaño (ver process_chunk). Las rutas se
+    consumen solo cuando hay sitio para un bloque más, así que image_files puede ser un
+    iterable que las va reservando (ver WorkQueue.claimed).
+
+    Args:
+        image_files (iterable): Rutas de las imágenes a procesar
+        workers (int): Número de procesos trabajadores (1 = en serie)
+        output_dir (str, optional): Directorio para guardar resultados.
+                                    Por defecto usa el valor de config.OUTPUT_DIR
+        save_individual (bool): Si se debe guardar un CSV individual por imagen
+        on_result (callable, optional): Se llama en el proceso principal con
+                                        (ruta, ExtractedRecord o None) cada vez que
+                                        termina una imagen, en orden de finalización
+
+    Returns:
+        tuple: (imágenes procesadas, imágenes con error)
+    """
+    from tqdm import tqdm
+
+    output_dir = output_dir or OUTPUT_DIR
+    exporter = MetricsExporter() if METRICS_ENABLED else None
+    succeeded = 0
+    failed = 0
+    total = len(image_files) if hasattr(image_files, '__len__') else None
+    chunks = _chunked(image_files, max(1, OCR_BATCH_SIZE))
+    started = time.time()
+    delivered = []
+
+    def deliver(image_path, record, snapshot):
+        nonlocal succeeded, failed
+        delivered.append(image_path)
+        if record is None:
+            failed += 1
+        else:
+            succeeded += 1
+        if exporter is not None:
+            exporter.record(image_path, snapshot, "ok" if record is not None else "error")
+        if on_result is not None:
+            on_result(image_path, record)
+
+    if workers <= 1:
+        artifacts = ArtifactWriter(output_dir)
+        metrics = Metrics()
+        processor = ImageProcessor(output_dir=output_dir, artifacts=artifacts, metrics=metrics)
+        extractor = DataExtractor(output_dir=output_dir, artifacts=artifacts, metrics=metrics)
+        try:
+            with tqdm(total=total, desc="Procesando imágenes") as progress:
+                for chunk in chunks:
+                    for image_path, (record, snapshot) in zip(chunk, process_chunk(chunk, processor, extractor, save_individual)):
+                        deliver(image_path, record, snapshot)
+                    progress.update(len(chunk))
+        finally:
+            processor.close()
+            artifacts.close()
+            if exporter is not None:
+                exporter.close()
+        report_duplicates(delivered, started)
+        return succeeded, failed
+
+    # Mantener solo unos pocos bloques en vuelo por proceso, para no guardar en
+    # memoria un futuro (y su resultado) por cada imagen del lote
+    max_in_flight = workers * 4
+    remaining = iter(chunks)
+    pending = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(output_dir,)) as executor:
+            with tqdm(total=total, desc=f"Procesando imágenes ({workers} procesos)") as progress:
+                while True:
+                    for chunk in remaining:
+                        pending[executor.submit(process_chunk_in_worker, chunk, save_individual)] = chunk
+                        if len(pending) >= max_in_flight:
+                            break
+                    if not pending:
+                        break
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        chunk = pending.pop(future)
+                        try:
+                            outputs = future.result()
+                        except Exception as e:
+                            # Por ejemplo, si el proceso trabajador murió procesando este bloque
+                            names = ', '.join(os.path.basename(path) for path in chunk)
+                            print(f"  Error procesando {names}: {str(e)}")
+                            outputs = [(None, None)] * len(chunk)
+                        for image_path, (record, snapshot) in zip(chunk, outputs):
+                            deliver(image_path, record, snapshot)
+                        progress.update(len(chunk))
+    finally:
+        if exporter is not None:
+            exporter.close()
+
+    report_duplicates(delivered, started)
+    return succeeded, failed
+
+def _chunked(image_files, size):
+    """Agrupa las rutas en bloques de size, consumiéndolas solo cuando se pide cada bloque"""
+    iterator = iter(image_files)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def report_duplicates(image_files, started):
+    """
+    Informa de las imágenes de un lote que reutilizaron el resultado de otra
+
+    Los procesos trabajadores registran cada reutilización en el índice de cédulas;
+    aquí se cuentan las de este lote.
+
+    Args:
+        image_files (list): Rutas de las imágenes del lote
+        started (float): Inicio del lote (time.time())
+    """
+    if not DEDUP_ENABLED:
+        return
+    reused, seconds = reused_since(DEDUP_INDEX_PATH, started, image_files)
+    if reused:
+        print(f"\nCédulas repetidas: {reused} de {len(image_files)} imágenes reutilizaron el resultado "
+              f"de una imagen ya procesada (se evitaron unos {seconds:.1f} s de procesamiento)")
+
+def run_watch(input_dir, workers=1, output_dir=None, save_individual=True, manifest=None,
+              retry_failed=False, force=False):
+    """
+    Vigila input_dir y procesa cada imagen nueva en cuanto termina de escribirse
+
+    El procesador, el extractor y los procesos trabajadores se crean una sola vez y se
+    mantienen activos, así que la latencia por cédula es solo la del procesamiento.
+    Los resultados se añaden a watch_extracted_data.csv a medida que terminan, una fila
+    por imagen: el anverso y el reverso no se emparejan porque pueden llegar en momentos
+    distintos. all_extracted_data.csv, con cada anverso combinado con su reverso, no se
+    modifica; para generarlo con las imágenes vigiladas se usa main.py --rebuild-csv,
+    que lo reconstruye a partir del manifiesto. Se detiene con Ctrl+C.
+
+    Args:
+        input_dir (str): Directorio a vigilar
+        workers (int): Número de procesos trabajadores (1 = en serie)
+        output_dir (str, optional): Directorio para guardar resultados.
+                                    Por defecto usa el valor de config.OUTPUT_DIR
+        save_individual (bool): Si se debe guardar un CSV individual por imagen
+        manifest (Manifest, optional): Manifiesto para omitir las imágenes ya
+                                       completadas y registrar las nuevas
+        retry_failed (bool): Si las imágenes que fallaron deben volver a procesarse
+        force (bool): Procesar las imágenes aunque ya figuren como completadas en el manifiesto
+    """
+    output_dir = output_dir or OUTPUT_DIR
+    csv_path = os.path.join(output_dir, WATCH_CSV_NAME)
+    watcher = FolderWatcher(input_dir)
+    print(f"Vigilando {input_dir} ({watcher.mode}). Resultados en {csv_path}. Ctrl+C para detener.")
+
+    processed = 0
+    sink = CSVSink(csv_path, append=True)
+    exporter = MetricsExporter() if METRICS_ENABLED else None
+
+    def is_pending(image_path):
+        return force or manifest is None or not manifest.is_done(image_path, retry_failed=retry_failed)
+
+    def handle_result(image_path, record, snapshot):
+        nonlocal processed
+        processed += 1
+        status = "ok" if record is not None else "error"
+        if exporter is not None:
+            exporter.record(image_path, snapshot, status)
+        if manifest is not None:
+            manifest.record_result(image_path, record)
+        if record is not None:
+            sink.write(record)
+            sink.flush()
+        print(f"[{time.strftime('%H:%M:%S')}] {os.path.basename(image_path)}: {status} ({processed} procesadas)")
+
+    if workers <= 1:
+        artifacts = ArtifactWriter(output_dir)
+        metrics = Metrics()
+        processor = ImageProcessor(output_dir=output_dir, artifacts=artifacts, metrics=metrics)
+        extractor = DataExtractor(output_dir=output_dir, artifacts=artifacts, metrics=metrics)
+        try:
+            while True:
+                for image_path in filter(is_pending, watcher.poll()):
+                    handle_result(image_path, *process_safely(image_path, processor, extractor, save_individual))
+        except KeyboardInterrupt:
+            print("\nDeteniendo la vigilancia...")
+        finally:
+            watcher.close()
+            processor.close()
+            artifacts.close()
+            sink.close()
+            if exporter is not None:
+                exporter.close()
+        return
+
+    pending = {}
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(output_dir,))
+    try:
+        while True:
+            for image_path in filter(is_pending, watcher.poll()):
+                pending[executor.submit(process_in_worker, image_path, save_individual)] = image_path
+
+            # Recoger los resultados que ya terminaron
+            for future in [f for f in pending if f.done()]:
+                image_path = pending.pop(future)
+                try:
+                    record, snapshot = future.result()
+                except Exception as e:
+                    print(f"  Error procesando {os.path.basename(image_path)}: {str(e)}")
+                    record, snapshot = None, None
+                handle_result(image_path, record, snapshot)
+    except KeyboardInterrupt:
+        print("\nDeteniendo la vigilancia...")
+    finally:
+        watcher.close()
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+        sink.close()
+        if exporter is not None:
+            exporter.close()
+
+def run_shared(input_dir, work_dir, workers=1, output_dir=None, save_individual=True, retry_failed=False):
+    """
+    Procesa input_dir como un nodo más de una cola de trabajo compartida (ver WorkQueue)
+
+    El nodo reserva las imágenes que ni están terminadas ni reservadas por otro nodo y las
+    procesa con run_batch, guardando cada resultado en su archivo de resultados. Cuando no
+    quedan imágenes libres espera a las que reservan otros nodos, retomando las de reservas
+    caducadas, hasta que todas tienen resultado. Cada nodo empieza en un punto distinto de
+    la lista para no competir por las mismas imágenes. Al final, main.py --merge combina
+    los resultados de todos los nodos.
+
+    Args:
+        input_dir (str): Directorio compartido de imágenes
+        work_dir (str): Directorio compartido de la cola
+        workers (int): Número de procesos trabajadores de este nodo (1 = en serie)
+        output_dir (str, optional): Directorio para guardar resultados.
+                                    Por defecto usa el valor de config.OUTPUT_DIR
+        save_individual (bool): Si se debe guardar un CSV individual por imagen
+        retry_failed (bool): Si las imágenes que fallaron deben volver a procesarse
+
+    Returns:
+        tuple: (imágenes procesadas por este nodo, imágenes con error)
+    """
+    image_files = get_image_files(input_dir)
+    queue = WorkQueue(input_dir, work_dir, node_id=NODE_ID or None)
+    print(f"Nodo {queue.node_id}: {len(image_files)} imágenes en {input_dir}, cola en {work_dir}")
+    if image_files:
+        start = int(hashlib.sha1(queue.node_id.encode('utf-8')).hexdigest(), 16) % len(image_files)
+        image_files = image_files[start:] + image_files[:start]
+
+    succeeded = 0
+    failed = 0
+    try:
+        # Las fallidas solo se reintentan en la primera vuelta: si vuelven a fallar, quedan así
+        retry = retry_failed
+        while True:
+            pending = queue.pending(image_files, retry)
+            if not pending:
+                break
+            claimed = queue.claimed(pending, retry)
+            first = next(claimed, None)
+            if first is None:
+                # Todas las pendientes están reservadas por otros nodos
+                time.sleep(SHARED_POLL_INTERVAL)
+                continue
+            batch_succeeded, batch_failed = run_batch(
+                itertools.chain([first], claimed), workers=workers, output_dir=output_dir,
+                save_individual=save_individual, on_result=queue.complete
+            )
+            succeeded += batch_succeeded
+            failed += batch_failed
+            retry = False
+    finally:
+        queue.close()
+
+    print(f"\nNodo {queue.node_id}: {succeeded} imágenes procesadas, {failed} con error, "
+          f"{queue.recovered} retomadas de reservas caducadas")
+    print("Todas las imágenes tienen resultado; se combinan con: python main.py --merge")
+    return succeeded, failed
@@ -0,0 +1,185 @@
+import cv2
+import numpy as np
+from app.config import CARD_WIDTH, CARD_DETECT_MAX_SIDE, CARD_MIN_AREA_RATIO
+
+# Relación de aspecto de una tarjeta ID-1 (85,60 x 53,98 mm), como la cédula colombiana
+CARD_ASPECT_RATIO = 85.60 / 53.98
+
+class CardDetector:
+    """Localiza la cédula dentro de la foto y la normaliza a una resolución fija"""
+
+    def __init__(self, width=None, max_side=None, min_area_ratio=None):
+        """
+        Inicializa el detector de tarjetas
+
+        Args:
+            width (int, optional): Lado largo de la tarjeta normalizada en píxeles.
+                                   Por defecto usa config.CARD_WIDTH
+            max_side (int, optional): Lado máximo de la copia reducida en la que se
+                                      buscan los bordes. Por defecto config.CARD_DETECT_MAX_SIDE
+            min_area_ratio (float, optional): Fracción mínima del encuadre que debe ocupar
+                                              la tarjeta. Por defecto config.CARD_MIN_AREA_RATIO
+        """
+        self.width = width or CARD_WIDTH
+        self.height = int(round(self.width / CARD_ASPECT_RATIO))
+        self.max_side = max_side or CARD_DETECT_MAX_SIDE
+        self.min_area_ratio = min_area_ratio or CARD_MIN_AREA_RATIO
+
+    def detect(self, image):
+        """
+        Busca el cuadrilátero de la tarjeta en la imagen
+
+        Args:
+            image (numpy.ndarray): Imagen original (BGR o escala de grises)
+
+        Returns:
+            numpy.ndarray: Esquinas de la tarjeta (4x2, coordenadas de la imagen original)
+                           o None si no se encontró
+        """
+        h, w = image.shape[:2]
+        scale = min(1.0, self.max_side / max(h, w))
+        small = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA) if scale < 1.0 else image
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if len(small.shape) == 3 else small
+
+        # Bordes de la tarjeta: desenfoque para ignorar el texto, Canny y cierre de huecos
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        edges = cv2.Canny(blurred, 50, 150)
+        edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, np.ones((5, 5), np.uint8))
+
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        frame_area = small.shape[0] * small.shape[1]
+
+        for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+            area = cv2.contourArea(contour)
+            if area < self.min_area_ratio * frame_area:
+                break
+
+            # Primero un polígono de 4 vértices; si no, el rectángulo mínimo siempre
+            # que el contorno sea casi rectangular (esquinas redondeadas o tapadas)
+            perimeter = cv2.arcLength(contour, True)
+            approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
+            if len(approx) == 4 and cv2.isContourConvex(approx):
+                quad = approx.reshape(4, 2).astype(np.float32)
+            else:
+                rect = cv2.minAreaRect(contour)
+                rect_area = rect[1][0] * rect[1][1]
+                if rect_area <= 0 or area / rect_area < 0.85:
+                    continue
+                quad = cv2.boxPoints(rect).astype(np.float32)
+
+            if self._has_card_aspect(quad):
+                return quad / scale
+
+        return None
+
+    @staticmethod
+    def _order_points(quad):
+        """
+        Ordena las esquinas como superior izquierda, superior derecha, inferior derecha e inferior izquierda
+
+        Args:
+            quad (numpy.ndarray): Esquinas en cualquier orden (4x2)
+
+        Returns:
+            numpy.ndarray: Esquinas ordenadas (4x2)
+        """
+        ordered = np.zeros((4, 2), dtype=np.float32)
+        sums = quad.sum(axis=1)
+        diffs = np.diff(quad, axis=1).ravel()
+        ordered[0] = quad[np.argmin(sums)]
+        ordered[2] = quad[np.argmax(sums)]
+        ordered[1] = quad[np.argmin(diffs)]
+        ordered[3] = quad[np.argmax(diffs)]
+        return ordered
+
+    @classmethod
+    def _side_lengths(cls, quad):
+        """Devuelve (ancho, alto) del cuadrilátero ordenado"""
+        tl, tr, br, bl = cls._order_points(quad)
+        width = max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl))
+        height = max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr))
+        return width, height
+
+    @classmethod
+    def _has_card_aspect(cls, quad):
+        """Comprueba que el cuadrilátero tenga aproximadamente la forma de una tarjeta"""
+        width, height = cls._side_lengths(quad)
+        if min(width, height) == 0:
+            return False
+        aspect = max(width, height) / min(width, height)
+        # Margen amplio para tolerar la perspectiva de una foto tomada con el móvil
+        return 1.2 <= aspect <= 2.1
+
+    def crop(self, image):
+        """
+        Recorta la tarjeta, corrige la perspectiva y la normaliza a una resolución fija
+
+        Args:
+            image (numpy.ndarray): Imagen original
+
+        Returns:
+            tuple: (imagen_de_la_tarjeta, encontrada, fracción_del_encuadre, fracción_de_píxeles)
+                   donde imagen_de_la_tarjeta es la imagen completa si no se encontró la
+                   tarjeta, fracción_del_encuadre es el área que ocupa la tarjeta en la
+                   foto y fracción_de_píxeles es el número de píxeles que quedan
+                   respecto a la imagen original
+        """
+        quad = self.detect(image)
+        if quad is None:
+            return image, False, 1.0, 1.0
+
+        card = self.warp(image, quad)
+        pixel_ratio = (card.shape[0] * card.shape[1]) / float(image.shape[0] * image.shape[1])
+        return card, True, self.frame_ratio(quad, image), pixel_ratio
+
+    def frame_ratio(self, quad, image):
+        """
+        Devuelve la fracción del encuadre que ocupa la tarjeta
+
+        Args:
+            quad (numpy.ndarray): Esquinas de la tarjeta en coordenadas de image (4x2)
+            image (numpy.ndarray): Imagen en la que se detectó
+
+        Returns:
+            float: Área de la tarjeta respecto al área de la imagen
+        """
+        return cv2.contourArea(self._order_points(quad)) / float(image.shape[0] * image.shape[1])
+
+    def long_side(self, quad):
+        """
+        Devuelve el lado largo de la tarjeta detectada, en píxeles de la imagen en que se detectó
+
+        Args:
+            quad (numpy.ndarray): Esquinas de la tarjeta (4x2)
+
+        Returns:
+            float: Longitud del lado largo
+        """
+        return max(self._side_lengths(quad))
+
+    def warp(self, image, quad):
+        """
+        Corrige la perspectiva de la tarjeta y la normaliza a una resolución fija
+
+        Args:
+            image (numpy.ndarray): Imagen de la que se recorta la tarjeta
+            quad (numpy.ndarray): Esquinas de la tarjeta en coordenadas de image (4x2)
+
+        Returns:
+            numpy.ndarray: Tarjeta normalizada (width x height, o al revés si está en vertical)
+        """
+        ordered = self._order_points(quad)
+        width, height = self._side_lengths(ordered)
+
+        # Conservar la orientación de la foto: la rotación se corrige después
+        if width >= height:
+            size = (self.width, self.height)
+        else:
+            size = (self.height, self.width)
+
+        destination = np.array(
+            [[0, 0], [size[0] - 1, 0], [size[0] - 1, size[1] - 1], [0, size[1] - 1]],
+            dtype=np.float32
+        )
+        matrix = cv2.getPerspectiveTransform(ordered, destination)
+        return cv2.warpPerspective(image, matrix, size, flags=cv2.INTER_AREA)
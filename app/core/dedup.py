@@ -0,0 +1,513 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import cv2
+import numpy as np
+from app.core.card_detector import CardDetector
+from app.core.DataExtractor import BACK_CODE_PATTERN
+from app.core.pairing import BACK_FIELDS, document_key
+from app.core.results import COLUMNS, ExtractedRecord
+from app.utils.decode import ImageSource, REDUCTIONS
+from app.utils.text import strip_accents
+from app.config import CARD_DETECTION
+
+# Se incluye en el tipo de cada huella: cambiarlo invalida el índice si cambia el cálculo
+FINGERPRINT_VERSION = "2"
+
+# La huella es la DCT de la imagen reducida a HASH_SIDE x HASH_SIDE píxeles: de ella se
+# toman las DCT_SIDE x DCT_SIDE frecuencias más bajas y cada una aporta un bit (mayor o
+# menor que la mediana), 256 bits en total
+HASH_SIDE = 64
+DCT_SIDE = 16
+HASH_BYTES = DCT_SIDE * DCT_SIDE // 8
+
+# Miniatura en escala de grises que se guarda para verificar los candidatos: la cédula
+# normalizada a este ancho
+THUMBNAIL_WIDTH = 384
+THUMBNAIL_QUALITY = 90
+
+# Verificación: la miniatura se divide en SIMILARITY_GRID x SIMILARITY_GRID bloques y cada
+# uno se busca en la otra con un margen de SIMILARITY_SHIFT píxeles tras alinearlas
+SIMILARITY_GRID = 4
+SIMILARITY_SHIFT = 3
+_ECC_CRITERIA = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 50, 1e-4)
+
+# Número de bits a 1 de cada byte, para la distancia de Hamming
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint16)
+
+# Campos que se leen de la cédula nueva para confirmar que es la de la misma persona (ver
+# fields_agree): el número y los nombres del anverso o el código del reverso, que lleva el número
+FRONT_CHECK_FIELDS = ('Documento', 'Apellido', 'Nombre')
+BACK_CHECK_FIELDS = ('Codigo',)
+_NON_LETTERS = re.compile(r'[^A-Z]')
+
+def perceptual_hash(gray):
+    """
+    Calcula la huella perceptual (pHash) de una imagen en escala de grises
+
+    Las frecuencias bajas de la DCT describen la composición de la imagen y apenas cambian
+    al volver a comprimirla, cambiar su tamaño o fotografiarla de nuevo con otra luz.
+
+    Args:
+        gray (numpy.ndarray): Imagen en escala de grises
+
+    Returns:
+        bytes: Huella de HASH_BYTES bytes
+    """
+    small = cv2.resize(gray, (HASH_SIDE, HASH_SIDE), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(np.float32(small))[:DCT_SIDE, :DCT_SIDE].ravel()
+    # La componente continua (brillo medio) no entra en la mediana
+    bits = low > np.median(low[1:])
+    return np.packbits(bits).tobytes()
+
+def similarity(reference, image):
+    """
+    Compara dos miniaturas del mismo tamaño bloque a bloque
+
+    La imagen se alinea con la de referencia (homografía por ECC, que absorbe los errores
+    del recorte y los cambios de brillo y contraste) y se correlacionan los detalles finos
+    de cada bloque. Descarta los candidatos que no se parecen, pero no basta para
+    confirmar uno: las cédulas comparten el diseño y dos personas distintas pueden dar
+    una correlación tan alta como dos fotos de la misma cédula. Por eso los candidatos
+    que pasan se confirman leyendo sus campos (ver fields_agree).
+
+    Args:
+        reference (numpy.ndarray): Miniatura guardada
+        image (numpy.ndarray): Miniatura de la imagen nueva
+
+    Returns:
+        float: Correlación del bloque menos parecido (1 = idénticas) o -1 si no se pudieron alinear
+    """
+    warp = np.eye(3, dtype=np.float32)
+    try:
+        _, warp = cv2.findTransformECC(np.float32(reference), np.float32(image), warp,
+                                       cv2.MOTION_HOMOGRAPHY, _ECC_CRITERIA, None, 5)
+    except cv2.error:
+        # No converge: las imágenes son demasiado distintas para alinearlas
+        return -1.0
+    h, w = reference.shape
+    aligned = cv2.warpPerspective(image, warp, (w, h), flags=cv2.INTER_LINEAR + cv2.WARP_INVERSE_MAP)
+
+    # Detalles finos (texto, trazos): la imagen menos su versión desenfocada
+    reference = np.float32(reference)
+    reference -= cv2.GaussianBlur(reference, (0, 0), 2)
+    aligned = np.float32(aligned)
+    aligned -= cv2.GaussianBlur(aligned, (0, 0), 2)
+
+    block_h, block_w = h // SIMILARITY_GRID, w // SIMILARITY_GRID
+    shift = SIMILARITY_SHIFT
+    scores = []
+    for y in range(0, block_h * SIMILARITY_GRID, block_h):
+        for x in range(0, block_w * SIMILARITY_GRID, block_w):
+            block = aligned[y + shift:y + block_h - shift, x + shift:x + block_w - shift]
+            if block.std() < 1.0:
+                # Bloque liso: no aporta información
+                continue
+            region = reference[y:y + block_h, x:x + block_w]
+            scores.append(float(cv2.matchTemplate(region, block, cv2.TM_CCOEFF_NORMED).max()))
+    return min(scores) if scores else -1.0
+
+def check_fields(row):
+    """
+    Campos de la plantilla que hay que leer para comparar una cédula con una fila extraída
+
+    Args:
+        row (dict): Fila de datos extraídos de la imagen ya procesada
+
+    Returns:
+        tuple: Nombres de los campos (ver app.core.layout)
+    """
+    return BACK_CHECK_FIELDS if any(row.get(column) for column in BACK_FIELDS) else FRONT_CHECK_FIELDS
+
+def fields_agree(row, fields):
+    """
+    Comprueba que los datos variables de una cédula coinciden con los de una fila extraída
+
+    Todas las cédulas comparten el diseño impreso: lo único que distingue la de una persona
+    de la de otra son sus datos. El número de documento tiene que coincidir siempre (una
+    fila sin número no se puede confirmar) y, en el anverso, también los nombres que tenga
+    la fila.
+
+    Args:
+        row (dict): Fila de datos extraídos de la imagen ya procesada
+        fields (dict): Texto leído de los campos check_fields(row) de la imagen nueva
+
+    Returns:
+        bool: True si es la misma cédula
+    """
+    documento = document_key(row)
+    if not documento:
+        return False
+    if 'Codigo' in fields:
+        match = BACK_CODE_PATTERN.search(fields['Codigo'].upper())
+        return match is not None and match.group(1).lstrip('0') == documento
+    if document_key({'Documento': fields.get('Documento')}) != documento:
+        return False
+    letters = lambda value: _NON_LETTERS.sub('', strip_accents(value or '').upper())
+    return all(letters(fields.get(name)) == letters(row.get(name))
+               for name in ('Apellido', 'Nombre') if letters(row.get(name)))
+
+def reused_since(path, started, image_paths):
+    """
+    Resume las imágenes de un lote que reutilizaron el resultado de otra
+
+    Args:
+        path (str): Ruta al archivo SQLite del índice
+        started (float): Inicio del lote (time.time())
+        image_paths (list): Rutas de las imágenes del lote
+
+    Returns:
+        tuple: (imágenes reutilizadas, segundos de procesamiento que costaron sus originales)
+    """
+    if not os.path.exists(path):
+        return 0, 0.0
+    paths = {os.path.abspath(image_path) for image_path in image_paths}
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        rows = conn.execute(
+            "SELECT image_path, seconds FROM dedup_reuses WHERE created >= ?", (started,)
+        ).fetchall()
+    finally:
+        conn.close()
+    reused = [seconds for image_path, seconds in rows if image_path in paths]
+    return len(reused), sum(reused)
+
+class Fingerprint:
+    """Huella perceptual de una cédula y su miniatura para verificar los candidatos"""
+
+    __slots__ = ('kind', 'hash', 'rotated', 'thumbnail', 'image_path', 'quad')
+
+    def __init__(self, kind, hash, rotated, thumbnail, image_path, quad):
+        """
+        Args:
+            kind (str): 'card/<versión>'
+            hash (bytes): Huella perceptual
+            rotated (bytes): Huella de la imagen girada 180 grados
+            thumbnail (numpy.ndarray): Miniatura en escala de grises
+            image_path (str): Ruta a la imagen
+            quad (numpy.ndarray): Esquinas de la cédula en la foto completa (4x2)
+        """
+        self.kind = kind
+        self.hash = hash
+        self.rotated = rotated
+        self.thumbnail = thumbnail
+        self.image_path = image_path
+        self.quad = quad
+
+class Duplicate:
+    """Imagen ya procesada que contiene la misma cédula"""
+
+    __slots__ = ('image_path', 'record', 'distance', 'similarity', 'seconds')
+
+    def __init__(self, image_path, record, distance, similarity, seconds):
+        """
+        Args:
+            image_path (str): Ruta de la imagen procesada
+            record (ExtractedRecord): Datos que se extrajeron de ella
+            distance (int): Distancia de Hamming entre las huellas
+            similarity (float): Resultado de la verificación
+            seconds (float): Segundos que costó procesarla
+        """
+        self.image_path = image_path
+        self.record = record
+        self.distance = distance
+        self.similarity = similarity
+        self.seconds = seconds
+
+class DedupIndex:
+    """
+    Índice persistente de cédulas ya procesadas, para reutilizar sus resultados
+
+    Reconoce una cédula que se vuelve a enviar (fotografiada de nuevo, comprimida otra vez
+    o con otro tamaño) en tres pasos: la huella perceptual selecciona los candidatos más
+    cercanos con una sola operación vectorizada sobre todo el índice (las huellas se
+    mantienen en memoria), las miniaturas descartan los que no se parecen (ver similarity)
+    y, como todas las cédulas comparten el diseño, el número de documento y los nombres
+    se leen de la cédula nueva y se comparan con los del candidato (ver fields_agree).
+    Solo se indexan fotos en las que se detecta la cédula. Las huellas, miniaturas y
+    resultados se guardan en SQLite, que comparten los procesos trabajadores; cada
+    reutilización queda registrada.
+    """
+
+    def __init__(self, path, max_distance, min_similarity, candidates=2):
+        """
+        Abre (o crea) el índice
+
+        Args:
+            path (str): Ruta al archivo SQLite del índice
+            max_distance (int): Distancia de Hamming máxima (en bits, de 256) de un candidato
+            min_similarity (float): Correlación mínima de la verificación (0-1)
+            candidates (int): Candidatos más cercanos que se verifican como mucho
+        """
+        self.path = path
+        self.max_distance = max_distance
+        self.min_similarity = min_similarity
+        self.candidates = max(1, candidates)
+        self.hits = 0
+        self.detector = CardDetector(width=THUMBNAIL_WIDTH) if CARD_DETECTION else None
+        # Cédula con la resolución del OCR, para leer los campos de los candidatos
+        self.reader = CardDetector()
+
+        self._lock = threading.Lock()
+        self._last_id = 0
+        # Por tipo de huella: identificadores de fila y huellas como bytes consecutivos
+        self._ids = {}
+        self._hashes = {}
+        # Matriz (huellas x HASH_BYTES) de cada tipo, que se rehace solo cuando llegan huellas nuevas
+        self._matrices = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # El modo servicio consulta el índice desde los hilos de las peticiones
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS dedup_index ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " kind TEXT NOT NULL,"
+            " hash BLOB NOT NULL,"
+            " thumbnail BLOB NOT NULL,"
+            " image_path TEXT NOT NULL,"
+            " record TEXT NOT NULL,"
+            " seconds REAL NOT NULL,"
+            " created REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS dedup_reuses ("
+            " image_path TEXT NOT NULL,"
+            " original_path TEXT NOT NULL,"
+            " distance INTEGER NOT NULL,"
+            " similarity REAL NOT NULL,"
+            " seconds REAL NOT NULL,"
+            " created REAL NOT NULL)"
+        )
+        self.conn.commit()
+        self._refresh()
+
+    def fingerprint(self, image_path):
+        """
+        Calcula la huella de la cédula de una foto
+
+        La cédula se busca en una copia JPEG reducida en escala de grises y se normaliza a
+        un tamaño fijo y en horizontal, así que la huella no depende de la resolución, el
+        encuadre ni la perspectiva de la foto. Sin la cédula recortada no se pueden leer
+        sus campos para confirmar un candidato, así que esas fotos no tienen huella.
+
+        Args:
+            image_path (str): Ruta a la imagen
+
+        Returns:
+            Fingerprint: Huella de la imagen o None si no se pudo leer o no se detectó la cédula
+        """
+        if self.detector is None:
+            return None
+        try:
+            source = ImageSource(image_path)
+        except OSError:
+            return None
+        reduction = source.reduction_for(max(self.detector.max_side, THUMBNAIL_WIDTH))
+        preview = source.decode(reduction, gray=True)
+        source.release()
+        if preview is None:
+            return None
+        quad = self.detector.detect(preview)
+        if quad is None:
+            return None
+
+        thumbnail = self.detector.warp(preview, quad)
+        if thumbnail.shape[0] > thumbnail.shape[1]:
+            thumbnail = cv2.rotate(thumbnail, cv2.ROTATE_90_CLOCKWISE)
+
+        # La misma cédula puede llegar girada 180 grados: se busca también esa huella
+        return Fingerprint(f"card/{FINGERPRINT_VERSION}", perceptual_hash(thumbnail),
+                           perceptual_hash(cv2.rotate(thumbnail, cv2.ROTATE_180)), thumbnail,
+                           image_path, quad * reduction)
+
+    def _card(self, fingerprint):
+        """
+        Recorta la cédula de una foto con la resolución del OCR, en la misma orientación que la miniatura
+
+        Args:
+            fingerprint (Fingerprint): Huella de la foto
+
+        Returns:
+            numpy.ndarray: Cédula en escala de grises o None si no se pudo leer la foto
+        """
+        try:
+            source = ImageSource(fingerprint.image_path)
+        except OSError:
+            return None
+        card_side = self.reader.long_side(fingerprint.quad)
+        reduction = next((r for r in REDUCTIONS if card_side / r >= self.reader.width), 1)
+        image = source.decode(reduction, gray=True)
+        source.release()
+        if image is None:
+            return None
+        card = self.reader.warp(image, fingerprint.quad / reduction)
+        if card.shape[0] > card.shape[1]:
+            card = cv2.rotate(card, cv2.ROTATE_90_CLOCKWISE)
+        return card
+
+    def _same_person(self, fingerprint, row, read_fields):
+        """
+        Lee los campos variables de la cédula nueva y los compara con los del candidato
+
+        No se sabe qué orientación de la miniatura es la derecha: se prueban las dos.
+
+        Args:
+            fingerprint (Fingerprint): Huella de la imagen nueva
+            row (dict): Fila de datos extraídos del candidato
+            read_fields (callable): Función (cédula, nombres) -> {nombre: texto} que reconoce
+                                    campos de la plantilla (ImageProcessor.read_fields)
+
+        Returns:
+            bool: True si los campos coinciden
+        """
+        card = self._card(fingerprint)
+        if card is None:
+            return False
+        names = check_fields(row)
+        for image in (card, cv2.rotate(card, cv2.ROTATE_180)):
+            if fields_agree(row, read_fields(image, names)):
+                return True
+        return False
+
+    def _refresh(self):
+        """Carga las huellas añadidas desde la última lectura (también por otros procesos)"""
+        rows = self.conn.execute(
+            "SELECT id, kind, hash FROM dedup_index WHERE id > ? ORDER BY id", (self._last_id,)
+        ).fetchall()
+        for row_id, kind, hash in rows:
+            self._ids.setdefault(kind, []).append(row_id)
+            self._hashes.setdefault(kind, bytearray()).extend(hash)
+            self._matrices.pop(kind, None)
+            self._last_id = row_id
+
+    def find(self, fingerprint, read_fields):
+        """
+        Busca una imagen ya procesada con la misma cédula
+
+        Las entradas de la propia imagen se ignoran, para que volver a procesarla (--force)
+        repita el OCR.
+
+        Args:
+            fingerprint (Fingerprint): Huella de la imagen
+            read_fields (callable): Función (cédula, nombres) -> {nombre: texto} con la que
+                                    se leen los campos que confirman un candidato
+                                    (ImageProcessor.read_fields)
+
+        Returns:
+            Duplicate: Imagen más parecida que supera la verificación o None si no hay ninguna
+        """
+        with self._lock:
+            self._refresh()
+            ids = self._ids.get(fingerprint.kind)
+            if not ids:
+                return None
+
+            hashes = self._matrices.get(fingerprint.kind)
+            if hashes is None:
+                hashes = np.frombuffer(bytes(self._hashes[fingerprint.kind]), dtype=np.uint8).reshape(-1, HASH_BYTES)
+                self._matrices[fingerprint.kind] = hashes
+            direct = _POPCOUNT[hashes ^ np.frombuffer(fingerprint.hash, dtype=np.uint8)].sum(axis=1)
+            rotated = _POPCOUNT[hashes ^ np.frombuffer(fingerprint.rotated, dtype=np.uint8)].sum(axis=1)
+            distances = np.minimum(direct, rotated)
+
+            # Uno más de los que se verifican, por si el más cercano es la propia imagen
+            nearest = np.argsort(distances, kind='stable')[:self.candidates + 1]
+            candidates = []
+            for i in nearest:
+                if distances[i] > self.max_distance:
+                    break
+                row = self.conn.execute(
+                    "SELECT image_path, thumbnail, record, seconds FROM dedup_index WHERE id = ?", (ids[i],)
+                ).fetchone()
+                candidates.append((int(distances[i]), bool(rotated[i] < direct[i]), row))
+
+        own_path = os.path.abspath(fingerprint.image_path)
+        checked = 0
+        for distance, is_rotated, (candidate_path, thumbnail, record, seconds) in candidates:
+            if candidate_path == own_path:
+                continue
+            if checked == self.candidates:
+                break
+            checked += 1
+
+            reference = cv2.imdecode(np.frombuffer(thumbnail, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+            image = cv2.rotate(fingerprint.thumbnail, cv2.ROTATE_180) if is_rotated else fingerprint.thumbnail
+            if reference is None or reference.shape != image.shape:
+                continue
+            score = similarity(reference, image)
+            if score < self.min_similarity:
+                continue
+            row = json.loads(record)
+            if self._same_person(fingerprint, row, read_fields):
+                self.hits += 1
+                return Duplicate(candidate_path, ExtractedRecord.from_dict(row), distance, score, seconds)
+        return None
+
+    def add(self, image_path, fingerprint, record, seconds):
+        """
+        Guarda la huella de una imagen procesada con sus datos extraídos
+
+        Solo se guardan los registros con algún campo reconocido: un resultado vacío no
+        debe reutilizarse para las siguientes fotos de la misma cédula.
+
+        Args:
+            image_path (str): Ruta a la imagen
+            fingerprint (Fingerprint): Huella de la imagen
+            record (ExtractedRecord): Datos extraídos
+            seconds (float): Segundos que costó procesarla
+        """
+        row = record.as_dict()
+        if not any(row[column] for column in COLUMNS if column != 'Timestamp'):
+            return
+        ok, thumbnail = cv2.imencode('.jpg', fingerprint.thumbnail, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY])
+        if not ok:
+            return
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO dedup_index (kind, hash, thumbnail, image_path, record, seconds, created)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (fingerprint.kind, fingerprint.hash, thumbnail.tobytes(), os.path.abspath(image_path),
+                 json.dumps(row, ensure_ascii=False), seconds, time.time())
+            )
+            self.conn.commit()
+            self._refresh()
+
+    def record_reuse(self, image_path, duplicate):
+        """
+        Registra que una imagen reutilizó el resultado de otra
+
+        Args:
+            image_path (str): Ruta de la imagen nueva
+            duplicate (Duplicate): Imagen cuyo resultado se reutilizó
+        """
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO dedup_reuses (image_path, original_path, distance, similarity, seconds, created)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(image_path), duplicate.image_path, duplicate.distance,
+                 duplicate.similarity, duplicate.seconds, time.time())
+            )
+            self.conn.commit()
+
+    def stats(self):
+        """
+        Devuelve los contadores del índice
+
+        Returns:
+            dict: Duplicados encontrados y cédulas almacenadas
+        """
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM dedup_index").fetchone()[0]
+        return {'hits': self.hits, 'entries': entries}
+
+    def close(self):
+        """Cierra la conexión con el archivo del índice"""
+        self.conn.close()
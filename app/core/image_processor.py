@@ -1,32 +1,636 @@
 import cv2
 import os
+import re
+import json
 import numpy as np
-import pytesseract
 from datetime import datetime
 import imutils
-from app.config import TESSERACT_CMD, OUTPUT_DIR, OCR_CONFIG
+from app.config import (OUTPUT_DIR, OCR_CONFIG, OCR_BACKEND, OCR_CACHE_ENABLED, OCR_CACHE_PATH,
+                        OCR_CACHE_MAX_MB, ORIENTATION_MAX_WIDTH, OSD_MIN_CONFIDENCE, MIN_CONFIDENCE,
+                        OCR_MIN_KEYWORDS, OCR_FRONT_LADDER, OCR_REVERSE_LADDER, CARD_DETECTION,
+                        LAYOUT_MODE, LOW_MEMORY, LOW_MEMORY_MAX_SIDE, OCR_CONCURRENCY,
+                        OCR_MEMO_SIZE, DEDUP_ENABLED, DEDUP_INDEX_PATH, DEDUP_MAX_DISTANCE,
+                        DEDUP_MIN_SIMILARITY, DEDUP_CANDIDATES)
+from app.core.ocr_cache import OCRCache, OCRMemo
+from app.core.dedup import DedupIndex
+from app.core.ocr_backend import create_backend, run_jobs
+from app.core.card_detector import CardDetector
+from app.core.layout import get_template, crop_field
+from app.utils.helpers import resize_image
+from app.utils.decode import ImageSource, REDUCTIONS
+from app.utils.artifacts import ArtifactWriter
+from app.utils.text import KeywordScorer
+from app.utils.metrics import Metrics, instrumented
 
-# Configurar pytesseract si se ha especificado una ruta
-if TESSERACT_CMD:
-    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+# Relación mínima entre la longitud de líneas horizontales y verticales para decidir
+# la dirección del texto
+TEXT_LINE_RATIO = 2.0
+
+# Palabras clave comunes en cédulas colombianas (para elegir la orientación)
+ORIENTATION_KEYWORDS = ['REPUBLICA', 'COLOMBIA', 'CEDULA', 'CIUDADANIA', 'IDENTIDAD', 'PERSONAL', 
+                        'FECHA', 'NACIMIENTO', 'EXPEDICION', 'SEXO', 'LUGAR']
+
+# Palabras clave que aparecen en el reverso y en el anverso de cédulas colombianas
+REVERSE_KEYWORDS = ['NACIMIENTO', 'FECHA', 'SEXO', 'BLOOD', 'GRUPO', 'SANGUINEO', 'RH',
+                    'EXPEDICION', 'LUGAR', 'ESTATURA']
+FRONT_KEYWORDS = ['REPUBLICA', 'COLOMBIA', 'CEDULA', 'CIUDADANIA']
+
+# Palabras clave con las que se evalúa cada peldaño de la escalera de estrategias OCR
+FRONT_LADDER_KEYWORDS = ['REPUBLICA', 'COLOMBIA', 'CEDULA', 'CIUDADANIA', 'IDENTIDAD', 'PERSONAL']
+REVERSE_LADDER_KEYWORDS = ['FECHA', 'NACIMIENTO', 'EXPEDICION', 'SEXO', 'LUGAR', 'ESTATURA', 'GRUPO', 'RH']
+
+# Contadores de palabras clave (una sola pasada por texto)
+ORIENTATION_SCORER = KeywordScorer(ORIENTATION_KEYWORDS)
+SIDE_SCORER = KeywordScorer(REVERSE_KEYWORDS, FRONT_KEYWORDS)
+FRONT_LADDER_SCORER = KeywordScorer(FRONT_LADDER_KEYWORDS)
+REVERSE_LADDER_SCORER = KeywordScorer(REVERSE_LADDER_KEYWORDS)
+
+# Expresiones regulares compiladas una sola vez
+OSD_ROTATE_PATTERN = re.compile(r"Rotate:\s*(\d+)")
+OSD_CONFIDENCE_PATTERN = re.compile(r"Orientation confidence:\s*([\d.]+)")
+YEAR_PATTERN = re.compile(r"\d{4}")
+NON_DIGITS_PATTERN = re.compile(r"\D")
+
+# Configuración de Tesseract con la que se reconoce cada orientación candidata
+ORIENTATION_OCR_CONFIG = '--psm 11 --oem 3 -l spa'
+
+# Variantes de imagen que puede usar un peldaño de la escalera de estrategias OCR
+LADDER_VARIANTS = ('processed', 'inverted', 'rotated', 'negative')
+
+def parse_ladder(spec):
+    """
+    Interpreta la definición de una escalera de estrategias OCR
+    
+    Args:
+        spec (str): Peldaños separados por comas con el formato variante:psm,
+                    p. ej. "processed:3,processed:4,negative:3". Las variantes
+                    válidas son processed, inverted, rotated y negative
+        
+    Returns:
+        list: Lista de tuplas (variante, psm) en orden de ejecución
+    """
+    ladder = []
+    for step in spec.split(','):
+        step = step.strip()
+        if not step:
+            continue
+        variant, psm = step.split(':')
+        variant = variant.strip().lower()
+        if variant not in LADDER_VARIANTS:
+            raise ValueError(f"Variante desconocida en la escalera OCR: {variant}")
+        ladder.append((variant, int(psm)))
+    return ladder
+
+class ImageAnalysis:
+    """Resultado de la etapa de análisis de una imagen: orientación y lado de la cédula"""
+    
+    def __init__(self, image_path, original, image, angle, is_reverse, method, text,
+                 card_found=False, card_area_ratio=1.0, pixel_ratio=1.0):
+        """
+        Crea el resultado del análisis
+        
+        Args:
+            image_path (str): Ruta a la imagen analizada
+            original (numpy.ndarray): Imagen decodificada, sin rotar
+            image (numpy.ndarray): Imagen con la orientación corregida
+            angle (int): Rotación aplicada en sentido horario (0, 90, 180 o 270)
+            is_reverse (bool): Si es el reverso de la cédula
+            method (str): Cómo se decidió la orientación ("osd" o "keywords")
+            text (str): Texto --psm 11 de la orientación elegida (None si no hizo falta)
+            card_found (bool): Si se localizó y recortó la cédula dentro de la foto
+            card_area_ratio (float): Fracción de la foto que ocupa la cédula
+            pixel_ratio (float): Píxeles de la imagen de trabajo respecto a la foto original
+        """
+        self.image_path = image_path
+        self.original = original
+        self.image = image
+        self.angle = angle
+        self.is_reverse = is_reverse
+        self.method = method
+        self.text = text
+        self.card_found = card_found
+        self.card_area_ratio = card_area_ratio
+        self.pixel_ratio = pixel_ratio
+
+class ImageResult:
+    """Resultado del OCR de una imagen (ver ImageProcessor.process_images)"""
+    
+    def __init__(self, image_path):
+        """
+        Crea un resultado vacío
+        
+        Args:
+            image_path (str): Ruta a la imagen
+        """
+        self.image_path = image_path
+        self.analysis = None      # ImageAnalysis (None si no se pudo cargar la imagen)
+        self.text = None          # Mejor texto extraído (None si hubo error)
+        self.processed = None     # Imagen binarizada
+        self.annotated = None     # Imagen con anotaciones (solo si se guardan intermedias)
+        self.fields = None        # Campos del modo plantilla (None si se usó la escalera)
+        self.passes = 0           # Pasadas OCR hechas
+        self.strategy = None      # Estrategia ganadora
+        self.source_hash = None   # Hash SHA-256 del archivo (None si no se pudo leer)
+
+class _LadderRun:
+    """Avance de la escalera de estrategias OCR de una imagen, peldaño a peldaño"""
+    
+    def __init__(self, ladder, scorer, variants, branch, source_hash, branch_prefix, save_images):
+        """
+        Prepara la escalera de una imagen
+        
+        Args:
+            ladder (list): Peldaños (variante, psm)
+            scorer (KeywordScorer): Palabras clave con las que se evalúa cada pasada
+            variants (dict): Imágenes de cada variante ('processed', 'inverted', 'rotated')
+            branch (str): Rama de la caché de la variante 'processed' ("front" o "reverse")
+            source_hash (str): Hash de la imagen de origen para la caché (None sin caché)
+            branch_prefix (str): Prefijo de las ramas de la caché de la imagen
+            save_images (bool): Si se guardan las imágenes intermedias de la imagen
+        """
+        self.ladder = ladder
+        self.scorer = scorer
+        self.variants = variants
+        self.branch = branch
+        self.source_hash = source_hash
+        self.branch_prefix = branch_prefix
+        self.save_images = save_images
+        self.position = 0
+        self.current = None
+        self.passes = 0
+        self.best = None
+        self.extracted_text = ""
+        self.done = False
+        self.error = None
+        
+    def next_job(self):
+        """
+        Devuelve el trabajo OCR del siguiente peldaño
+        
+        Returns:
+            tuple: (imagen, configuración, rama, hash_de_origen, prefijo_de_rama), o None si
+                   la escalera terminó
+        """
+        while not self.done and self.position < len(self.ladder):
+            rung = self.ladder[self.position]
+            self.position += 1
+            job = self._make_job(*rung)
+            if job is None:
+                continue
+            self.current = rung
+            return job
+        self.done = True
+        return None
+        
+    def remaining_jobs(self):
+        """
+        Devuelve los trabajos OCR de todos los peldaños que faltan, sin avanzar la escalera
+        
+        Returns:
+            list: Tuplas (peldaño, trabajo) en orden, con el trabajo como en next_job
+        """
+        jobs = []
+        for rung in self.ladder[self.position:]:
+            job = self._make_job(*rung)
+            if job is not None:
+                jobs.append((rung, job))
+        return jobs
+        
+    def _make_job(self, variant, psm):
+        """Trabajo OCR de un peldaño, o None si su variante no existe para esta imagen"""
+        if variant == 'negative' and 'negative' not in self.variants:
+            # El negativo de la imagen a veces funciona mejor (en el reverso ya
+            # existe: es la imagen invertida, no hace falta otra copia)
+            inverted = self.variants.get('inverted')
+            if inverted is not None:
+                self.variants['negative'] = inverted
+            else:
+                self.variants['negative'] = cv2.bitwise_not(self.variants['processed'])
+        image = self.variants.get(variant)
+        if image is None:
+            return None
+            
+        config = f'--psm {psm} --oem 3 -l spa'
+        branch = self.branch if variant == 'processed' else variant
+        return image, config, branch, self.source_hash, self.branch_prefix
+        
+    def accepts(self, text, confidence):
+        """Indica si un resultado es suficientemente bueno para terminar la escalera"""
+        return self._is_good(self.scorer.score(text), confidence)
+        
+    @staticmethod
+    def _is_good(score, confidence):
+        """Regla de salida de la escalera a partir de la puntuación ya calculada"""
+        return score >= OCR_MIN_KEYWORDS and confidence >= MIN_CONFIDENCE
+        
+    def add_result(self, text, confidence, rung=None):
+        """
+        Evalúa el resultado del peldaño actual
+        
+        Args:
+            text (str): Texto extraído
+            confidence (float): Confianza media de Tesseract
+            rung (tuple, optional): Peldaño (variante, psm) del resultado. Por defecto
+                                    el último devuelto por next_job
+        """
+        if rung is not None:
+            self.current = rung
+        variant, psm = self.current
+        self.passes += 1
+        
+        # Evaluar calidad del texto extraído
+        score = self.scorer.score(text)
+        label = f"{variant.upper()} PSM {psm}"
+        
+        # Guardar el mejor resultado (más palabras clave; a igualdad, más confianza)
+        if self.best is None or (score, confidence) > (self.best[0], self.best[1]):
+            self.best = (score, confidence, text, label)
+            
+        # Acumular todo el texto
+        self.extracted_text += f"\n\n--- {label} (confianza {confidence:.0f}) ---\n" + text
+        
+        # Salir en cuanto el resultado es suficientemente bueno
+        if self._is_good(score, confidence):
+            self.done = True
 
 class ImageProcessor:
     """Clase para procesar imágenes de documentos de identidad colombianos"""
     
-    def __init__(self, output_dir=None):
+    def __init__(self, output_dir=None, cache=None, backend=None, artifacts=None, metrics=None,
+                 low_memory=None, memo=None, dedup=None):
         """
         Inicializa el procesador de imágenes
         
         Args:
             output_dir (str, optional): Directorio para guardar resultados.
                                         Por defecto usa el valor de config.OUTPUT_DIR
+            cache (OCRCache, optional): Caché de resultados OCR. Por defecto se crea
+                                        una según config.OCR_CACHE_* si está habilitada;
+                                        False la desactiva
+            backend (OCRBackend, optional): Motor OCR. Por defecto se crea el indicado
+                                            en config.OCR_BACKEND
+            artifacts (ArtifactWriter, optional): Escritor de artefactos de depuración.
+                                                  Por defecto uno con config.ARTIFACT_LEVEL
+            metrics (Metrics, optional): Métricas por etapa. Por defecto unas según
+                                         config.METRICS_ENABLED
+            low_memory (bool, optional): Modo de memoria acotada (escala de grises, foto
+                                         limitada y sin copias de depuración). Por defecto
+                                         config.LOW_MEMORY
+            memo (OCRMemo, optional): Memo de llamadas OCR de la ejecución. Por defecto se
+                                      crea uno de config.OCR_MEMO_SIZE entradas; False lo
+                                      desactiva
+            dedup (DedupIndex, optional): Índice de cédulas ya procesadas que se consulta antes
+                                          de procesar cada imagen (ver app.core.batch). Por
+                                          defecto se crea uno según config.DEDUP_* si está
+                                          habilitado; False lo desactiva
         """
         self.output_dir = output_dir or OUTPUT_DIR
         os.makedirs(self.output_dir, exist_ok=True)
+        # El escritor de artefactos se cierra en close() solo si lo crea este procesador
+        self._owns_artifacts = artifacts is None
+        self.artifacts = artifacts or ArtifactWriter(self.output_dir)
+        self.metrics = metrics or Metrics()
+        self.low_memory = LOW_MEMORY if low_memory is None else low_memory
+        
+        if cache is None and OCR_CACHE_ENABLED:
+            cache = OCRCache(OCR_CACHE_PATH, OCR_CACHE_MAX_MB * 1024 * 1024)
+        self.cache = cache or None
+        
+        # Memo de la ejecución: las llamadas con los mismos píxeles y configuración se hacen una vez
+        if memo is None and OCR_MEMO_SIZE > 0:
+            memo = OCRMemo(OCR_MEMO_SIZE)
+        self.memo = memo or None
+        
+        # Cédulas ya procesadas: sus resultados se reutilizan para las fotos repetidas
+        if dedup is None and DEDUP_ENABLED:
+            dedup = DedupIndex(DEDUP_INDEX_PATH, DEDUP_MAX_DISTANCE, DEDUP_MIN_SIMILARITY, DEDUP_CANDIDATES)
+        self.dedup = dedup or None
+        
+        # Motor OCR propio de este procesador (uno por proceso trabajador)
+        self.ocr = backend or create_backend(OCR_BACKEND)
+        
+        # Imagen de origen actual (su hash forma parte de la clave de la caché)
+        self._source_path = None
+        self._source_hash = None
+        
+        # Prefijo de las ramas de la caché ("card1400/" si se trabaja con la cédula recortada)
+        self._branch_prefix = ""
+        
+        # Detector de la cédula dentro de la foto (None si está desactivado)
+        self.card_detector = CardDetector() if CARD_DETECTION else None
+        
+        # Resultado de la etapa de análisis de la última imagen procesada
+        self.last_analysis = None
+        
+        # Escaleras de estrategias OCR y estadísticas de la última imagen
+        self.front_ladder = parse_ladder(OCR_FRONT_LADDER)
+        self.reverse_ladder = parse_ladder(OCR_REVERSE_LADDER)
+        self.last_passes = 0
+        self.last_strategy = None
+        
+        # Campos reconocidos en modo plantilla (None si se usó el OCR de página completa)
+        self.last_fields = None
+        
+    def close(self):
+        """
+        Cierra la caché OCR, el índice de cédulas repetidas y, si es propio, el escritor de
+        artefactos, escribiendo lo pendiente
+        """
+        if self.cache is not None:
+            self.cache.close()
+        if self.dedup is not None:
+            self.dedup.close()
+        if self._owns_artifacts:
+            self.artifacts.close()
+        
+    def _set_source(self, image_path, source=None):
+        """
+        Registra la imagen de origen de las siguientes llamadas OCR
+        
+        El hash también se entrega con el resultado (ImageResult.source_hash), así que se
+        calcula aunque no haya caché si el archivo ya está leído.
+        
+        Args:
+            image_path (str): Ruta a la imagen original
+            source (ImageSource, optional): Archivo ya leído; su hash se calcula sobre
+                                            esos bytes sin volver a leer el archivo
+        """
+        if image_path == self._source_path or (source is None and self.cache is None):
+            return
+        self._source_path = image_path
+        try:
+            self._source_hash = source.digest if source is not None else OCRCache.hash_file(image_path)
+        except OSError:
+            self._source_hash = None
+            
+    def _ocr(self, image, config, branch):
+        """
+        Ejecuta Tesseract sobre una imagen, consultando primero la caché OCR
+        
+        Args:
+            image (numpy.ndarray): Imagen a reconocer
+            config (str): Configuración de Tesseract
+            branch (str): Rama de preprocesamiento de la que sale la imagen
+            
+        Returns:
+            str: Texto extraído
+        """
+        return self._ocr_many([(image, config, branch)])[0]
+        
+    def _ocr_many(self, jobs):
+        """
+        Ejecuta Tesseract sobre varias imágenes de la imagen de origen actual
+        
+        Los trabajos que no están en el memo ni en la caché se agrupan por configuración
+        (ver ocr_backend.run_jobs).
+        
+        Args:
+            jobs (list): Tuplas (imagen, configuración, rama)
+            
+        Returns:
+            list: Texto extraído de cada trabajo, en el mismo orden
+        """
+        source_hash = self._source_hash if self.cache is not None else None
+        jobs = [(image, config, branch, source_hash, self._branch_prefix) for image, config, branch in jobs]
+        results, keys, missing, repeated = self._lookup(jobs, data=False)
+        if missing:
+            self.metrics.incr('tesseract_calls', len(missing))
+            if len(missing) == 1:
+                image, config = jobs[missing[0]][:2]
+                outputs = [self.ocr.image_to_string(image, config)]
+            else:
+                outputs = run_jobs(self.ocr, [jobs[i][:2] for i in missing])
+            for i, text in zip(missing, outputs):
+                results[i] = self._store(keys[i], text, data=False)
+        for i, source in repeated.items():
+            results[i] = results[source]
+        return results
+        
+    def _ocr_data(self, image, config, branch):
+        """
+        Ejecuta Tesseract con confianza por palabra, consultando primero la caché OCR
+        
+        Args:
+            image (numpy.ndarray): Imagen a reconocer
+            config (str): Configuración de Tesseract
+            branch (str): Rama de preprocesamiento de la que sale la imagen
+            
+        Returns:
+            tuple: (texto_extraído, confianza_media) con la confianza entre 0 y 100
+                   (-1 si no se reconoció ninguna palabra)
+        """
+        source_hash = self._source_hash if self.cache is not None else None
+        return self._ocr_data_many([(image, config, branch, source_hash, self._branch_prefix)])[0]
+        
+    def _ocr_data_many(self, jobs):
+        """
+        Ejecuta varios reconocimientos con confianza por palabra, consultando primero la caché OCR
+        
+        Los trabajos que no están en el memo ni en la caché se agrupan por configuración
+        (ver ocr_backend.run_jobs): con pytesseract, cada configuración se reconoce con
+        un solo proceso tesseract para todas sus imágenes.
+        
+        Args:
+            jobs (list): Tuplas (imagen, configuración, rama, hash_de_origen, prefijo_de_rama);
+                         el hash (None sin caché) y el prefijo forman la clave de la caché
+            
+        Returns:
+            list: Tuplas (texto_extraído, confianza_media) en el mismo orden que jobs
+        """
+        results, keys, missing, repeated = self._lookup(jobs, data=True)
+        if missing:
+            self.metrics.incr('tesseract_calls', len(missing))
+            if len(missing) == 1:
+                image, config = jobs[missing[0]][:2]
+                outputs = [self.ocr.image_to_data(image, config)]
+            else:
+                outputs = run_jobs(self.ocr, [jobs[i][:2] for i in missing], data=True)
+            for i, data in zip(missing, outputs):
+                results[i] = self._store(keys[i], data, data=True)
+        for i, source in repeated.items():
+            results[i] = results[source]
+        return results
+        
+    def _lookup(self, jobs, data):
+        """
+        Busca los resultados de varios trabajos en el memo de la ejecución y en la caché OCR
+        
+        El memo reconoce los trabajos con los mismos píxeles y la misma configuración
+        aunque vengan de ramas distintas, también dentro de la misma lista: de cada
+        grupo de trabajos repetidos solo queda pendiente el primero.
+        
+        Args:
+            jobs (list): Tuplas (imagen, configuración, rama, hash_de_origen, prefijo_de_rama)
+            data (bool): Si son llamadas a image_to_data en lugar de image_to_string
+            
+        Returns:
+            tuple: (resultados, claves, pendientes, repetidos): el resultado de cada trabajo
+                   (None si hay que ejecutarlo), sus claves (caché, memo) para _store, los
+                   índices pendientes y, para cada trabajo repetido, el índice pendiente
+                   del que copia el resultado
+        """
+        results = [None] * len(jobs)
+        keys = [(None, None)] * len(jobs)
+        missing = []
+        repeated = {}
+        first = {}
+        for i, (image, config, branch, source_hash, branch_prefix) in enumerate(jobs):
+            call = f"image_to_data {config}" if data else config
+            memo_key = None
+            if self.memo is not None:
+                memo_key = OCRMemo.make_key(image, call)
+                memoized = self.memo.get(memo_key)
+                if memoized is not None:
+                    self.metrics.incr('ocr_memo_hits')
+                    results[i] = memoized
+                    continue
+                if memo_key in first:
+                    # Mismos píxeles y configuración que un trabajo anterior de esta lista
+                    self.memo.hits += 1
+                    self.metrics.incr('ocr_memo_hits')
+                    repeated[i] = first[memo_key]
+                    continue
+                    
+            cache_key = None
+            if self.cache is not None and source_hash:
+                cache_key = OCRCache.make_key(source_hash, branch_prefix + branch, call)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    self.metrics.incr('ocr_cache_hits')
+                    if data:
+                        cached = json.loads(cached)
+                        cached = (cached['text'], cached['confidence'])
+                    results[i] = cached
+                    if memo_key is not None:
+                        self.memo.put(memo_key, cached)
+                    continue
+                    
+            keys[i] = (cache_key, memo_key)
+            if memo_key is not None:
+                first[memo_key] = i
+            missing.append(i)
+        return results, keys, missing, repeated
+        
+    def _store(self, keys, output, data):
+        """
+        Guarda el resultado de un trabajo en la caché OCR y en el memo
+        
+        Args:
+            keys (tuple): Claves (caché, memo) de _lookup, None las que no se usan
+            output: Texto (image_to_string) o salida de image_to_data
+            data (bool): Si output es la salida de image_to_data
+            
+        Returns:
+            Texto extraído, o (texto_extraído, confianza_media) si data es True
+        """
+        cache_key, memo_key = keys
+        if data:
+            result = self._data_to_text(output)
+            stored = json.dumps({'text': result[0], 'confidence': result[1]})
+        else:
+            result = stored = output
+        if cache_key is not None:
+            self.cache.put(cache_key, stored)
+        if memo_key is not None:
+            self.memo.put(memo_key, result)
+        return result
+        
+    def _ocr_ladder_concurrently(self, run):
+        """
+        Ejecuta a la vez los peldaños que faltan de la escalera de una imagen
+        
+        Hasta config.OCR_CONCURRENCY procesos tesseract trabajan a la vez, empezando por
+        los primeros peldaños; cuando uno alcanza el umbral se cancelan los posteriores.
+        Los resultados se evalúan en el orden de la escalera, así que la estrategia
+        ganadora y las pasadas contadas son las mismas que pasada a pasada, y la latencia
+        es la del peldaño más lento hasta el ganador en lugar de la suma de todos.
+        
+        Args:
+            run (_LadderRun): Escalera de la imagen
+        """
+        rungs = run.remaining_jobs()
+        jobs = [job for _, job in rungs]
+        results, keys, missing, repeated = self._lookup(jobs, data=True)
+        
+        # Un resultado de la caché que ya alcanza el umbral hace innecesarios los siguientes
+        for i, result in enumerate(results):
+            if result is not None and run.accepts(*result):
+                missing = [j for j in missing if j < i]
+                break
+                
+        if missing:
+            outputs = self.ocr.concurrent_image_to_data(
+                [jobs[i][:2] for i in missing], OCR_CONCURRENCY,
+                lambda data: run.accepts(*self._data_to_text(data))
+            )
+            for i, output in zip(missing, outputs):
+                if output is None:
+                    self.metrics.incr('ocr_cancelled')
+                    continue
+                self.metrics.incr('tesseract_calls')
+                results[i] = output if isinstance(output, Exception) else self._store(keys[i], output, data=True)
+        for i, source in repeated.items():
+            results[i] = results[source]
+                
+        # Evaluar en el orden de la escalera, como si se hubieran hecho una tras otra
+        for (rung, _), result in zip(rungs, results):
+            if result is None:
+                break
+            if isinstance(result, Exception):
+                run.error = result
+                break
+            run.add_result(*result, rung=rung)
+            if run.done:
+                break
+        run.done = True
+        
+    @staticmethod
+    def _data_to_text(data):
+        """
+        Reconstruye el texto y la confianza media a partir de la salida de image_to_data
+        
+        Args:
+            data (dict): Salida de pytesseract.image_to_data con Output.DICT
+            
+        Returns:
+            tuple: (texto_extraído, confianza_media)
+        """
+        lines = []
+        current_line = None
+        current_block = None
+        confidences = []
+        
+        for i, word in enumerate(data['text']):
+            word = word.strip()
+            if not word:
+                continue
+                
+            confidence = float(data['conf'][i])
+            if confidence >= 0:
+                confidences.append(confidence)
+                
+            # Las palabras se agrupan por línea; los bloques se separan con una línea en blanco
+            block = data['block_num'][i]
+            line = (block, data['par_num'][i], data['line_num'][i])
+            if line != current_line:
+                if current_block is not None and block != current_block:
+                    lines.append("")
+                lines.append(word)
+                current_line = line
+                current_block = block
+            else:
+                lines[-1] += " " + word
+                
+        text = "\n".join(lines)
+        confidence = sum(confidences) / len(confidences) if confidences else -1.0
+        return text, confidence
         
     def load_image(self, image_path):
         """
-        Carga una imagen desde un archivo
+        Carga una imagen desde un archivo, a resolución completa
+        
+        En modo de memoria acotada se decodifica directamente en escala de grises: ninguna
+        etapa necesita el color y ocupa la tercera parte.
         
         Args:
             image_path (str): Ruta a la imagen a cargar
@@ -34,124 +638,484 @@ class ImageProcessor:
         Returns:
             numpy.ndarray: Imagen cargada o None si hubo error
         """
-        if not os.path.exists(image_path):
-            print(f"Error: No se encuentra la imagen en {image_path}")
+        source = self.open_image(image_path)
+        if source is None:
             return None
-            
-        image = cv2.imread(image_path)
+        image = source.decode(gray=self.low_memory)
         if image is None:
             print(f"Error: No se pudo cargar la imagen {image_path}")
+        return image
+        
+    def open_image(self, image_path):
+        """
+        Lee el archivo de una imagen (una sola lectura) para decodificarlo después
+        
+        Args:
+            image_path (str): Ruta a la imagen
+            
+        Returns:
+            ImageSource: Archivo leído o None si hubo error
+        """
+        if not os.path.exists(image_path):
+            print(f"Error: No se encuentra la imagen en {image_path}")
+            return None
+        try:
+            return ImageSource(image_path)
+        except OSError as e:
+            print(f"Error: No se pudo leer la imagen {image_path}: {str(e)}")
             return None
             
-        return image
+    def _osd(self, image):
+        """
+        Ejecuta la detección de orientación de Tesseract (OSD), consultando primero la caché OCR
+        
+        Args:
+            image (numpy.ndarray): Imagen (idealmente reducida) a analizar
+            
+        Returns:
+            str: Salida de texto de Tesseract OSD
+        """
+        key = None
+        if self.cache is not None and self._source_hash:
+            key = OCRCache.make_key(self._source_hash, self._branch_prefix + "osd", f"--psm 0 --max-width {ORIENTATION_MAX_WIDTH}")
+            text = self.cache.get(key)
+            if text is not None:
+                self.metrics.incr('ocr_cache_hits')
+                return text
+                
+        self.metrics.incr('tesseract_calls')
+        text = self.ocr.image_to_osd(image)
         
-    def auto_rotate(self, image):
+        if key is not None:
+            self.cache.put(key, text)
+        return text
+        
+    def detect_orientation(self, image):
         """
-        Detecta y corrige la orientación de la imagen
+        Detección barata de la orientación sobre una copia reducida de la imagen
+        
+        Primero se consulta Tesseract OSD; si no está seguro, se mide la dirección
+        de las líneas de texto para descartar las orientaciones incompatibles.
         
         Args:
             image (numpy.ndarray): Imagen original
             
         Returns:
-            numpy.ndarray: Imagen rotada correctamente
+            tuple: (ángulo, candidatos) donde ángulo es la rotación en sentido horario
+                   a aplicar (0, 90, 180 o 270) o None si no se pudo decidir, y
+                   candidatos es la lista de ángulos que aún son posibles
         """
-        # Crear copias para probar diferentes rotaciones
-        rotations = []
-        scores = []
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+        small = resize_image(gray, max_width=ORIENTATION_MAX_WIDTH)
         
-        # Probar imagen original
-        rotations.append(image)
+        # Paso 1: Tesseract OSD
+        try:
+            osd = self._osd(small)
+            rotate = int(OSD_ROTATE_PATTERN.search(osd).group(1)) % 360
+            confidence = float(OSD_CONFIDENCE_PATTERN.search(osd).group(1))
+            if confidence >= OSD_MIN_CONFIDENCE:
+                return rotate, [rotate]
+        except Exception:
+            # OSD falla si hay muy poco texto o si no está instalado osd.traineddata
+            pass
+            
+        # Paso 2: líneas de texto. Al unir los caracteres en horizontal, el texto
+        # horizontal forma bandas anchas; en la imagen transpuesta lo hace el vertical
+        binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+        horizontal = self._text_line_extent(binary)
+        vertical = self._text_line_extent(np.ascontiguousarray(binary.T))
         
-        # Probar 90, 180 y 270 grados
-        for angle in [90, 180, 270]:
-            rotated = imutils.rotate_bound(image, angle)
-            rotations.append(rotated)
+        if horizontal > TEXT_LINE_RATIO * vertical:
+            return None, [0, 180]
+        if vertical > TEXT_LINE_RATIO * horizontal:
+            return None, [90, 270]
+        return None, [0, 90, 180, 270]
         
-        # También probar imagen volteada (para casos donde el documento está boca abajo)
-        flipped = cv2.flip(image, -1)  # Voltear tanto horizontal como verticalmente
-        rotations.append(flipped)
+    @staticmethod
+    def _text_line_extent(binary):
+        """
+        Mide la longitud total de las bandas de texto horizontales de una imagen binaria
         
-        # Evaluar cada rotación
-        for i, img in enumerate(rotations):
-            # Convertir a escala de grises y binarizar
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+        Args:
+            binary (numpy.ndarray): Imagen binaria con el texto en blanco
             
-            # Guardar temporalmente para comprobación visual
-            temp_path = os.path.join(self.output_dir, f"rotation_{i}.jpg")
-            cv2.imwrite(temp_path, img)
+        Returns:
+            int: Suma de los anchos de las bandas alargadas en horizontal
+        """
+        width = binary.shape[1]
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, width // 60), 1))
+        closed = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+        
+        _, _, stats, _ = cv2.connectedComponentsWithStats(closed)
+        widths = stats[1:, cv2.CC_STAT_WIDTH]
+        heights = stats[1:, cv2.CC_STAT_HEIGHT]
+        lines = (widths >= 3 * heights) & (widths >= width // 20)
+        return int(widths[lines].sum())
+        
+    def _orientation_input(self, image, angle):
+        """
+        Rota la imagen y la binariza para reconocer una orientación con --psm 11
+        
+        Args:
+            image (numpy.ndarray): Imagen original
+            angle (int): Rotación en sentido horario (0, 90, 180 o 270)
+            
+        Returns:
+            tuple: (imagen_rotada, imagen_binarizada)
+        """
+        img = imutils.rotate_bound(image, angle) if angle else image
+        
+        # Convertir a escala de grises y binarizar
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+        
+        # Guardar temporalmente para comprobación visual
+        self.artifacts.write_image(f"rotation_{angle // 90}.jpg", img)
+        return img, thresh
+        
+    def _ocr_orientation(self, image, angle):
+        """
+        Rota la imagen y extrae su texto con --psm 11 (una sola vez por orientación)
+        
+        Args:
+            image (numpy.ndarray): Imagen original
+            angle (int): Rotación en sentido horario (0, 90, 180 o 270)
             
-            # Extraer texto para evaluar
-            text = pytesseract.image_to_string(thresh, config='--psm 11 --oem 3 -l spa')
+        Returns:
+            tuple: (imagen_rotada, texto_extraído)
+        """
+        img, thresh = self._orientation_input(image, angle)
+        
+        # Extraer texto para evaluar
+        text = self._ocr(thresh, ORIENTATION_OCR_CONFIG, f"rotation_{angle // 90}")
+        return img, text
+        
+    def _rotate_by_keywords(self, image, angles):
+        """
+        Elige la orientación con OCR completo, contando palabras clave en cada candidato
+        
+        Todas las orientaciones usan la misma configuración, así que se reconocen juntas
+        (con pytesseract, en un solo proceso tesseract). Solo se conservan las imágenes
+        binarizadas; la orientación elegida se vuelve a rotar al final.
+        
+        Args:
+            image (numpy.ndarray): Imagen original
+            angles (list): Ángulos candidatos (0, 90, 180 o 270)
             
+        Returns:
+            tuple: (imagen_rotada, ángulo, texto_extraído)
+        """
+        jobs = [(self._orientation_input(image, angle)[1], ORIENTATION_OCR_CONFIG, f"rotation_{angle // 90}")
+                for angle in angles]
+        texts = self._ocr_many(jobs)
+        del jobs
+        
+        best_angle = angles[0]
+        best_text = ""
+        best_score = -1
+        for angle, text in zip(angles, texts):
             # Contar palabras clave comunes en cédulas colombianas
-            keywords = ['REPUBLICA', 'COLOMBIA', 'CEDULA', 'CIUDADANIA', 'IDENTIDAD', 'PERSONAL', 
-                        'FECHA', 'NACIMIENTO', 'EXPEDICION', 'SEXO', 'LUGAR']
-            score = sum(1 for keyword in keywords if keyword in text.upper())
+            score = ORIENTATION_SCORER.score(text)
             
-            # Guardar puntuación
-            scores.append(score)
+            # Quedarse con la rotación de mayor puntuación
+            if score > best_score:
+                best_score = score
+                best_angle = angle
+                best_text = text
+                
+        best_rotation = imutils.rotate_bound(image, best_angle) if best_angle else image
+        return best_rotation, best_angle, best_text
+        
+    def _orient(self, image, fast=True, preview=None):
+        """
+        Determina la orientación correcta de la imagen
+        
+        Args:
+            image (numpy.ndarray): Imagen original
+            fast (bool): Si se usa la detección barata antes del OCR de cada orientación
+            preview (numpy.ndarray, optional): Copia reducida de la imagen (misma
+                                               orientación) para la detección barata
             
-        # Obtener la rotación con mayor puntuación
-        best_idx = np.argmax(scores)
-        best_rotation = rotations[best_idx]
+        Returns:
+            tuple: (imagen_rotada, ángulo, texto_extraído, método) donde texto_extraído
+                   es None si la orientación se decidió sin OCR completo
+        """
+        angles = [0, 90, 180, 270]
         
-        print(f"Se aplicó rotación automática. Mejor orientación: {best_idx * 90 if best_idx < 4 else 'Volteada'}")
+        if fast:
+            angle, angles = self.detect_orientation(image if preview is None else preview)
+            if angle is not None:
+                rotated = imutils.rotate_bound(image, angle) if angle else image
+                return rotated, angle, None, "osd"
+                
+        # La detección barata no está segura: OCR completo solo de los candidatos restantes
+        rotated, angle, text = self._rotate_by_keywords(image, angles)
+        return rotated, angle, text, "keywords"
         
-        return best_rotation
+    @instrumented('auto_rotate')
+    def auto_rotate(self, image, fast=True):
+        """
+        Detecta y corrige la orientación de la imagen
         
-    def is_reverse_side(self, image_path):
+        Args:
+            image (numpy.ndarray): Imagen original
+            fast (bool): Si se usa la detección barata (OSD y líneas de texto)
+                         antes de recurrir al OCR completo de cada orientación
+            
+        Returns:
+            numpy.ndarray: Imagen rotada correctamente
         """
-        Determina si la imagen es el reverso de una cédula colombiana
+        rotated, angle, _, method = self._orient(image, fast)
+        print(f"Se aplicó rotación automática ({method}). Mejor orientación: {angle}")
+        return rotated
+        
+    def analyze(self, image_path, fast=True):
+        """
+        Etapa de análisis: decodifica la imagen una vez y determina orientación y lado
+        
+        Cada orientación se reconoce como mucho una vez, y el texto de la orientación
+        elegida se reutiliza para decidir si es el anverso o el reverso.
         
         Args:
             image_path (str): Ruta a la imagen
-        
+            fast (bool): Si se usa la detección barata de orientación
+            
         Returns:
-            bool: True si es reverso, False si es anverso
+            ImageAnalysis: Resultado del análisis o None si no se pudo cargar la imagen
         """
+        with self.metrics.stage('load'):
+            source = self.open_image(image_path)
+        if source is None:
+            return None
+        self._set_source(image_path, source)
+        try:
+            decoded = self._decode_working_image(source)
+        finally:
+            source.release()
+        if decoded is None:
+            print(f"Error: No se pudo cargar la imagen {image_path}")
+            return None
+        original, image, card_found, card_area_ratio, pixel_ratio, preview = decoded
+        del decoded
+        
+        # Sin la cédula recortada, limitar el tamaño de la foto completa con la que se trabaja
+        if self.low_memory and not card_found:
+            full_pixels = image.shape[0] * image.shape[1] / pixel_ratio
+            image = self._limit_side(image, LOW_MEMORY_MAX_SIDE)
+            pixel_ratio = image.shape[0] * image.shape[1] / full_pixels
+        
+        # En modo de memoria acotada no se conserva la foto original: solo la imagen de trabajo.
+        # Las entradas de la caché OCR se separan porque Tesseract recibe otros píxeles
+        if self.low_memory:
+            original = None
+            self._branch_prefix = "gray/" + self._branch_prefix
+        
+        with self.metrics.stage('auto_rotate'):
+            rotated, angle, text, method = self._orient(image, fast, preview)
+        del preview
+        self.metrics.label('orientation', method)
+        print(f"Se aplicó rotación automática ({method}). Mejor orientación: {angle}")
+        
         # Implementación sencilla: si el nombre del archivo contiene 'reverso' o 'back'
         filename = os.path.basename(image_path).lower()
         if 'reverso' in filename or 'back' in filename or 'trasera' in filename or 'reverse' in filename:
-            return True
+            is_reverse = True
+        else:
+            # También podemos detectarlo a partir del texto de la orientación elegida
+            if text is None:
+                with self.metrics.stage('side_ocr'):
+                    _, text = self._ocr_orientation(image, angle)
+                
+            # Contar palabras clave de cada tipo (en una sola pasada por el texto)
+            reverse_score, front_score = SIDE_SCORER.scores(text)
             
-        # También podemos intentar detectar basado en características visuales
-        image = self.load_image(image_path)
-        if image is None:
-            return False
+            # Si hay más palabras clave del reverso que del anverso, probablemente es el reverso
+            is_reverse = reverse_score > front_score
             
-        # Convertir a escala de grises y extraer texto
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        text = pytesseract.image_to_string(gray, config='--psm 11 --oem 3 -l spa')
+        return ImageAnalysis(image_path, original, rotated, angle, is_reverse, method, text,
+                             card_found=card_found, card_area_ratio=card_area_ratio,
+                             pixel_ratio=pixel_ratio)
         
-        # Palabras clave que aparecen en el reverso de cédulas colombianas
-        reverse_keywords = ['NACIMIENTO', 'FECHA', 'SEXO', 'BLOOD', 'GRUPO', 'SANGUINEO', 'RH',
-                          'EXPEDICION', 'LUGAR', 'ESTATURA']
-        front_keywords = ['REPUBLICA', 'COLOMBIA', 'CEDULA', 'CIUDADANIA']
+    def _decode_working_image(self, source):
+        """
+        Decodifica la imagen de trabajo con la menor resolución que necesita el OCR
         
-        # Contar palabras clave de cada tipo
-        reverse_score = sum(1 for keyword in reverse_keywords if keyword in text.upper())
-        front_score = sum(1 for keyword in front_keywords if keyword in text.upper())
+        En color, la cédula se busca en una copia reducida en escala de grises; si se
+        encuentra, la foto se decodifica con la mayor reducción que conserva el ancho
+        normalizado de la cédula y se recorta de ahí. Si no, se decodifica completa y la
+        copia reducida sirve para la detección barata de la orientación. En modo de memoria
+        acotada la foto se decodifica una sola vez en escala de grises: una segunda
+        decodificación reducida costaría más de lo que ahorra.
         
-        # Si hay más palabras clave del reverso que del anverso, probablemente es el reverso
-        return reverse_score > front_score
+        Args:
+            source (ImageSource): Archivo leído
+            
+        Returns:
+            tuple: (decodificada, imagen_de_trabajo, cédula_encontrada, fracción_del_encuadre,
+                   fracción_de_píxeles, copia_para_orientación) o None si no se pudo
+                   decodificar; copia_para_orientación es None si no hace falta
+        """
+        self._branch_prefix = ""
+        detector = self.card_detector
+        quad = None
+        card_area_ratio = 1.0
+        preview = None
+        preview_reduction = 1
+        if detector is not None and not self.low_memory:
+            preview_reduction = source.reduction_for(max(detector.max_side, ORIENTATION_MAX_WIDTH))
+        if preview_reduction > 1:
+            with self.metrics.stage('load'):
+                preview = source.decode(preview_reduction, gray=True)
+            if preview is not None:
+                with self.metrics.stage('card_crop'):
+                    quad = detector.detect(preview)
+                if quad is not None:
+                    card_area_ratio = detector.frame_ratio(quad, preview)
+                    # Coordenadas de la foto completa
+                    quad = quad * preview_reduction
+                    preview = None
+                    
+        # Resolución de la imagen de la que sale el OCR
+        reduction = 1
+        if quad is not None:
+            card_side = detector.long_side(quad)
+            reduction = next((r for r in REDUCTIONS if card_side / r >= detector.width), 1)
+        with self.metrics.stage('load'):
+            original = source.decode(reduction, gray=self.low_memory)
+        if original is None:
+            return None
+        if reduction > 1 and source.size:
+            full_pixels = source.size[0] * source.size[1]
+        else:
+            full_pixels = original.shape[0] * original.shape[1] * reduction ** 2
+            
+        image = original
+        card_found = False
+        if quad is not None:
+            with self.metrics.stage('card_crop'):
+                image = detector.warp(original, quad / reduction)
+            card_found = True
+        elif detector is not None and preview_reduction == 1:
+            # Sin copia reducida (modo de memoria acotada o foto pequeña): buscar en la foto
+            with self.metrics.stage('card_crop'):
+                image, card_found, card_area_ratio, _ = detector.crop(original)
+                
+        pixel_ratio = image.shape[0] * image.shape[1] / float(full_pixels)
+        if card_found:
+            # Las ramas de la caché OCR distinguen la tarjeta recortada de la foto completa
+            self._branch_prefix = f"card{detector.width}/"
+            print(f"Cédula detectada: ocupa el {card_area_ratio:.0%} de la foto; "
+                  f"se procesa el {pixel_ratio:.0%} de los píxeles originales")
+        elif detector is not None:
+            print("No se detectó el contorno de la cédula; se usa la foto completa")
+        return original, image, card_found, card_area_ratio, pixel_ratio, preview
+        
+    @staticmethod
+    def _limit_side(image, max_side):
+        """
+        Reduce una imagen para que su lado mayor no supere max_side píxeles
+        
+        Args:
+            image (numpy.ndarray): Imagen a reducir
+            max_side (int): Lado mayor máximo en píxeles
+            
+        Returns:
+            numpy.ndarray: Imagen reducida (la misma si ya era más pequeña)
+        """
+        h, w = image.shape[:2]
+        scale = max_side / float(max(h, w))
+        if scale >= 1.0:
+            return image
+        return cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
         
-    def preprocess_for_colombian_id(self, image, is_reverse=False):
+    @instrumented('is_reverse_side')
+    def is_reverse_side(self, image_path):
+        """
+        Determina si la imagen es el reverso de una cédula colombiana
+        
+        Args:
+            image_path (str): Ruta a la imagen
+        
+        Returns:
+            bool: True si es reverso, False si es anverso
+        """
+        analysis = self.analyze(image_path)
+        return analysis is not None and analysis.is_reverse
+        
+    def extract_fields(self, image, is_reverse):
+        """
+        Reconoce solo las regiones fijas de cada campo de la cédula normalizada
+        
+        Args:
+            image (numpy.ndarray): Cédula recortada y con la orientación corregida
+            is_reverse (bool): Si es el reverso de la cédula
+            
+        Returns:
+            dict: Texto reconocido por campo (nombre del campo -> texto)
+        """
+        fields = {}
+        for field in get_template(is_reverse):
+            roi = crop_field(image, field.box)
+            fields[field.name] = self._ocr(roi, field.config, f"field/{field.name}").strip()
+        return fields
+
+    def read_fields(self, card, names):
+        """
+        Reconoce algunos campos de la plantilla en una cédula que no es la imagen en curso
+
+        Lo usa el índice de cédulas repetidas para confirmar un candidato. El hash de la
+        imagen en curso no corresponde a esta cédula, así que los resultados no se guardan
+        en la caché OCR (solo en el memo de la ejecución).
+
+        Args:
+            card (numpy.ndarray): Cédula recortada y en horizontal
+            names (tuple): Nombres de los campos (de cualquiera de los dos lados)
+
+        Returns:
+            dict: Texto reconocido por campo (nombre del campo -> texto)
+        """
+        fields = [field for field in get_template(False) + get_template(True) if field.name in names]
+        outputs = self._ocr_data_many([(crop_field(card, field.box), field.config, f"field/{field.name}", None, "")
+                                       for field in fields])
+        return {field.name: text.strip() for field, (text, _) in zip(fields, outputs)}
+
+    @staticmethod
+    def _fields_are_usable(fields, is_reverse):
+        """
+        Comprueba que la plantilla haya encontrado el campo principal de cada lado
+        
+        Args:
+            fields (dict): Texto reconocido por campo
+            is_reverse (bool): Si es el reverso de la cédula
+            
+        Returns:
+            bool: True si se encontró el número de documento (anverso) o una fecha (reverso)
+        """
+        if is_reverse:
+            return any(YEAR_PATTERN.search(fields.get(name, "")) for name in ('Fecha_Nacimiento', 'Fecha_Expedicion'))
+        return len(NON_DIGITS_PATTERN.sub("", fields.get('Documento', ""))) >= 6
+        
+    def preprocess_for_colombian_id(self, image, is_reverse=False, rotate=True):
         """
         Preprocesamiento específico para cédulas colombianas
         
         Args:
             image (numpy.ndarray): Imagen a preprocesar
             is_reverse (bool): Si es el reverso de la cédula
+            rotate (bool): Si hay que corregir la orientación (False si la imagen
+                           ya viene rotada de analyze)
             
         Returns:
             numpy.ndarray: Imagen preprocesada
         """
         # Auto-rotar la imagen si es necesario
-        rotated = self.auto_rotate(image)
+        rotated = self.auto_rotate(image) if rotate else image
         
-        # Convertir a escala de grises
-        gray = cv2.cvtColor(rotated, cv2.COLOR_BGR2GRAY)
+        # Convertir a escala de grises (en modo de memoria acotada ya lo está)
+        gray = cv2.cvtColor(rotated, cv2.COLOR_BGR2GRAY) if rotated.ndim == 3 else rotated
+        
+        # Las imágenes intermedias se liberan en cuanto se usan: solo se devuelven
+        # la imagen rotada y las binarizadas
         
         if is_reverse:
             # Para el reverso, aplicar un procesamiento más agresivo para separar el texto
@@ -161,20 +1125,24 @@ class ImageProcessor:
             alpha = 2.5  # Contraste (1.0-3.0)
             beta = 30    # Brillo (0-100)
             adjusted = cv2.convertScaleAbs(gray, alpha=alpha, beta=beta)
+            del gray
             
             # Paso 2: Filtro bilateral para preservar bordes pero eliminar ruido
             filtered = cv2.bilateralFilter(adjusted, 11, 17, 17)
+            del adjusted
             
             # Paso 3: Umbral adaptativo específico para reverso
             binary = cv2.adaptiveThreshold(
                 filtered, 255, cv2.ADAPTIVE_THRESH_MEAN_C, 
                 cv2.THRESH_BINARY, 15, 5
             )
+            del filtered
             
             # Paso 4: Aplicar operaciones morfológicas más agresivas para limpiar ruido
             kernel = np.ones((2, 2), np.uint8)
             processed = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-            processed = cv2.morphologyEx(processed, cv2.MORPH_OPEN, kernel)
+            del binary
+            processed = cv2.morphologyEx(processed, cv2.MORPH_OPEN, kernel, dst=processed)
             
             # Paso 5: Invertir la imagen (ya que a veces el texto es más claro que el fondo)
             inverted = cv2.bitwise_not(processed)
@@ -188,20 +1156,23 @@ class ImageProcessor:
             alpha = 1.5  # Contraste
             beta = 15    # Brillo
             adjusted = cv2.convertScaleAbs(gray, alpha=alpha, beta=beta)
+            del gray
             
             # Aplicar un desenfoque para reducir ruido
-            blurred = cv2.GaussianBlur(adjusted, (3, 3), 0)
+            blurred = cv2.GaussianBlur(adjusted, (3, 3), 0, dst=adjusted)
             
             # Aplicar umbral adaptativo para binarizar
             binary = cv2.adaptiveThreshold(
                 blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
                 cv2.THRESH_BINARY, 11, 2
             )
+            del adjusted, blurred
             
             # Operaciones morfológicas para limpiar ruido
             kernel = np.ones((2, 2), np.uint8)
             processed = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-            processed = cv2.morphologyEx(processed, cv2.MORPH_OPEN, kernel)
+            del binary
+            processed = cv2.morphologyEx(processed, cv2.MORPH_OPEN, kernel, dst=processed)
             
             return rotated, processed, None
         
@@ -212,150 +1183,246 @@ class ImageProcessor:
         Args:
             image_path (str): Ruta a la imagen a procesar
             save_intermediate (bool): Si se deben guardar imágenes intermedias
+                                      (además requiere ARTIFACT_LEVEL=full)
             
         Returns:
-            tuple: (texto_extraído, imagen_procesada, imagen_con_anotaciones)
+            tuple: (texto_extraído, imagen_procesada, imagen_con_anotaciones), con
+                   imagen_con_anotaciones a None si no se guardan imágenes intermedias
+        """
+        result = self.process_images([image_path], save_intermediate)[0]
+        return result.text, result.processed, result.annotated
+        
+    @instrumented('process_image')
+    def process_images(self, image_paths, save_intermediate=True):
         """
-        # Cargar imagen
-        original_image = self.load_image(image_path)
-        if original_image is None:
-            return None, None, None
+        Procesa varias imágenes, ejecutando juntas las pasadas OCR de la misma ronda
+        
+        El análisis y el preprocesamiento se hacen imagen por imagen. Después la escalera
+        de estrategias avanza por rondas: en cada ronda, cada imagen que aún no tiene un
+        resultado suficientemente bueno aporta su siguiente peldaño, y los trabajos de la
+        ronda se agrupan por configuración (con pytesseract, un proceso tesseract por
+        configuración en lugar de uno por imagen). Cada imagen conserva su salida temprana,
+        así que con una sola imagen el resultado es el mismo que pasada a pasada. Con
+        config.OCR_CONCURRENCY > 1 y una sola imagen, sus peldaños se ejecutan a la vez
+        (ver _ocr_ladder_concurrently).
+        
+        Args:
+            image_paths (list): Rutas a las imágenes a procesar
+            save_intermediate (bool): Si se deben guardar imágenes intermedias
+                                      (además requiere ARTIFACT_LEVEL=full)
+            
+        Returns:
+            list: ImageResult de cada imagen, en el mismo orden que image_paths
+        """
+        if self.cache is not None:
+            hits_before, misses_before = self.cache.hits, self.cache.misses
+        if self.memo is not None:
+            memo_before = self.memo.hits
+            
+        prepared = [self._prepare_image(image_path, save_intermediate) for image_path in image_paths]
+        runs = [run for _, run in prepared if run is not None]
+        
+        # Una sola imagen (p. ej. una petición suelta): sus peldaños pueden ir a la vez
+        if OCR_CONCURRENCY > 1 and len(runs) == 1:
+            with self.metrics.stage('ocr'):
+                self._ocr_ladder_concurrently(runs[0])
+            runs = []
             
-        # Determinar si es el anverso o el reverso
-        is_reverse = self.is_reverse_side(image_path)
+        # Rondas de la escalera: un peldaño por imagen pendiente en cada ronda
+        active = runs
+        while active:
+            jobs = []
+            owners = []
+            for run in active:
+                job = run.next_job()
+                if job is not None:
+                    jobs.append(job)
+                    owners.append(run)
+            if not jobs:
+                break
+                
+            with self.metrics.stage('ocr'):
+                outputs = self._ocr_round(jobs)
+            for run, output in zip(owners, outputs):
+                if isinstance(output, Exception):
+                    run.error = output
+                    run.done = True
+                else:
+                    run.add_result(*output)
+            active = [run for run in owners if not run.done]
+            
+        for result, run in prepared:
+            if run is not None:
+                self._finish_image(result, run)
+                
+        if self.cache is not None:
+            print(f"Caché OCR: {self.cache.hits - hits_before} aciertos, "
+                  f"{self.cache.misses - misses_before} fallos")
+        if self.memo is not None and self.memo.hits > memo_before:
+            print(f"Memo OCR: {self.memo.hits - memo_before} llamadas repetidas evitadas")
+            
+        # Estadísticas de la última imagen, para quien procesa de una en una
+        last = prepared[-1][0] if prepared else None
+        if last is not None:
+            self.last_analysis = last.analysis
+            self.last_fields = last.fields
+            self.last_passes = last.passes
+            self.last_strategy = last.strategy
+        return [result for result, _ in prepared]
+        
+    def _ocr_round(self, jobs):
+        """
+        Ejecuta los trabajos OCR de una ronda de la escalera
+        
+        Si la ronda falla se repite trabajo por trabajo, para que el error solo afecte a
+        la imagen que lo causa.
+        
+        Args:
+            jobs (list): Trabajos de _LadderRun.next_job
+            
+        Returns:
+            list: Tupla (texto_extraído, confianza_media) o la excepción de cada trabajo
+        """
+        try:
+            return self._ocr_data_many(jobs)
+        except Exception as e:
+            if len(jobs) == 1:
+                return [e]
+        outputs = []
+        for job in jobs:
+            try:
+                outputs.append(self._ocr_data_many([job])[0])
+            except Exception as e:
+                outputs.append(e)
+        return outputs
+        
+    def _prepare_image(self, image_path, save_intermediate):
+        """
+        Analiza y preprocesa una imagen y prepara su escalera de estrategias OCR
+        
+        Args:
+            image_path (str): Ruta a la imagen a procesar
+            save_intermediate (bool): Si se deben guardar imágenes intermedias
+            
+        Returns:
+            tuple: (ImageResult, _LadderRun) con _LadderRun a None si la imagen no necesita
+                   la escalera (no se pudo cargar o bastó el modo plantilla)
+        """
+        result = ImageResult(image_path)
+        
+        # Recalcular siempre el hash: el archivo puede haber cambiado aunque la ruta sea la misma
+        self._source_path = None
+            
+        # Cargar imagen y determinar orientación y si es el anverso o el reverso
+        analysis = self.analyze(image_path)
+        result.analysis = analysis
+        result.source_hash = self._source_hash if self._source_path == image_path else None
+        if analysis is None:
+            return result, None
+            
+        is_reverse = analysis.is_reverse
         if is_reverse:
             print(f"Detectada como reverso de cédula colombiana.")
             
+        # Modo plantilla: con la cédula normalizada basta con reconocer la región de cada campo
+        if LAYOUT_MODE and analysis.card_found:
+            with self.metrics.stage('layout'):
+                fields = self.extract_fields(analysis.image, is_reverse)
+            if self._fields_are_usable(fields, is_reverse):
+                result.fields = fields
+                result.passes = len(fields)
+                result.strategy = "LAYOUT"
+                self.metrics.label('strategy', result.strategy)
+                self.metrics.incr('ocr_passes', result.passes)
+                result.text = "\n".join(f"{name}: {value}" for name, value in fields.items())
+                result.processed = analysis.image
+                print(f"Campos extraídos por plantilla:\n{result.text}")
+                return result, None
+            print("La plantilla no encontró los campos principales, se usa el OCR de página completa")
+            
         # Preprocesar imagen específicamente para cédulas colombianas
-        rotated_image, processed_image, inverted_image = self.preprocess_for_colombian_id(original_image, is_reverse)
+        with self.metrics.stage('preprocess'):
+            rotated_image, processed_image, inverted_image = self.preprocess_for_colombian_id(
+                analysis.image, is_reverse, rotate=False
+            )
+        result.processed = processed_image
         
-        # Guardar imagen procesada si se solicita
-        if save_intermediate:
+        # Guardar imágenes intermedias si se solicita (en segundo plano, según ARTIFACT_LEVEL)
+        save_images = save_intermediate and self.artifacts.wants_images
+        if save_images:
             filename = os.path.basename(image_path)
-            output_path = os.path.join(self.output_dir, f"processed_{filename}")
-            cv2.imwrite(output_path, processed_image)
-            print(f"Imagen procesada guardada en: {output_path}")
+            self.artifacts.write_image(f"processed_{filename}", processed_image)
             
             # También guardar la imagen rotada
-            rotated_path = os.path.join(self.output_dir, f"rotated_{filename}")
-            cv2.imwrite(rotated_path, rotated_image)
-            print(f"Imagen rotada guardada en: {rotated_path}")
+            self.artifacts.write_image(f"rotated_{filename}", rotated_image)
             
             # Si hay imagen invertida, guardarla también
             if inverted_image is not None:
-                inverted_path = os.path.join(self.output_dir, f"inverted_{filename}")
-                cv2.imwrite(inverted_path, inverted_image)
-                print(f"Imagen invertida guardada en: {inverted_path}")
-            
-        # Extraer texto con OCR - MÚLTIPLES ESTRATEGIAS
-        extracted_text = ""
-        best_text = ""
-        max_keywords = 0
-        
-        # Configuraciones específicas para cédula colombiana
-        psm_configs = [3, 4, 6, 11]  # Diferentes modos de segmentación de página
-        try:
-            # Preparar listas de palabras clave según si es anverso o reverso
-            if is_reverse:
-                keywords = ['FECHA', 'NACIMIENTO', 'EXPEDICION', 'SEXO', 'LUGAR', 'ESTATURA', 'GRUPO', 'RH']
-            else:
-                keywords = ['REPUBLICA', 'COLOMBIA', 'CEDULA', 'CIUDADANIA', 'IDENTIDAD', 'PERSONAL']
-                
-            # Probar diferentes configuraciones y quedarse con la mejor
-            for psm in psm_configs:
-                # Configuración actual
-                config = f'--psm {psm} --oem 3 -l spa'
-                
-                # Extraer texto de la imagen procesada
-                text = pytesseract.image_to_string(processed_image, config=config)
-                
-                # Evaluar calidad del texto extraído
-                score = sum(1 for keyword in keywords if keyword in text.upper())
-                
-                # Guardar el mejor resultado
-                if score > max_keywords:
-                    max_keywords = score
-                    best_text = text
+                self.artifacts.write_image(f"inverted_{filename}", inverted_image)
                 
-                # Acumular todo el texto
-                extracted_text += "\n\n--- PSM " + str(psm) + " ---\n" + text
-                
-                # Si es el reverso, también intentar con la imagen invertida
-                if is_reverse and inverted_image is not None:
-                    text_inv = pytesseract.image_to_string(inverted_image, config=config)
-                    score_inv = sum(1 for keyword in keywords if keyword in text_inv.upper())
-                    
-                    if score_inv > max_keywords:
-                        max_keywords = score_inv
-                        best_text = text_inv
-                        
-                    extracted_text += "\n\n--- INVERTED PSM " + str(psm) + " ---\n" + text_inv
-            
-            # Si no se detectaron suficientes palabras clave, intentar con la imagen rotada
-            if max_keywords < 2:
-                print("Pocas palabras clave detectadas, intentando con imagen rotada...")
-                # Probar imagen rotada directamente
-                for psm in psm_configs:
-                    config = f'--psm {psm} --oem 3 -l spa'
-                    text = pytesseract.image_to_string(rotated_image, config=config)
-                    
-                    # Evaluar calidad
-                    score = sum(1 for keyword in keywords if keyword in text.upper())
-                    
-                    if score > max_keywords:
-                        max_keywords = score
-                        best_text = text
-                    
-                    # Acumular texto
-                    extracted_text += "\n\n--- ROTATED PSM " + str(psm) + " ---\n" + text
-            
-            # También intentar con el negativo de la imagen (a veces funciona mejor)
-            negative = cv2.bitwise_not(processed_image)
-            text = pytesseract.image_to_string(negative, config='--psm 3 --oem 3 -l spa')
+        # Preparar palabras clave y escalera según si es anverso o reverso
+        if is_reverse:
+            scorer = REVERSE_LADDER_SCORER
+            ladder = self.reverse_ladder
+        else:
+            scorer = FRONT_LADDER_SCORER
+            ladder = self.front_ladder
             
-            score = sum(1 for keyword in keywords if keyword in text.upper())
-            if score > max_keywords:
-                max_keywords = score
-                best_text = text
-                
-            extracted_text += "\n\n--- NEGATIVE ---\n" + text
+        # Variantes de la imagen disponibles para cada peldaño
+        variants = {'processed': processed_image, 'inverted': inverted_image, 'rotated': rotated_image}
+        run = _LadderRun(ladder, scorer, variants, "reverse" if is_reverse else "front",
+                         self._source_hash if self.cache is not None else None,
+                         self._branch_prefix, save_images)
+        return result, run
+        
+    def _finish_image(self, result, run):
+        """
+        Recoge el resultado de la escalera de una imagen y guarda sus artefactos
+        
+        Args:
+            result (ImageResult): Resultado que se completa
+            run (_LadderRun): Escalera terminada de la imagen
+        """
+        rotated_image = run.variants['rotated']
+        # Liberar las variantes que ya no se usan (el negativo solo existe aquí)
+        run.variants = None
+        
+        if run.error is not None:
+            print(f"Error en OCR: {str(run.error)}")
+            return
             
-            # Para el reverso, intentar una segmentación más agresiva
-            if is_reverse:
-                # Intentar con análisis de bloques de texto
-                text = pytesseract.image_to_string(processed_image, config='--psm 1 --oem 3 -l spa')
-                score = sum(1 for keyword in keywords if keyword in text.upper())
-                
-                if score > max_keywords:
-                    max_keywords = score
-                    best_text = text
-                    
-                extracted_text += "\n\n--- BLOCK MODE ---\n" + text
-            
-            # Imprimir el texto extraído para depuración
-            print("\n--- TEXTO EXTRAÍDO POR OCR (PARA DEPURACIÓN) ---")
-            print(best_text)
-            print("--- FIN TEXTO OCR ---\n")
-            
-            # Guardar todo el texto en archivo para análisis
-            text_file = os.path.join(self.output_dir, f"ocr_text_{os.path.splitext(os.path.basename(image_path))[0]}.txt")
-            with open(text_file, 'w', encoding='utf-8') as f:
-                f.write("--- MEJOR TEXTO ---\n")
-                f.write(best_text)
-                f.write("\n\n--- TODOS LOS INTENTOS ---\n")
-                f.write(extracted_text)
-            print(f"Texto OCR guardado en: {text_file}")
+        image_path = result.image_path
+        best_text = run.best[2] if run.best is not None else ""
+        result.text = best_text
+        result.passes = run.passes
+        result.strategy = run.best[3] if run.best is not None else None
+        self.metrics.label('strategy', result.strategy)
+        self.metrics.incr('ocr_passes', run.passes)
+        print(f"Estrategia ganadora: {result.strategy} tras {run.passes} de {len(run.ladder)} pasadas")
+        
+        # Imprimir el texto extraído para depuración
+        print("\n--- TEXTO EXTRAÍDO POR OCR (PARA DEPURACIÓN) ---")
+        print(best_text)
+        print("--- FIN TEXTO OCR ---\n")
+        
+        # Guardar todo el texto en archivo para análisis
+        if self.artifacts.wants_text:
+            self.artifacts.write_text(
+                f"ocr_text_{os.path.splitext(os.path.basename(image_path))[0]}.txt",
+                "--- MEJOR TEXTO ---\n" + best_text + "\n\n--- TODOS LOS INTENTOS ---\n" + run.extracted_text
+            )
             
-        except Exception as e:
-            print(f"Error en OCR: {str(e)}")
-            return None, processed_image, None
+        # La imagen con anotaciones solo sirve para depuración: no crearla si no se va a
+        # guardar, ni en modo de memoria acotada (sería otra copia en color de la cédula)
+        if not run.save_images or self.low_memory:
+            return
             
         # Crear imagen con anotaciones
         annotated_image = rotated_image.copy()
         
         # Detectar y marcar regiones de texto
         try:
-            gray = cv2.cvtColor(rotated_image, cv2.COLOR_BGR2GRAY)
+            gray = cv2.cvtColor(rotated_image, cv2.COLOR_BGR2GRAY) if rotated_image.ndim == 3 else rotated_image
             _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
             
             # Encontrar contornos en la imagen
@@ -372,9 +1439,5 @@ class ImageProcessor:
             print(f"Error al anotar la imagen: {str(e)}")
             
         # Guardar imagen anotada
-        if save_intermediate:
-            annotated_path = os.path.join(self.output_dir, f"annotated_{os.path.basename(image_path)}")
-            cv2.imwrite(annotated_path, annotated_image)
-            print(f"Imagen anotada guardada en: {annotated_path}")
-            
-        return best_text, processed_image, annotated_image
\ No newline at end of file
+        self.artifacts.write_image(f"annotated_{os.path.basename(image_path)}", annotated_image)
+        result.annotated = annotated_image
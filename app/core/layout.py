@@ -0,0 +1,81 @@
+import cv2
+
+class FieldTemplate:
+    """Región fija de un campo dentro de la cédula normalizada y su configuración OCR"""
+
+    def __init__(self, name, box, config):
+        """
+        Crea la plantilla de un campo
+
+        Args:
+            name (str): Nombre del campo (mismo nombre que la columna del CSV)
+            box (tuple): Región (x0, y0, x1, y1) como fracciones del ancho y alto de la cédula
+            config (str): Configuración de Tesseract ajustada al contenido del campo
+        """
+        self.name = name
+        self.box = box
+        self.config = config
+
+# Configuraciones por tipo de campo: una sola línea (--psm 7) con lista blanca de caracteres
+DIGITS_CONFIG = '--psm 7 --oem 3 -l spa -c tessedit_char_whitelist=0123456789.,'
+NAME_CONFIG = '--psm 7 --oem 3 -l spa -c tessedit_char_whitelist="ABCDEFGHIJKLMNÑOPQRSTUVWXYZÁÉÍÓÚÜ "'
+DATE_CONFIG = "--psm 7 --oem 3 -l spa -c tessedit_char_whitelist=0123456789ABCDEFGIJLMNOPRSTUVY-"
+SEX_CONFIG = '--psm 7 --oem 3 -l spa -c tessedit_char_whitelist=MF'
+CODE_CONFIG = '--psm 7 --oem 3 -l spa -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ-'
+
+# Anverso de la cédula amarilla con hologramas: datos a la izquierda y foto a la derecha
+FRONT_TEMPLATE = [
+    FieldTemplate('Documento', (0.03, 0.27, 0.66, 0.39), DIGITS_CONFIG),
+    FieldTemplate('Apellido', (0.03, 0.41, 0.66, 0.52), NAME_CONFIG),
+    FieldTemplate('Nombre', (0.03, 0.57, 0.66, 0.68), NAME_CONFIG),
+]
+
+# Reverso: valores a la derecha de cada etiqueta, huella a la derecha de la tarjeta y,
+# bajo el código de barras, el código con el número de cédula (no es una columna: sirve
+# para emparejar el reverso con su anverso)
+BACK_TEMPLATE = [
+    FieldTemplate('Fecha_Nacimiento', (0.30, 0.07, 0.64, 0.17), DATE_CONFIG),
+    FieldTemplate('Genero', (0.52, 0.31, 0.64, 0.41), SEX_CONFIG),
+    FieldTemplate('Fecha_Expedicion', (0.03, 0.47, 0.34, 0.57), DATE_CONFIG),
+    FieldTemplate('Codigo', (0.03, 0.89, 0.97, 0.99), CODE_CONFIG),
+]
+
+def get_template(is_reverse):
+    """
+    Devuelve la plantilla de campos de un lado de la cédula
+
+    Args:
+        is_reverse (bool): Si es el reverso de la cédula
+
+    Returns:
+        list: Lista de FieldTemplate
+    """
+    return BACK_TEMPLATE if is_reverse else FRONT_TEMPLATE
+
+def crop_field(image, box, min_height=48):
+    """
+    Recorta y prepara la región de un campo para el OCR
+
+    Args:
+        image (numpy.ndarray): Cédula normalizada y con la orientación corregida
+        box (tuple): Región (x0, y0, x1, y1) como fracciones del ancho y alto
+        min_height (int): Alto mínimo en píxeles; las regiones más bajas se amplían
+
+    Returns:
+        numpy.ndarray: Región binarizada (texto oscuro sobre fondo blanco)
+    """
+    h, w = image.shape[:2]
+    x0, y0, x1, y1 = box
+    roi = image[int(y0 * h):int(y1 * h), int(x0 * w):int(x1 * w)]
+
+    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if len(roi.shape) == 3 else roi
+
+    # Tesseract reconoce mejor el texto con al menos ~30 píxeles de altura
+    if gray.shape[0] < min_height:
+        scale = min_height / float(gray.shape[0])
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+
+    binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+    # Margen blanco para que el texto no toque el borde de la región
+    return cv2.copyMakeBorder(binary, 10, 10, 10, 10, cv2.BORDER_CONSTANT, value=255)
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+from app.core.ocr_cache import OCRCache
+
+# Estados posibles de una imagen en el manifiesto
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+
+class Manifest:
+    """
+    Registro persistente de las imágenes procesadas (un JSON por línea)
+
+    Cada imagen terminada añade una línea con su ruta, tamaño, fecha de modificación,
+    hash del contenido, estado y fila de resultados. Si hay varias líneas para la misma
+    imagen, vale la última. Permite reanudar un lote interrumpido sin repetir el OCR.
+
+    En memoria solo se guarda el índice (sin las filas de resultados): la posición de
+    la última línea de cada imagen, para leer su fila del archivo cuando se necesita.
+    """
+
+    def __init__(self, path):
+        """
+        Abre (o crea) el manifiesto y carga sus entradas
+
+        Args:
+            path (str): Ruta al archivo del manifiesto
+        """
+        self.path = path
+        self.entries = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                offset = 0
+                for line in f:
+                    line_offset = offset
+                    offset += len(line)
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Última línea a medio escribir si el proceso murió mientras escribía
+                        continue
+                    self._index(entry, line_offset)
+
+    def _index(self, entry, offset):
+        """Guarda en el índice los datos de una entrada, sin su fila de resultados"""
+        has_row = entry.pop('row', None) is not None
+        entry['offset'] = offset if has_row else None
+        self.entries[entry['path']] = entry
+
+    @staticmethod
+    def _key(image_path):
+        """Clave de una imagen en el manifiesto (ruta absoluta)"""
+        return os.path.abspath(image_path)
+
+    def is_done(self, image_path, retry_failed=False):
+        """
+        Indica si una imagen ya se procesó y no ha cambiado desde entonces
+
+        Args:
+            image_path (str): Ruta a la imagen
+            retry_failed (bool): Si las imágenes que fallaron deben volver a procesarse
+
+        Returns:
+            bool: True si se puede omitir la imagen
+        """
+        entry = self.entries.get(self._key(image_path))
+        if entry is None:
+            return False
+        if entry['status'] == STATUS_FAILED and retry_failed:
+            return False
+
+        try:
+            st = os.stat(image_path)
+        except OSError:
+            return False
+        if st.st_size == entry['size'] and st.st_mtime == entry['mtime']:
+            return True
+
+        # Cambió la fecha (p. ej. al copiar el archivo): comparar el contenido
+        if st.st_size != entry['size'] or not entry['hash']:
+            return False
+        return OCRCache.hash_file(image_path) == entry['hash']
+
+    def record(self, image_path, status, row=None, content_hash=None):
+        """
+        Añade la entrada de una imagen terminada y la escribe a disco inmediatamente
+
+        El archivo no se vuelve a leer: el hash lo calcula el proceso trabajador al leer la
+        imagen. Sin hash, si cambia la fecha de modificación la imagen se vuelve a procesar.
+
+        Args:
+            image_path (str): Ruta a la imagen
+            status (str): STATUS_OK o STATUS_FAILED
+            row (dict, optional): Fila de datos extraídos
+            content_hash (str, optional): Hash SHA-256 del contenido (ExtractedRecord.source_hash)
+        """
+        try:
+            st = os.stat(image_path)
+            size, mtime = st.st_size, st.st_mtime
+        except OSError:
+            size, mtime = None, None
+
+        entry = {
+            'path': self._key(image_path),
+            'size': size,
+            'mtime': mtime,
+            'hash': content_hash,
+            'status': status,
+            'row': row,
+            'recorded_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8')
+
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._index(entry, offset)
+
+    def record_result(self, image_path, record):
+        """
+        Registra el resultado de process_single_image
+
+        Args:
+            image_path (str): Ruta a la imagen
+            record (ExtractedRecord): Resultado de la imagen o None si falló
+        """
+        if record is None:
+            self.record(image_path, STATUS_FAILED)
+            return
+        self.record(image_path, STATUS_OK, record.as_dict(), record.source_hash)
+
+    def items(self, image_paths=None):
+        """
+        Recorre las imágenes procesadas correctamente junto con su fila de resultados
+
+        Las filas se leen del archivo a medida que se piden, sin cargarlas todas en memoria.
+
+        Args:
+            image_paths (list, optional): Imágenes a incluir, en ese orden. Por defecto
+                                          todas las del manifiesto
+
+        Yields:
+            tuple: (ruta absoluta de la imagen, fila de datos extraídos)
+        """
+        if image_paths is None:
+            keys = list(self.entries)
+        else:
+            keys = [self._key(path) for path in image_paths]
+
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb') as f:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None or entry['status'] != STATUS_OK or entry['offset'] is None:
+                    continue
+                f.seek(entry['offset'])
+                yield key, json.loads(f.readline())['row']
+
+    def rows(self, image_paths=None):
+        """
+        Recorre las filas de resultados de las imágenes procesadas correctamente
+
+        Args:
+            image_paths (list, optional): Imágenes a incluir, en ese orden. Por defecto
+                                          todas las del manifiesto
+
+        Yields:
+            dict: Fila de datos extraídos
+        """
+        for _, row in self.items(image_paths):
+            yield row
@@ -0,0 +1,538 @@
+import os
+import shlex
+import asyncio
+import tempfile
+import subprocess
+import cv2
+import numpy as np
+from PIL import Image
+from app.config import TESSERACT_CMD, TESSERACT_LANG, OCR_BATCH_SIZE
+
+def parse_config(config):
+    """
+    Interpreta una cadena de configuración de Tesseract
+
+    Args:
+        config (str): Configuración con el formato de la línea de comandos,
+                      p. ej. "--psm 7 --oem 3 -l spa -c tessedit_char_whitelist=0123456789"
+
+    Returns:
+        tuple: (idioma, psm, oem, variables) donde variables es un dict de opciones -c
+    """
+    lang = TESSERACT_LANG
+    psm = 3
+    oem = 3
+    variables = {}
+
+    args = shlex.split(config)
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        value = args[i + 1] if i + 1 < len(args) else None
+        if arg == '--psm':
+            psm = int(value)
+            i += 2
+        elif arg == '--oem':
+            oem = int(value)
+            i += 2
+        elif arg == '-l':
+            lang = value
+            i += 2
+        elif arg == '-c':
+            name, _, var_value = value.partition('=')
+            variables[name] = var_value
+            i += 2
+        else:
+            i += 1
+
+    return lang, psm, oem, variables
+
+class OCRBackend:
+    """Interfaz común de los motores OCR que usa ImageProcessor"""
+
+    name = "base"
+
+    def image_to_string(self, image, config):
+        """
+        Extrae el texto de una imagen
+
+        Args:
+            image (numpy.ndarray): Imagen a reconocer
+            config (str): Configuración de Tesseract
+
+        Returns:
+            str: Texto extraído
+        """
+        raise NotImplementedError
+
+    def image_to_data(self, image, config):
+        """
+        Extrae las palabras de una imagen con su confianza y posición en la página
+
+        Args:
+            image (numpy.ndarray): Imagen a reconocer
+            config (str): Configuración de Tesseract
+
+        Returns:
+            dict: Listas paralelas 'text', 'conf', 'block_num', 'par_num' y 'line_num',
+                  con el mismo formato que pytesseract.image_to_data con Output.DICT
+        """
+        raise NotImplementedError
+
+    def image_to_osd(self, image):
+        """
+        Detecta la orientación de una imagen con Tesseract OSD
+
+        Args:
+            image (numpy.ndarray): Imagen a analizar
+
+        Returns:
+            str: Salida de texto de OSD (incluye las líneas "Rotate:" y "Orientation confidence:")
+        """
+        raise NotImplementedError
+
+    def batch_image_to_string(self, images, config):
+        """
+        Extrae el texto de varias imágenes con la misma configuración
+
+        Por defecto se reconoce cada imagen por separado; los motores que pueden
+        reconocer varias imágenes de una vez lo redefinen.
+
+        Args:
+            images (list): Imágenes a reconocer
+            config (str): Configuración de Tesseract común a todas
+
+        Returns:
+            list: Texto extraído de cada imagen, en el mismo orden
+        """
+        return [self.image_to_string(image, config) for image in images]
+
+    def batch_image_to_data(self, images, config):
+        """
+        Extrae las palabras de varias imágenes con la misma configuración
+
+        Args:
+            images (list): Imágenes a reconocer
+            config (str): Configuración de Tesseract común a todas
+
+        Returns:
+            list: Salida de image_to_data de cada imagen, en el mismo orden
+        """
+        return [self.image_to_data(image, config) for image in images]
+
+    def concurrent_image_to_data(self, jobs, limit, accept):
+        """
+        Ejecuta varios trabajos image_to_data en orden, hasta el primero aceptado
+
+        Por defecto los trabajos se ejecutan uno tras otro; los motores que pueden
+        ejecutar varios a la vez lo redefinen. En ambos casos el resultado es el mismo:
+        se ejecutan todos los trabajos hasta el primero aceptado, y ninguno posterior
+        cuenta.
+
+        Args:
+            jobs (list): Tuplas (imagen, configuración) en orden de preferencia
+            limit (int): Máximo de trabajos en ejecución a la vez
+            accept (callable): Recibe la salida de image_to_data de un trabajo y devuelve
+                               True si es suficientemente buena para no seguir
+
+        Returns:
+            list: Salida de cada trabajo, la excepción que lanzó o None si no se
+                  ejecutó (o se canceló) porque ya había uno anterior aceptado
+        """
+        results = [None] * len(jobs)
+        for i, (image, config) in enumerate(jobs):
+            try:
+                results[i] = self.image_to_data(image, config)
+            except Exception as e:
+                results[i] = e
+                break
+            if accept(results[i]):
+                break
+        return results
+
+    def close(self):
+        """Libera los recursos del motor"""
+        pass
+
+class PytesseractBackend(OCRBackend):
+    """Motor basado en pytesseract: lanza un proceso tesseract por llamada"""
+
+    name = "pytesseract"
+
+    def __init__(self):
+        """Inicializa el motor (pytesseract se importa aquí: también carga pandas si está instalado)"""
+        import pytesseract
+        self._pytesseract = pytesseract
+
+        # Configurar pytesseract si se ha especificado una ruta
+        if TESSERACT_CMD:
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+    def image_to_string(self, image, config):
+        return self._pytesseract.image_to_string(image, config=config)
+
+    def image_to_data(self, image, config):
+        pytesseract = self._pytesseract
+        return pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+
+    def image_to_osd(self, image):
+        return self._pytesseract.image_to_osd(image)
+
+    def batch_image_to_string(self, images, config):
+        # Las páginas de la salida de texto se separan con un salto de página
+        return self._batch(images, config, self._run_list_string, self.image_to_string)
+
+    def batch_image_to_data(self, images, config):
+        return self._batch(images, config, self._run_list_data, self.image_to_data)
+
+    def concurrent_image_to_data(self, jobs, limit, accept):
+        if limit <= 1 or len(jobs) <= 1:
+            return super().concurrent_image_to_data(jobs, limit, accept)
+        return asyncio.run(self._run_concurrently(jobs, limit, accept))
+
+    async def _run_concurrently(self, jobs, limit, accept):
+        """
+        Lanza los trabajos como procesos tesseract, hasta limit a la vez y en orden
+
+        Cuando un trabajo es aceptado (o falla) se cancelan los posteriores, matando sus
+        procesos, y se sigue esperando a los anteriores: así el resultado es el mismo
+        que ejecutándolos uno tras otro, con la latencia del más lento de ellos.
+
+        Args:
+            jobs (list): Tuplas (imagen, configuración) en orden de preferencia
+            limit (int): Máximo de procesos tesseract a la vez
+            accept (callable): Ver OCRBackend.concurrent_image_to_data
+
+        Returns:
+            list: Ver OCRBackend.concurrent_image_to_data
+        """
+        # El semáforo atiende a las tareas en orden de llegada: los peldaños empiezan en orden
+        semaphore = asyncio.Semaphore(limit)
+        tasks = [asyncio.ensure_future(self._run_async(image, config, semaphore)) for image, config in jobs]
+        index = {task: i for i, task in enumerate(tasks)}
+        results = [None] * len(jobs)
+        cutoff = len(jobs)
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                i = index[task]
+                if task.cancelled():
+                    continue
+                try:
+                    results[i] = task.result()
+                    stop = accept(results[i])
+                except Exception as e:
+                    results[i] = e
+                    stop = True
+                if stop:
+                    cutoff = min(cutoff, i)
+            for task in pending:
+                if index[task] > cutoff:
+                    task.cancel()
+
+        # Los trabajos posteriores al aceptado no cuentan aunque hayan terminado antes
+        for i in range(cutoff + 1, len(jobs)):
+            results[i] = None
+        return results
+
+    async def _run_async(self, image, config, semaphore):
+        """
+        Ejecuta image_to_data en un proceso tesseract sin bloquear el bucle de eventos
+
+        La imagen se pasa por la entrada estándar y la salida TSV se lee de la salida
+        estándar, sin archivos temporales.
+
+        Args:
+            image (numpy.ndarray): Imagen a reconocer
+            config (str): Configuración de Tesseract
+            semaphore (asyncio.Semaphore): Limita los procesos en ejecución
+
+        Returns:
+            dict: Igual que image_to_data
+        """
+        async with semaphore:
+            ok, png = cv2.imencode('.png', image)
+            if not ok:
+                raise ValueError("no se pudo codificar la imagen")
+            command = [self._pytesseract.pytesseract.tesseract_cmd, 'stdin', 'stdout']
+            command += shlex.split(f"-c tessedit_create_tsv=1 {config}") + ['tsv']
+            process = await asyncio.create_subprocess_exec(
+                *command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await process.communicate(png.tobytes())
+            except asyncio.CancelledError:
+                # Otro peldaño ya ganó: no dejar el proceso tesseract trabajando
+                process.kill()
+                await process.wait()
+                raise
+        if process.returncode != 0:
+            raise self._pytesseract.TesseractError(process.returncode,
+                                                   stderr.decode('utf-8', errors='replace'))
+        return self._pytesseract.pytesseract.file_to_dict(stdout.decode('utf-8'), '\t', -1)
+
+    def _batch(self, images, config, run_list, run_single):
+        """
+        Reconoce las imágenes en bloques de config.OCR_BATCH_SIZE, un proceso tesseract por bloque
+
+        Si un bloque falla (p. ej. una imagen que Tesseract no puede leer descoloca las
+        páginas de la salida), se repite imagen por imagen para que el error quede en
+        la imagen que lo causa.
+
+        Args:
+            images (list): Imágenes a reconocer
+            config (str): Configuración de Tesseract común a todas
+            run_list (callable): Reconoce un bloque mediante un archivo de lista
+            run_single (callable): Reconoce una sola imagen
+
+        Returns:
+            list: Resultado de cada imagen, en el mismo orden
+        """
+        results = []
+        size = max(1, OCR_BATCH_SIZE)
+        for start in range(0, len(images), size):
+            chunk = images[start:start + size]
+            if len(chunk) == 1:
+                results.append(run_single(chunk[0], config))
+                continue
+            try:
+                results.extend(run_list(chunk, config))
+            except (self._pytesseract.TesseractError, OSError, ValueError):
+                results.extend(run_single(image, config) for image in chunk)
+        return results
+
+    def _run_list(self, images, config, extension):
+        """
+        Ejecuta un solo proceso tesseract sobre un archivo de lista con todas las imágenes
+
+        Args:
+            images (list): Imágenes a reconocer
+            config (str): Configuración de Tesseract
+            extension (str): Formato de salida de Tesseract ('txt' o 'tsv')
+
+        Returns:
+            str: Salida de Tesseract con todas las páginas, en el orden de la lista
+        """
+        with tempfile.TemporaryDirectory(prefix="idreader_ocr_") as tmp_dir:
+            paths = []
+            for i, image in enumerate(images):
+                path = os.path.join(tmp_dir, f"{i:05d}.png")
+                if not cv2.imwrite(path, image):
+                    raise ValueError("no se pudo escribir la imagen temporal")
+                paths.append(path)
+            list_path = os.path.join(tmp_dir, "images.txt")
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(paths) + "\n")
+
+            output_base = os.path.join(tmp_dir, "output")
+            command = [self._pytesseract.pytesseract.tesseract_cmd, list_path, output_base]
+            command += shlex.split(config) + [extension]
+            process = subprocess.run(command, capture_output=True)
+            if process.returncode != 0:
+                raise self._pytesseract.TesseractError(process.returncode,
+                                                 process.stderr.decode('utf-8', errors='replace'))
+            with open(f"{output_base}.{extension}", 'r', encoding='utf-8') as f:
+                return f.read()
+
+    def _run_list_string(self, images, config):
+        """Texto de cada imagen de un bloque (ver _run_list)"""
+        pages = self._run_list(images, config, 'txt').split("\f")
+        # Tras cada página hay un separador, así que sobra el trozo final
+        if len(pages) != len(images) + 1:
+            raise ValueError(f"se esperaban {len(images)} páginas y Tesseract devolvió {len(pages) - 1}")
+        return pages[:-1]
+
+    def _run_list_data(self, images, config):
+        """Salida de image_to_data de cada imagen de un bloque (ver _run_list)"""
+        tsv = self._run_list(images, f"-c tessedit_create_tsv=1 {config}", 'tsv')
+        data = self._pytesseract.pytesseract.file_to_dict(tsv, '\t', -1)
+
+        # Separar las filas por número de página (una página por imagen, desde 1)
+        pages = [{column: [] for column in data} for _ in images]
+        for row, page_num in enumerate(data.get('page_num', [])):
+            if not 1 <= page_num <= len(images):
+                raise ValueError(f"página inesperada en la salida de Tesseract: {page_num}")
+            page = pages[page_num - 1]
+            for column, values in data.items():
+                page[column].append(values[row])
+        return pages
+
+class TesserocrBackend(OCRBackend):
+    """
+    Motor basado en tesserocr: mantiene cargada la API de Tesseract en el proceso
+
+    Cada combinación de idioma y motor (oem) se inicializa una sola vez y se reutiliza
+    en las llamadas siguientes, evitando lanzar un proceso y recargar el modelo de
+    idioma en cada llamada. Cada proceso trabajador tiene sus propias instancias.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self):
+        """Inicializa el motor (falla con ImportError si tesserocr no está instalado)"""
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._apis = {}
+
+    def _get_api(self, lang, oem):
+        """
+        Devuelve la API de Tesseract para un idioma y motor, creándola la primera vez
+
+        Args:
+            lang (str): Idioma de Tesseract
+            oem (int): Modo del motor OCR
+
+        Returns:
+            tesserocr.PyTessBaseAPI: API inicializada
+        """
+        key = (lang, oem)
+        if key not in self._apis:
+            self._apis[key] = self._tesserocr.PyTessBaseAPI(lang=lang, oem=oem)
+        return self._apis[key]
+
+    def _prepare(self, image, config):
+        """
+        Configura la API para una llamada y le asigna la imagen
+
+        Args:
+            image (numpy.ndarray): Imagen a reconocer
+            config (str): Configuración de Tesseract
+
+        Returns:
+            tuple: (api, variables_anteriores) para restaurar las opciones -c al terminar
+        """
+        lang, psm, oem, variables = parse_config(config)
+        api = self._get_api(lang, oem)
+        api.SetPageSegMode(psm)
+
+        previous = {}
+        for name, value in variables.items():
+            previous[name] = api.GetVariableAsString(name) or ""
+            api.SetVariable(name, value)
+
+        api.SetImage(self._to_pil(image))
+        return api, previous
+
+    @staticmethod
+    def _restore(api, previous):
+        """Restaura las opciones -c que cambió _prepare"""
+        for name, value in previous.items():
+            api.SetVariable(name, value)
+
+    @staticmethod
+    def _to_pil(image):
+        """Convierte una imagen de OpenCV (BGR o escala de grises) a PIL"""
+        if len(image.shape) == 3:
+            image = np.ascontiguousarray(image[:, :, ::-1])
+        return Image.fromarray(image)
+
+    def image_to_string(self, image, config):
+        api, previous = self._prepare(image, config)
+        try:
+            return api.GetUTF8Text()
+        finally:
+            self._restore(api, previous)
+
+    def image_to_data(self, image, config):
+        tesserocr = self._tesserocr
+        api, previous = self._prepare(image, config)
+        data = {'text': [], 'conf': [], 'block_num': [], 'par_num': [], 'line_num': []}
+        try:
+            api.Recognize()
+            iterator = api.GetIterator()
+            block = par = line = 0
+            for word in tesserocr.iterate_level(iterator, tesserocr.RIL.WORD):
+                # Numerar bloques, párrafos y líneas igual que la salida TSV de Tesseract
+                if word.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                    block += 1
+                    par = line = 0
+                if word.IsAtBeginningOf(tesserocr.RIL.PARA):
+                    par += 1
+                    line = 0
+                if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                    line += 1
+
+                data['text'].append(word.GetUTF8Text(tesserocr.RIL.WORD) or "")
+                data['conf'].append(word.Confidence(tesserocr.RIL.WORD))
+                data['block_num'].append(block)
+                data['par_num'].append(par)
+                data['line_num'].append(line)
+        finally:
+            self._restore(api, previous)
+        return data
+
+    def image_to_osd(self, image):
+        key = ('osd', 'osd')
+        if key not in self._apis:
+            self._apis[key] = self._tesserocr.PyTessBaseAPI(lang='osd', psm=self._tesserocr.PSM.OSD_ONLY)
+        api = self._apis[key]
+        api.SetImage(self._to_pil(image))
+
+        result = api.DetectOrientationScript()
+        if not result:
+            raise RuntimeError("Tesseract OSD no pudo detectar la orientación")
+
+        # Mismo formato que la salida de "tesseract --psm 0"
+        orientation = result['orient_deg']
+        rotate = (360 - orientation) % 360
+        return (f"Orientation in degrees: {orientation}\n"
+                f"Rotate: {rotate}\n"
+                f"Orientation confidence: {result['orient_conf']:.2f}\n")
+
+    def close(self):
+        for api in self._apis.values():
+            api.End()
+        self._apis = {}
+
+def run_jobs(backend, jobs, data=False):
+    """
+    Ejecuta muchos trabajos OCR agrupándolos por configuración
+
+    Cada grupo se pasa de una vez al motor (batch_image_to_string o batch_image_to_data),
+    que con pytesseract lo reconoce con el menor número posible de procesos tesseract.
+
+    Args:
+        backend (OCRBackend): Motor OCR
+        jobs (list): Tuplas (imagen, configuración)
+        data (bool): Si se usa image_to_data en lugar de image_to_string
+
+    Returns:
+        list: Resultado de cada trabajo, en el mismo orden que jobs
+    """
+    groups = {}
+    for index, (_, config) in enumerate(jobs):
+        groups.setdefault(config, []).append(index)
+
+    run = backend.batch_image_to_data if data else backend.batch_image_to_string
+    results = [None] * len(jobs)
+    for config, indices in groups.items():
+        outputs = run([jobs[index][0] for index in indices], config)
+        for index, output in zip(indices, outputs):
+            results[index] = output
+    return results
+
+def create_backend(name="auto"):
+    """
+    Crea el motor OCR indicado
+
+    Args:
+        name (str): "tesserocr", "pytesseract" o "auto" (tesserocr si está
+                    instalado, si no pytesseract)
+
+    Returns:
+        OCRBackend: Motor OCR listo para usar
+    """
+    if name not in ("auto", "tesserocr", "pytesseract"):
+        raise ValueError(f"Motor OCR desconocido: {name}")
+
+    if name in ("auto", "tesserocr"):
+        try:
+            return TesserocrBackend()
+        except ImportError:
+            if name == "tesserocr":
+                raise
+            print("tesserocr no está instalado; se usará pytesseract como motor OCR")
+
+    return PytesseractBackend()
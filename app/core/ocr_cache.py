@@ -0,0 +1,251 @@
+import os
+import time
+import hashlib
+import sqlite3
+from collections import OrderedDict
+
+# Se incluye en cada clave: cambiarlo invalida todo lo guardado si cambia el preprocesamiento
+OCR_CACHE_VERSION = "2"
+
+# Aciertos cuya fecha de último uso se acumula en memoria antes de escribirla
+TOUCH_BATCH = 64
+
+class OCRCache:
+    """Caché persistente en disco de resultados OCR, direccionada por contenido"""
+
+    def __init__(self, path, max_bytes):
+        """
+        Abre (o crea) la caché OCR
+
+        Args:
+            path (str): Ruta al archivo SQLite de la caché
+            max_bytes (int): Tamaño máximo del texto almacenado. Al superarlo se
+                             eliminan las entradas usadas hace más tiempo (LRU)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        # Fechas de último uso pendientes de escribir: clave -> fecha
+        self._touched = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Varios procesos trabajadores pueden compartir el mismo archivo
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache ("
+            " key TEXT PRIMARY KEY,"
+            " text TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_access ON ocr_cache (last_access)")
+        # Tamaño total guardado en una sola fila, para no sumar la tabla en cada inserción.
+        # Se guarda en el archivo y no en memoria porque varios procesos escriben a la vez
+        self.conn.execute("CREATE TABLE IF NOT EXISTS ocr_cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)")
+        self.conn.execute(
+            "INSERT OR IGNORE INTO ocr_cache_size (id, total) "
+            "SELECT 0, COALESCE(SUM(size), 0) FROM ocr_cache"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def hash_file(path):
+        """
+        Calcula el hash SHA-256 del contenido de un archivo
+
+        Args:
+            path (str): Ruta al archivo
+
+        Returns:
+            str: Hash hexadecimal del contenido
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(image_hash, branch, config):
+        """
+        Construye la clave de una llamada OCR
+
+        Args:
+            image_hash (str): Hash del contenido del archivo de imagen original
+            branch (str): Rama de preprocesamiento (front, reverse, inverted, negative, rotated...)
+            config (str): Cadena de configuración exacta de Tesseract
+
+        Returns:
+            str: Clave de la caché
+        """
+        raw = "\x00".join([OCR_CACHE_VERSION, image_hash, branch, config])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Busca un resultado en la caché
+
+        Args:
+            key (str): Clave generada con make_key
+
+        Returns:
+            str: Texto OCR guardado o None si no está en la caché
+        """
+        row = self.conn.execute("SELECT text FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._touched[key] = time.time()
+        if self.hits % TOUCH_BATCH == 0:
+            self.flush()
+        return row[0]
+
+    def flush(self):
+        """Escribe las fechas de último uso acumuladas desde la última escritura"""
+        if self._touched:
+            self._write_touched()
+            self.conn.commit()
+
+    def _write_touched(self):
+        """Actualiza last_access de los aciertos acumulados (sin confirmar la transacción)"""
+        self.conn.executemany(
+            "UPDATE ocr_cache SET last_access = ? WHERE key = ?",
+            [(accessed, key) for key, accessed in self._touched.items()]
+        )
+        self._touched.clear()
+
+    def put(self, key, text):
+        """
+        Guarda un resultado en la caché y aplica el límite de tamaño
+
+        Args:
+            key (str): Clave generada con make_key
+            text (str): Texto OCR a guardar
+        """
+        size = len(text.encode('utf-8'))
+        # El total se ajusta en la misma transacción, descontando la entrada que se sustituye
+        self.conn.execute(
+            "UPDATE ocr_cache_size SET total = total + ? - "
+            "COALESCE((SELECT size FROM ocr_cache WHERE key = ?), 0) WHERE id = 0",
+            (size, key)
+        )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO ocr_cache (key, text, size, last_access) VALUES (?, ?, ?, ?)",
+            (key, text, size, time.time())
+        )
+        self._evict()
+        self.conn.commit()
+
+    def _evict(self):
+        """Elimina las entradas menos usadas recientemente hasta respetar max_bytes"""
+        total = self.conn.execute("SELECT total FROM ocr_cache_size WHERE id = 0").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Los aciertos recientes de este proceso cuentan para decidir qué se desaloja
+        self._write_touched()
+
+        # Liberar hasta el 90% del límite para no tener que desalojar en cada inserción
+        target = int(self.max_bytes * 0.9)
+        rows = self.conn.execute("SELECT key, size FROM ocr_cache ORDER BY last_access")
+        evicted = []
+        freed = 0
+        for key, size in rows:
+            if total - freed <= target:
+                break
+            evicted.append((key,))
+            freed += size
+        self.conn.executemany("DELETE FROM ocr_cache WHERE key = ?", evicted)
+        self.conn.execute("UPDATE ocr_cache_size SET total = total - ? WHERE id = 0", (freed,))
+
+    def stats(self):
+        """
+        Devuelve los contadores de la caché
+
+        Returns:
+            dict: Aciertos, fallos y entradas almacenadas
+        """
+        entries = self.conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+
+    def close(self):
+        """Escribe las fechas de último uso pendientes y cierra la conexión con la caché"""
+        self.flush()
+        self.conn.close()
+
+class OCRMemo:
+    """
+    Memo en memoria de llamadas OCR durante la ejecución, direccionado por los píxeles
+
+    A diferencia de OCRCache, la clave no depende de la rama de preprocesamiento sino del
+    contenido de la imagen que recibe Tesseract: dos ramas que producen los mismos píxeles
+    (p. ej. la imagen invertida del reverso y su negativo) con la misma configuración
+    comparten resultado, aunque la caché persistente esté desactivada.
+    """
+
+    def __init__(self, max_entries):
+        """
+        Crea un memo vacío
+
+        Args:
+            max_entries (int): Resultados que se conservan; al superarlo se descartan
+                               los usados hace más tiempo
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def make_key(image, call):
+        """
+        Construye la clave de una llamada OCR a partir de los píxeles de la imagen
+
+        Args:
+            image (numpy.ndarray): Imagen que recibe Tesseract
+            call (str): Tipo de llamada y configuración exacta de Tesseract
+
+        Returns:
+            bytes: Resumen BLAKE2 de la forma, el tipo, los píxeles y la llamada
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{image.shape}|{image.dtype.str}|{call}".encode('utf-8'))
+        # Los recortes son vistas no contiguas: solo esas se copian
+        digest.update(image.data if image.flags.c_contiguous else image.tobytes())
+        return digest.digest()
+
+    def get(self, key):
+        """
+        Busca un resultado en el memo
+
+        Args:
+            key (bytes): Clave de make_key
+
+        Returns:
+            Resultado guardado o None si no está
+        """
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Guarda un resultado en el memo
+
+        Args:
+            key (bytes): Clave de make_key
+            value: Resultado de la llamada
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,218 @@
+import os
+import re
+from app.core.results import COLUMNS
+
+# Lados de la cédula
+FRONT = 'anverso'
+BACK = 'reverso'
+
+# Columnas que se leen de cada lado
+FRONT_FIELDS = ('Nombre', 'Apellido', 'Documento')
+BACK_FIELDS = ('Fecha_Nacimiento', 'Genero', 'Fecha_Expedicion')
+
+# Sufijo del nombre de archivo que indica el lado: juan_front.jpg, juan-reverso.png, ...
+_SIDE_SUFFIX = re.compile(
+    r'^(?P<stem>.*?)[\s_.\-]*(?P<side>front|frente|anverso|delantera|back|reverso|reverse|trasera)$',
+    re.IGNORECASE
+)
+_BACK_WORDS = {'back', 'reverso', 'reverse', 'trasera'}
+_NON_DIGITS = re.compile(r'\D')
+
+def split_side_suffix(image_path):
+    """
+    Separa el nombre de una imagen en raíz común y lado según su sufijo
+
+    Args:
+        image_path (str): Ruta a la imagen
+
+    Returns:
+        tuple: (raíz en minúsculas, FRONT o BACK) o (None, None) si no tiene sufijo de lado
+    """
+    name = os.path.splitext(os.path.basename(image_path))[0]
+    match = _SIDE_SUFFIX.match(name)
+    if not match or not match.group('stem'):
+        return None, None
+    side = BACK if match.group('side').lower() in _BACK_WORDS else FRONT
+    return match.group('stem').lower(), side
+
+def document_key(row):
+    """
+    Número de documento de una fila, normalizado para comparar anverso y reverso
+
+    El anverso lo trae de "NUMERO 1.234.567.890" y el reverso del código impreso bajo el
+    código de barras, con ceros a la izquierda: se comparan solo las cifras significativas.
+
+    Args:
+        row (dict): Fila de datos extraídos
+
+    Returns:
+        str: Cifras del documento sin ceros a la izquierda o None si no tiene
+    """
+    digits = _NON_DIGITS.sub('', str(row.get('Documento') or '')).lstrip('0')
+    return digits or None
+
+def _has_values(row, fields):
+    """Comprueba si la fila tiene algún valor en las columnas indicadas"""
+    return any(row.get(field) not in (None, '') for field in fields)
+
+def detect_side(image_path, row):
+    """
+    Determina de qué lado de la cédula es una fila de resultados
+
+    Usa el sufijo del nombre de archivo y, si no lo tiene, los campos extraídos.
+
+    Args:
+        image_path (str): Ruta a la imagen
+        row (dict): Fila de datos extraídos
+
+    Returns:
+        str: FRONT, BACK o None si no se puede determinar
+    """
+    _, side = split_side_suffix(image_path)
+    if side is not None:
+        return side
+    is_front = _has_values(row, FRONT_FIELDS)
+    is_back = _has_values(row, BACK_FIELDS)
+    if is_front != is_back:
+        return FRONT if is_front else BACK
+    # Un reverso puede traer el número de documento, pero no el nombre
+    if is_back and not _has_values(row, ('Nombre', 'Apellido')):
+        return BACK
+    return None
+
+def merge_halves(front, back):
+    """
+    Combina las filas del anverso y del reverso de la misma cédula
+
+    Toma del anverso Nombre, Apellido y Documento y del reverso el resto; si un lado
+    no tiene el valor se usa el del otro.
+
+    Args:
+        front (dict): Fila del anverso
+        back (dict): Fila del reverso
+
+    Returns:
+        dict: Fila combinada
+    """
+    row = {}
+    for column in COLUMNS:
+        first, second = (back, front) if column in BACK_FIELDS else (front, back)
+        value = first.get(column)
+        row[column] = value if value not in (None, '') else second.get(column)
+    return row
+
+class _Half:
+    """Mitad (anverso o reverso) pendiente de encontrar su pareja"""
+
+    __slots__ = ('path', 'row', 'side', 'keys', 'stem')
+
+    def __init__(self, path, row, side, keys, stem):
+        self.path = path
+        self.row = row
+        self.side = side
+        self.keys = keys
+        self.stem = stem
+
+class FrontBackPairer:
+    """
+    Empareja anversos y reversos de todo un lote en una sola pasada
+
+    Cada mitad se indexa por número de documento (el del anverso y el del código del
+    reverso, ver document_key) y por la raíz del nombre de archivo (juan_front / juan_reverso). Cuando llega la mitad que falta se emite la fila
+    combinada y la pareja sale del índice, así que en memoria solo quedan las mitades
+    pendientes. Como último recurso, dos mitades consecutivas sin sufijo de lado ni
+    documentos distintos se consideran de la misma persona (el orden anverso, reverso
+    que usaba la versión anterior).
+    """
+
+    def __init__(self):
+        self.pairs = 0
+        self.unknown = 0
+        self.unmatched = []
+        self._index = {}
+        self._pending = {}
+        self._previous = None
+
+    @staticmethod
+    def _keys(half):
+        """Claves de búsqueda de una mitad"""
+        keys = []
+        documento = document_key(half.row)
+        if documento:
+            keys.append(('doc', documento))
+        if half.stem:
+            keys.append(('stem', half.stem))
+        return keys
+
+    def _find(self, half):
+        """Busca en el índice la mitad del otro lado que corresponde a half"""
+        other = FRONT if half.side == BACK else BACK
+        for key in half.keys:
+            candidate = self._index.get((other, key))
+            if candidate is not None:
+                return candidate
+
+        # Último recurso: la mitad anterior, si sigue pendiente y nada indica que sea de otra persona
+        previous = self._previous
+        if (previous is not None and previous.side == other and id(previous) in self._pending
+                and not half.stem and not previous.stem):
+            doc_a, doc_b = document_key(half.row), document_key(previous.row)
+            if not (doc_a and doc_b and doc_a != doc_b):
+                return previous
+        return None
+
+    def _add(self, half):
+        """Añade una mitad pendiente al índice"""
+        self._pending[id(half)] = half
+        for key in half.keys:
+            self._index.setdefault((half.side, key), half)
+
+    def _remove(self, half):
+        """Saca una mitad emparejada del índice"""
+        del self._pending[id(half)]
+        for key in half.keys:
+            if self._index.get((half.side, key)) is half:
+                del self._index[(half.side, key)]
+
+    def pair(self, items):
+        """
+        Empareja las filas de un lote
+
+        Args:
+            items (iterable): Pares (ruta de la imagen, fila de datos extraídos) en orden de entrada
+
+        Yields:
+            dict: Filas combinadas a medida que se completan las parejas, filas de lado
+                  desconocido tal cual y, al final, las mitades sin pareja
+        """
+        for path, row in items:
+            side = detect_side(path, row)
+            if side is None:
+                self.unknown += 1
+                self._previous = None
+                yield row
+                continue
+
+            stem, _ = split_side_suffix(path)
+            half = _Half(path, row, side, [], stem)
+            half.keys = self._keys(half)
+
+            match = self._find(half)
+            if match is None:
+                self._add(half)
+                self._previous = half
+                continue
+
+            self._remove(match)
+            self._previous = None
+            self.pairs += 1
+            front, back = (half, match) if side == FRONT else (match, half)
+            yield merge_halves(front.row, back.row)
+
+        # Mitades que no encontraron pareja, en orden de entrada
+        for half in self._pending.values():
+            self.unmatched.append((half.path, half.side))
+            yield half.row
+        self._index = {}
+        self._pending = {}
+        self._previous = None
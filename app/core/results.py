@@ -0,0 +1,187 @@
+import os
+import csv
+
+# Columnas de los resultados, en el orden en que se escriben en los CSV
+COLUMNS = ('Nombre', 'Apellido', 'Documento', 'Fecha_Nacimiento', 'Genero', 'Fecha_Expedicion', 'Timestamp')
+
+class ExtractedRecord:
+    """
+    Datos extraídos de una imagen (una fila de resultados)
+
+    Además de las columnas, source_hash guarda el hash SHA-256 del archivo del que se
+    extrajeron (None si no se conoce). No se escribe en los resultados: lo usa el manifiesto.
+    """
+
+    __slots__ = COLUMNS + ('source_hash',)
+
+    def __init__(self, Nombre="", Apellido="", Documento="", Fecha_Nacimiento=None,
+                 Genero=None, Fecha_Expedicion=None, Timestamp=None):
+        self.Nombre = Nombre
+        self.Apellido = Apellido
+        self.Documento = Documento
+        self.Fecha_Nacimiento = Fecha_Nacimiento
+        self.Genero = Genero
+        self.Fecha_Expedicion = Fecha_Expedicion
+        self.Timestamp = Timestamp
+        self.source_hash = None
+
+    @classmethod
+    def from_dict(cls, row):
+        """
+        Crea un registro a partir de un dict (p. ej. una fila del manifiesto)
+
+        Args:
+            row (dict): Valores por nombre de columna; las columnas desconocidas se ignoran
+
+        Returns:
+            ExtractedRecord: Registro con esos valores
+        """
+        return cls(**{column: row[column] for column in COLUMNS if column in row})
+
+    def as_dict(self):
+        """Devuelve el registro como dict ordenado por COLUMNS"""
+        return {column: getattr(self, column) for column in COLUMNS}
+
+    def as_row(self):
+        """Devuelve los valores del registro como tupla ordenada por COLUMNS"""
+        return tuple(getattr(self, column) for column in COLUMNS)
+
+    def __repr__(self):
+        values = ", ".join(f"{column}={getattr(self, column)!r}" for column in COLUMNS)
+        return f"ExtractedRecord({values})"
+
+class CSVSink:
+    """Escribe registros en un CSV a medida que llegan, sin acumularlos en memoria"""
+
+    def __init__(self, path, append=False):
+        """
+        Abre el CSV de destino
+
+        Args:
+            path (str): Ruta del CSV
+            append (bool): Si se añaden filas a un CSV existente en lugar de reescribirlo
+        """
+        self.path = path
+        self.count = 0
+        write_header = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if write_header:
+            self._writer.writerow(COLUMNS)
+
+    def write(self, record):
+        """
+        Escribe un registro
+
+        Args:
+            record (ExtractedRecord): Registro a escribir
+        """
+        # None se escribe como celda vacía, igual que pandas.to_csv
+        self._writer.writerow(['' if value is None else value for value in record.as_row()])
+        self.count += 1
+
+    def flush(self):
+        """Fuerza la escritura a disco de las filas pendientes"""
+        self._file.flush()
+
+    def close(self):
+        """Cierra el CSV"""
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ParquetSink:
+    """Escribe registros en un archivo Parquet por grupos de filas (requiere pyarrow)"""
+
+    def __init__(self, path, row_group_size=1000):
+        """
+        Abre el archivo Parquet de destino (falla con ImportError si pyarrow no está instalado)
+
+        Args:
+            path (str): Ruta del archivo Parquet
+            row_group_size (int): Filas que se acumulan antes de escribir cada grupo
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.path = path
+        self.count = 0
+        self.row_group_size = max(1, row_group_size)
+        self._schema = pa.schema([(column, pa.string()) for column in COLUMNS])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._buffer = []
+
+    def write(self, record):
+        """
+        Añade un registro al grupo actual y lo escribe cuando está completo
+
+        Args:
+            record (ExtractedRecord): Registro a escribir
+        """
+        self._buffer.append(record.as_row())
+        self.count += 1
+        if len(self._buffer) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Escribe las filas acumuladas como un grupo de filas"""
+        if not self._buffer:
+            return
+        columns = [
+            [None if value is None else str(value) for value in values]
+            for values in zip(*self._buffer)
+        ]
+        self._writer.write_table(self._pa.Table.from_arrays(columns, schema=self._schema))
+        self._buffer = []
+
+    def close(self):
+        """Escribe el último grupo y cierra el archivo"""
+        if self._writer is not None:
+            self.flush()
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_sink(path, fmt='csv', append=False, row_group_size=1000):
+    """
+    Abre el destino de resultados adecuado para el formato
+
+    Args:
+        path (str): Ruta del archivo sin extensión o con la extensión del formato
+        fmt (str): 'csv' o 'parquet'
+        append (bool): Si se añaden filas a un CSV existente (no aplica a Parquet)
+        row_group_size (int): Filas por grupo en Parquet
+
+    Returns:
+        CSVSink | ParquetSink: Destino abierto
+    """
+    fmt = fmt.lower()
+    root, ext = os.path.splitext(path)
+    if fmt == 'csv':
+        return CSVSink(root + (ext or '.csv'), append=append)
+    if fmt == 'parquet':
+        return ParquetSink(root + '.parquet', row_group_size=row_group_size)
+    raise ValueError(f"Formato de resultados desconocido: {fmt}")
+
+def write_records(path, records):
+    """
+    Guarda una lista corta de registros en un CSV nuevo
+
+    Args:
+        path (str): Ruta del CSV
+        records (list): Registros (ExtractedRecord) a guardar
+    """
+    with CSVSink(path) as sink:
+        for record in records:
+            sink.write(record)
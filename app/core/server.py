@@ -0,0 +1,316 @@
+import os
+import json
+import time
+import queue
+import shutil
+import logging
+import tempfile
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from app.core.batch import init_worker, process_chunk_in_worker
+from app.utils.metrics import MetricsExporter
+from app.config import (OUTPUT_DIR, VALID_EXTENSIONS, METRICS_ENABLED, SERVER_BATCH_SIZE,
+                        SERVER_BATCH_WAIT_MS, SERVER_MAX_PENDING, SERVER_MAX_BYTES, SERVER_TIMEOUT)
+
+class ServiceBusy(Exception):
+    """Se lanza cuando ya hay SERVER_MAX_PENDING imágenes esperando o en proceso"""
+
+def warm_worker():
+    """Tarea vacía para que cada proceso trabajador ejecute init_worker antes de la primera petición"""
+    return os.getpid()
+
+class _Request:
+    """Imagen recibida por el servicio, a la espera de su resultado"""
+
+    __slots__ = ('image_path', 'future')
+
+    def __init__(self, image_path):
+        self.image_path = image_path
+        self.future = Future()
+
+class OCRService:
+    """
+    Procesa imágenes sueltas con un pool de procesos trabajadores siempre cargados
+
+    Cada proceso crea su procesador y su extractor una sola vez (init_worker), así que
+    una petición no paga el arranque ni la carga del modelo de Tesseract. Un hilo
+    despachador agrupa las peticiones que llegan a la vez en bloques de hasta batch_size
+    imágenes (process_chunk, con las pasadas OCR agrupadas según config.OCR_BATCH_SIZE)
+    y solo envía un bloque cuando hay un proceso libre: con poca carga cada imagen sale
+    enseguida y, con carga, las que esperan forman el siguiente bloque.
+    """
+
+    def __init__(self, workers=1, output_dir=None, batch_size=SERVER_BATCH_SIZE,
+                 batch_wait_ms=SERVER_BATCH_WAIT_MS, max_pending=SERVER_MAX_PENDING):
+        """
+        Arranca los procesos trabajadores y el despachador
+
+        Args:
+            workers (int): Número de procesos trabajadores
+            output_dir (str, optional): Directorio para guardar resultados.
+                                        Por defecto usa el valor de config.OUTPUT_DIR
+            batch_size (int): Máximo de imágenes por bloque
+            batch_wait_ms (float): Milisegundos que se espera a completar un bloque
+            max_pending (int): Máximo de imágenes esperando o en proceso
+        """
+        self.workers = max(1, workers)
+        self.output_dir = output_dir or OUTPUT_DIR
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait_ms / 1000
+        self.max_pending = max_pending
+        self.processed = 0
+        self.failed = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._slots = threading.Semaphore(self.workers)
+        self._spool_dir = tempfile.mkdtemp(prefix='idreader-')
+        self._exporter = MetricsExporter() if METRICS_ENABLED else None
+        self._executor = self._start_executor()
+        self._dispatcher = threading.Thread(target=self._dispatch, name='idreader-dispatcher', daemon=True)
+        self._dispatcher.start()
+
+    def _start_executor(self):
+        """Crea el pool y espera a que todos los procesos hayan ejecutado init_worker"""
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                       initargs=(self.output_dir,))
+        for future in [executor.submit(warm_worker) for _ in range(self.workers)]:
+            future.result()
+        return executor
+
+    def submit(self, image_path):
+        """
+        Encola una imagen ya guardada en disco
+
+        Args:
+            image_path (str): Ruta a la imagen
+
+        Returns:
+            Future: Se resuelve con (ExtractedRecord o None si hubo error, métricas o None)
+
+        Raises:
+            ServiceBusy: Si ya hay max_pending imágenes esperando o en proceso
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ServiceBusy(f"Hay {self._pending} imágenes en espera")
+            self._pending += 1
+        request = _Request(image_path)
+        self._queue.put(request)
+        return request.future
+
+    def process_bytes(self, data, filename, timeout=SERVER_TIMEOUT):
+        """
+        Procesa una imagen recibida en memoria
+
+        La imagen se guarda con su nombre en un directorio temporal propio, que se borra
+        cuando termina su proceso.
+
+        Args:
+            data (bytes): Contenido del archivo de imagen
+            filename (str): Nombre del archivo
+            timeout (float): Segundos máximos de espera
+
+        Returns:
+            ExtractedRecord: Registro con los datos extraídos o None si no se pudo procesar
+
+        Raises:
+            ServiceBusy: Si el servicio está saturado
+            TimeoutError: Si la imagen no terminó a tiempo (sigue procesándose)
+        """
+        request_dir = tempfile.mkdtemp(dir=self._spool_dir)
+        image_path = os.path.join(request_dir, filename)
+        with open(image_path, 'wb') as f:
+            f.write(data)
+        try:
+            future = self.submit(image_path)
+        except ServiceBusy:
+            shutil.rmtree(request_dir, ignore_errors=True)
+            raise
+        future.add_done_callback(lambda _: shutil.rmtree(request_dir, ignore_errors=True))
+        record, _ = future.result(timeout=timeout)
+        return record
+
+    def status(self):
+        """Devuelve el estado del servicio para /health"""
+        with self._lock:
+            pending = self._pending
+        return {'status': 'ok', 'workers': self.workers, 'pending': pending,
+                'processed': self.processed, 'failed': self.failed}
+
+    def _dispatch(self):
+        """Forma bloques con las peticiones en cola y los envía a los procesos libres"""
+        while True:
+            self._slots.acquire()
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    request = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if request is None:
+                    # Enviar lo ya agrupado y terminar en la siguiente vuelta
+                    self._queue.put(None)
+                    break
+                batch.append(request)
+            self._submit(batch)
+
+    def _submit(self, batch):
+        """Envía un bloque a un proceso trabajador, reiniciando el pool si se rompió"""
+        paths = [request.image_path for request in batch]
+        try:
+            future = self._executor.submit(process_chunk_in_worker, paths, False)
+        except BrokenProcessPool:
+            print("Un proceso trabajador terminó de forma inesperada; se reinicia el pool")
+            self._executor.shutdown(wait=False)
+            self._executor = self._start_executor()
+            future = self._executor.submit(process_chunk_in_worker, paths, False)
+        future.add_done_callback(lambda f: self._finish(batch, f))
+
+    def _finish(self, batch, future):
+        """Entrega a cada petición del bloque su resultado"""
+        self._slots.release()
+        try:
+            outputs = future.result()
+        except Exception as e:
+            # Por ejemplo, si el proceso trabajador murió procesando este bloque
+            print(f"  Error procesando {', '.join(os.path.basename(r.image_path) for r in batch)}: {str(e)}")
+            outputs = [(None, None)] * len(batch)
+
+        with self._lock:
+            for request, (record, snapshot) in zip(batch, outputs):
+                self._pending -= 1
+                if record is None:
+                    self.failed += 1
+                else:
+                    self.processed += 1
+                if self._exporter is not None:
+                    self._exporter.record(request.image_path, snapshot, "ok" if record is not None else "error")
+        for request, output in zip(batch, outputs):
+            request.future.set_result(output)
+
+    def close(self):
+        """Espera a las imágenes en curso y detiene los procesos trabajadores"""
+        self._queue.put(None)
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+        if self._exporter is not None:
+            self._exporter.close()
+        shutil.rmtree(self._spool_dir, ignore_errors=True)
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Peticiones HTTP del servicio
+
+    - POST /process?filename=cedula_front.jpg con la imagen como cuerpo: devuelve el
+      registro extraído como JSON
+    - GET /health: estado del servicio
+    """
+
+    server_version = 'ID-Reader'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if urlsplit(self.path).path != '/health':
+            self._send_json(404, {'error': 'Ruta no encontrada'})
+            return
+        self._send_json(200, self.server.service.status())
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/process':
+            self._send_json(404, {'error': 'Ruta no encontrada'})
+            return
+
+        filename = os.path.basename(parse_qs(url.query).get('filename', ['imagen.jpg'])[0]) or 'imagen.jpg'
+        if filename.rsplit('.', 1)[-1].lower() not in VALID_EXTENSIONS:
+            self._send_json(415, {'error': f"Extensión no admitida: {filename}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = 0
+        if length <= 0:
+            self._send_json(400, {'error': 'Se esperaba la imagen en el cuerpo de la petición'})
+            return
+        if length > SERVER_MAX_BYTES:
+            self.close_connection = True
+            self._send_json(413, {'error': f"La imagen supera {SERVER_MAX_BYTES} bytes"})
+            return
+        data = self.rfile.read(length)
+
+        try:
+            record = self.server.service.process_bytes(data, filename)
+        except ServiceBusy as e:
+            self._send_json(503, {'error': f"Servicio saturado: {str(e)}"}, {'Retry-After': '1'})
+            return
+        except TimeoutError:
+            self._send_json(504, {'error': 'La imagen no terminó de procesarse a tiempo'})
+            return
+        if record is None:
+            self._send_json(422, {'error': 'No se pudo extraer información de la imagen'})
+            return
+        self._send_json(200, record.as_dict())
+
+    def _send_json(self, status, payload, headers=None):
+        """Envía una respuesta JSON"""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.info(f"{self.address_string()} {format % args}")
+
+def make_server(service, host, port):
+    """
+    Crea el servidor HTTP (un hilo por conexión) para un servicio
+
+    Args:
+        service (OCRService): Servicio que procesa las imágenes
+        host (str): Dirección en la que escuchar
+        port (int): Puerto (0 = uno libre)
+
+    Returns:
+        ThreadingHTTPServer: Servidor sin arrancar; su puerto real está en server_address
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+def run_server(host, port, workers=1, output_dir=None):
+    """
+    Atiende peticiones HTTP hasta Ctrl+C
+
+    Args:
+        host (str): Dirección en la que escuchar
+        port (int): Puerto
+        workers (int): Número de procesos trabajadores
+        output_dir (str, optional): Directorio para guardar resultados.
+                                    Por defecto usa el valor de config.OUTPUT_DIR
+    """
+    print(f"Cargando {workers} procesos trabajadores...")
+    service = OCRService(workers=workers, output_dir=output_dir)
+    server = make_server(service, host, port)
+    host, port = server.server_address[:2]
+    print(f"Servicio en http://{host}:{port} (POST /process?filename=..., GET /health). Ctrl+C para detener.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nDeteniendo el servicio...")
+    finally:
+        server.server_close()
+        service.close()
+        print(f"Imágenes procesadas: {service.processed}, con error: {service.failed}")
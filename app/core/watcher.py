@@ -0,0 +1,212 @@
+import os
+import time
+import struct
+import select
+import ctypes
+import ctypes.util
+from app.config import VALID_EXTENSIONS, WATCH_INTERVAL, WATCH_DEBOUNCE
+
+# Constantes de inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+class _Inotify:
+    """Acceso mínimo a inotify de Linux mediante ctypes"""
+
+    def __init__(self, directory):
+        """
+        Empieza a vigilar un directorio
+
+        Args:
+            directory (str): Directorio a vigilar
+
+        Raises:
+            OSError: Si inotify no está disponible en este sistema
+        """
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("No se encontró libc")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify no está disponible")
+
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falló")
+
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch falló para {directory}")
+
+    def read(self, timeout):
+        """
+        Espera eventos durante como mucho timeout segundos
+
+        Args:
+            timeout (float): Segundos de espera
+
+        Returns:
+            list: Nombres de los archivos con eventos
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        names = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buffer):
+            _, _, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        """Deja de vigilar el directorio"""
+        os.close(self.fd)
+
+class FolderWatcher:
+    """
+    Detecta imágenes nuevas en un directorio y las entrega cuando terminan de escribirse
+
+    Usa inotify en Linux y, si no está disponible, revisa el directorio periódicamente.
+    Un archivo se considera completo cuando su tamaño y fecha de modificación no
+    cambian durante `debounce` segundos.
+    """
+
+    def __init__(self, directory, interval=None, debounce=None, include_existing=True):
+        """
+        Inicializa el vigilante
+
+        Args:
+            directory (str): Directorio a vigilar
+            interval (float, optional): Segundos entre revisiones del directorio.
+                                        Por defecto config.WATCH_INTERVAL
+            debounce (float, optional): Segundos que un archivo debe permanecer sin
+                                        cambios. Por defecto config.WATCH_DEBOUNCE
+            include_existing (bool): Si se entregan también las imágenes que ya estaban
+        """
+        self.directory = directory
+        self.interval = interval if interval is not None else WATCH_INTERVAL
+        self.debounce = debounce if debounce is not None else WATCH_DEBOUNCE
+
+        # Archivos ya entregados (ruta -> (tamaño, mtime)) y pendientes de estabilizarse
+        # (ruta -> (tamaño, mtime, instante desde el que no cambian))
+        self._delivered = {}
+        self._pending = {}
+
+        try:
+            self._inotify = _Inotify(directory)
+            self.mode = "inotify"
+        except (OSError, AttributeError) as e:
+            print(f"inotify no disponible ({str(e)}); se revisará el directorio cada {self.interval} s")
+            self._inotify = None
+            self.mode = "polling"
+
+        self._last_scan = 0.0
+        if include_existing:
+            self._scan()
+        else:
+            for path in self._list_images():
+                self._delivered[path] = self._stat(path)
+
+    @staticmethod
+    def _is_image(name):
+        """Comprueba si el nombre de archivo tiene una extensión de imagen válida"""
+        return os.path.splitext(name)[1].lower().lstrip('.') in VALID_EXTENSIONS
+
+    def _list_images(self):
+        """Lista las imágenes válidas del directorio"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, name) for name in names if self._is_image(name)]
+
+    @staticmethod
+    def _stat(path):
+        """Devuelve (tamaño, mtime) de un archivo o None si ya no existe"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime
+
+    def _track(self, path):
+        """Añade un archivo a los pendientes si es nuevo o cambió desde que se entregó"""
+        stat = self._stat(path)
+        if stat is None or self._delivered.get(path) == stat or path in self._pending:
+            return
+        self._pending[path] = (stat[0], stat[1], time.monotonic())
+
+    def _scan(self):
+        """Revisa el directorio completo en busca de archivos nuevos"""
+        self._last_scan = time.monotonic()
+        for path in self._list_images():
+            self._track(path)
+
+    def poll(self, timeout=None):
+        """
+        Espera archivos nuevos y devuelve los que ya terminaron de escribirse
+
+        Args:
+            timeout (float, optional): Segundos de espera como máximo. Por defecto interval
+
+        Returns:
+            list: Rutas de las imágenes listas para procesar
+        """
+        timeout = self.interval if timeout is None else timeout
+
+        # Mientras haya pendientes, despertar a tiempo para comprobar si ya están estables
+        if self._pending:
+            timeout = min(timeout, self.debounce / 2.0)
+
+        if self._inotify is not None:
+            for name in self._inotify.read(timeout):
+                if self._is_image(name):
+                    self._track(os.path.join(self.directory, name))
+            # Revisión completa de respaldo por si se perdió algún evento
+            if time.monotonic() - self._last_scan >= max(self.interval, 30.0):
+                self._scan()
+        else:
+            time.sleep(timeout)
+            self._scan()
+
+        return self._collect_ready()
+
+    def _collect_ready(self):
+        """Entrega los pendientes cuyo tamaño y mtime no han cambiado durante debounce segundos"""
+        ready = []
+        now = time.monotonic()
+        for path, (size, mtime, since) in list(self._pending.items()):
+            stat = self._stat(path)
+            if stat is None:
+                # El archivo desapareció (p. ej. un temporal renombrado)
+                del self._pending[path]
+            elif stat != (size, mtime):
+                # Todavía se está escribiendo: reiniciar la espera
+                self._pending[path] = (stat[0], stat[1], now)
+            elif size > 0 and now - since >= self.debounce:
+                del self._pending[path]
+                self._delivered[path] = stat
+                ready.append(path)
+        return sorted(ready)
+
+    def close(self):
+        """Deja de vigilar el directorio"""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
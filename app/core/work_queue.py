@@ -0,0 +1,387 @@
+import os
+import json
+import time
+import uuid
+import socket
+import hashlib
+import threading
+from app.core.manifest import STATUS_OK, STATUS_FAILED
+from app.config import SHARED_LEASE_SECONDS
+
+class WorkQueue:
+    """
+    Cola de trabajo sin coordinador sobre un directorio compartido entre varios nodos
+
+    Cualquier número de procesos main.py --shared, en la misma máquina o en otras, recorren
+    las mismas imágenes de INPUT_DIR y se las reparten mediante archivos de reserva:
+
+    - leases/<clave>.lease: se crea con O_CREAT | O_EXCL, que es atómico también en NFS,
+      así que solo un nodo consigue reservar cada imagen. El nodo renueva la fecha de
+      modificación de sus reservas en segundo plano; una reserva sin renovar durante
+      lease_seconds se da por abandonada (nodo caído) y otro nodo la rompe y la reprocesa.
+    - done/<clave>.json: marca de imagen terminada (correcta o fallida); se escribe
+      después de guardar el resultado, así que una imagen con marca tiene su resultado.
+    - shards/<nodo>.jsonl: resultados de cada nodo (un JSON por línea, solo escribe su
+      nodo). ResultShards los combina al final.
+
+    Cada imagen se procesa al menos una vez: si una reserva caduca mientras su nodo sigue
+    trabajando (p. ej. una pausa larga), la imagen puede procesarse dos veces y al combinar
+    vale el último resultado. Los relojes de los nodos deben estar sincronizados (NTP)
+    con un margen muy inferior a lease_seconds.
+    """
+
+    def __init__(self, input_dir, work_dir, node_id=None, lease_seconds=None):
+        """
+        Prepara el directorio de trabajo y empieza a renovar las reservas
+
+        Args:
+            input_dir (str): Directorio compartido de imágenes; las imágenes se identifican
+                             por su ruta relativa a él, la misma en todos los nodos
+            work_dir (str): Directorio compartido de reservas, marcas y resultados
+            node_id (str, optional): Nombre del nodo. Por defecto <máquina>-<pid>
+            lease_seconds (float, optional): Segundos sin renovar tras los que una reserva
+                                             caduca. Por defecto config.SHARED_LEASE_SECONDS
+        """
+        self.input_dir = input_dir
+        self.work_dir = work_dir
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds or SHARED_LEASE_SECONDS
+        self.lease_dir = os.path.join(work_dir, 'leases')
+        self.done_dir = os.path.join(work_dir, 'done')
+        self.shard_path = os.path.join(work_dir, 'shards', f"{self.node_id}.jsonl")
+        for directory in (self.lease_dir, self.done_dir, os.path.dirname(self.shard_path)):
+            os.makedirs(directory, exist_ok=True)
+
+        # Contadores del nodo
+        self.completed = 0
+        self.recovered = 0
+        self.lost = 0
+
+        # Reservas de este nodo: nombre -> (ruta del archivo, token)
+        self._held = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(target=self._renew_loop, name='idreader-leases', daemon=True)
+        self._heartbeat.start()
+
+    def name(self, image_path):
+        """Nombre de una imagen en la cola (ruta relativa a input_dir, con /)"""
+        return os.path.relpath(image_path, self.input_dir).replace(os.sep, '/')
+
+    @staticmethod
+    def _key(name):
+        """Nombre de archivo de las reservas y marcas de una imagen"""
+        return hashlib.sha1(name.encode('utf-8')).hexdigest()
+
+    def _done_path(self, name):
+        return os.path.join(self.done_dir, self._key(name) + '.json')
+
+    def _lease_path(self, name):
+        return os.path.join(self.lease_dir, self._key(name) + '.lease')
+
+    def is_done(self, image_path, retry_failed=False):
+        """
+        Indica si algún nodo ya terminó una imagen
+
+        Args:
+            image_path (str): Ruta a la imagen
+            retry_failed (bool): Si las imágenes que fallaron deben volver a procesarse
+
+        Returns:
+            bool: True si se puede omitir la imagen
+        """
+        try:
+            with open(self._done_path(self.name(image_path)), encoding='utf-8') as f:
+                status = json.load(f)['status']
+        except (OSError, ValueError, KeyError):
+            return False
+        return not (retry_failed and status == STATUS_FAILED)
+
+    def pending(self, image_paths, retry_failed=False):
+        """
+        Devuelve las imágenes que ningún nodo ha terminado
+
+        El directorio de marcas se lista una sola vez en lugar de consultar cada imagen.
+
+        Args:
+            image_paths (list): Rutas de las imágenes
+            retry_failed (bool): Si las imágenes que fallaron cuentan como pendientes
+
+        Returns:
+            list: Rutas pendientes, en el mismo orden
+        """
+        done = set(os.listdir(self.done_dir))
+        return [
+            image_path for image_path in image_paths
+            if self._key(self.name(image_path)) + '.json' not in done
+            or (retry_failed and not self.is_done(image_path, retry_failed))
+        ]
+
+    def claim(self, image_path, retry_failed=False):
+        """
+        Intenta reservar una imagen para este nodo
+
+        Args:
+            image_path (str): Ruta a la imagen
+            retry_failed (bool): Si las imágenes que fallaron deben volver a procesarse
+
+        Returns:
+            bool: True si la imagen queda reservada por este nodo
+        """
+        if self.is_done(image_path, retry_failed):
+            return False
+        name = self.name(image_path)
+        lease_path = self._lease_path(name)
+
+        token = self._create_lease(lease_path, name)
+        if token is None:
+            if not self._break_expired(lease_path):
+                return False
+            token = self._create_lease(lease_path, name)
+            if token is None:
+                return False
+            self.recovered += 1
+
+        # Otro nodo pudo terminarla entre la comprobación y la reserva
+        if self.is_done(image_path, retry_failed):
+            self._remove_lease(lease_path, token)
+            return False
+        with self._lock:
+            self._held[name] = (lease_path, token)
+        return True
+
+    def claimed(self, image_paths, retry_failed=False):
+        """
+        Recorre las imágenes que este nodo consigue reservar
+
+        Cada imagen se reserva justo cuando se pide la siguiente, así que un nodo solo
+        retiene las que tiene en proceso o a punto de procesar.
+
+        Args:
+            image_paths (iterable): Rutas de las imágenes
+            retry_failed (bool): Si las imágenes que fallaron deben volver a procesarse
+
+        Yields:
+            str: Ruta de cada imagen reservada
+        """
+        for image_path in image_paths:
+            if self.claim(image_path, retry_failed):
+                yield image_path
+
+    def _create_lease(self, lease_path, name):
+        """Crea el archivo de reserva si no existe; devuelve su token o None"""
+        try:
+            fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return None
+        token = uuid.uuid4().hex
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'name': name, 'node': self.node_id, 'token': token, 'claimed_at': time.time()}, f)
+        return token
+
+    def _break_expired(self, lease_path):
+        """
+        Elimina una reserva caducada para poder volver a crearla
+
+        El archivo se mueve primero a un nombre propio (rename es atómico: si dos nodos
+        lo intentan, solo uno lo consigue) y después se borra.
+
+        Returns:
+            bool: True si ya no hay reserva (caducada y eliminada, o liberada entretanto)
+        """
+        try:
+            modified = os.stat(lease_path).st_mtime
+        except FileNotFoundError:
+            return True
+        if time.time() - modified < self.lease_seconds:
+            return False
+
+        expired_path = f"{lease_path}.{self.node_id}.{uuid.uuid4().hex}.expired"
+        try:
+            os.rename(lease_path, expired_path)
+        except FileNotFoundError:
+            # Otro nodo la rompió antes
+            return False
+        try:
+            # Entre stat y rename otro nodo pudo romperla y crear una nueva: devolverla
+            if time.time() - os.stat(expired_path).st_mtime < self.lease_seconds:
+                try:
+                    os.link(expired_path, lease_path)
+                except OSError:
+                    pass
+                return False
+        finally:
+            os.remove(expired_path)
+        print(f"  Reserva caducada de {os.path.basename(lease_path)}: se reprocesa la imagen")
+        return True
+
+    def _remove_lease(self, lease_path, token):
+        """Borra un archivo de reserva si sigue siendo de este nodo"""
+        try:
+            with open(lease_path, encoding='utf-8') as f:
+                if json.load(f).get('token') != token:
+                    return
+            os.remove(lease_path)
+        except (OSError, ValueError):
+            pass
+
+    def _renew_loop(self):
+        """Renueva periódicamente la fecha de modificación de las reservas de este nodo"""
+        while not self._stop.wait(self.lease_seconds / 4):
+            with self._lock:
+                held = list(self._held.items())
+            for name, (lease_path, _) in held:
+                try:
+                    os.utime(lease_path)
+                except FileNotFoundError:
+                    # Otro nodo la dio por caducada: el resultado se guardará igualmente
+                    print(f"  Aviso: se perdió la reserva de {name}")
+                    self.lost += 1
+                    with self._lock:
+                        self._held.pop(name, None)
+
+    def complete(self, image_path, record):
+        """
+        Guarda el resultado de una imagen reservada, la marca como terminada y la libera
+
+        Se usa como on_result de run_batch.
+
+        Args:
+            image_path (str): Ruta a la imagen
+            record (ExtractedRecord): Resultado de la imagen o None si falló
+        """
+        name = self.name(image_path)
+        status = STATUS_OK if record is not None else STATUS_FAILED
+        finished_at = time.time()
+        entry = {
+            'name': name,
+            'status': status,
+            'row': record.as_dict() if record is not None else None,
+            'node': self.node_id,
+            'finished_at': finished_at,
+        }
+        with open(self.shard_path, 'ab') as f:
+            f.write((json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+
+        # La marca se escribe completa o no se escribe (os.replace es atómico)
+        done_path = self._done_path(name)
+        temporary_path = f"{done_path}.{self.node_id}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump({'status': status, 'node': self.node_id, 'finished_at': finished_at}, f)
+        os.replace(temporary_path, done_path)
+        self.completed += 1
+
+        with self._lock:
+            held = self._held.pop(name, None)
+        if held is not None:
+            self._remove_lease(*held)
+
+    def close(self):
+        """Detiene la renovación y libera las reservas pendientes para que otro nodo las tome"""
+        self._stop.set()
+        self._heartbeat.join()
+        with self._lock:
+            held = list(self._held.values())
+            self._held.clear()
+        for lease_path, token in held:
+            self._remove_lease(lease_path, token)
+
+class ResultShards:
+    """
+    Resultados escritos por todos los nodos de una cola compartida (shards/*.jsonl)
+
+    En memoria solo se guarda el índice: para cada imagen, el archivo y la posición de su
+    resultado más reciente (el correcto, si alguno lo es), como en Manifest.
+    """
+
+    def __init__(self, input_dir, work_dir):
+        """
+        Lee el índice de todos los archivos de resultados
+
+        Args:
+            input_dir (str): Directorio compartido de imágenes
+            work_dir (str): Directorio compartido de la cola
+        """
+        self.input_dir = input_dir
+        self.entries = {}
+        self.nodes = {}
+        shard_dir = os.path.join(work_dir, 'shards')
+        if not os.path.isdir(shard_dir):
+            return
+        for filename in sorted(os.listdir(shard_dir)):
+            if filename.endswith('.jsonl'):
+                self._index(os.path.join(shard_dir, filename))
+
+    def _index(self, shard_path):
+        """Añade al índice las entradas de un archivo de resultados"""
+        with open(shard_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                line_offset = offset
+                offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Última línea a medio escribir si el nodo murió mientras escribía
+                    continue
+                self.nodes[entry['node']] = self.nodes.get(entry['node'], 0) + 1
+                ok = entry['status'] == STATUS_OK
+                current = self.entries.get(entry['name'])
+                # Un resultado correcto sustituye a uno fallido; entre iguales, el más reciente
+                if current is None or (ok, entry['finished_at']) > (current[0], current[1]):
+                    self.entries[entry['name']] = (ok, entry['finished_at'], shard_path, line_offset)
+
+    def counts(self):
+        """
+        Devuelve el número de imágenes terminadas
+
+        Returns:
+            tuple: (correctas, fallidas)
+        """
+        ok = sum(1 for entry in self.entries.values() if entry[0])
+        return ok, len(self.entries) - ok
+
+    def missing(self, image_paths):
+        """
+        Devuelve las imágenes que ningún nodo ha terminado
+
+        Args:
+            image_paths (list): Rutas de las imágenes
+
+        Returns:
+            list: Rutas sin resultado
+        """
+        return [path for path in image_paths if self._name(path) not in self.entries]
+
+    def _name(self, image_path):
+        return os.path.relpath(image_path, self.input_dir).replace(os.sep, '/')
+
+    def items(self, image_paths):
+        """
+        Recorre las imágenes procesadas correctamente junto con su fila de resultados
+
+        Las filas se leen de los archivos a medida que se piden.
+
+        Args:
+            image_paths (list): Imágenes a incluir, en ese orden
+
+        Yields:
+            tuple: (ruta absoluta de la imagen, fila de datos extraídos)
+        """
+        files = {}
+        try:
+            for image_path in image_paths:
+                entry = self.entries.get(self._name(image_path))
+                if entry is None or not entry[0]:
+                    continue
+                _, _, shard_path, offset = entry
+                f = files.get(shard_path)
+                if f is None:
+                    f = files[shard_path] = open(shard_path, 'rb')
+                f.seek(offset)
+                yield os.path.abspath(image_path), json.loads(f.readline())['row']
+        finally:
+            for f in files.values():
+                f.close()
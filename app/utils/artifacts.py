@@ -0,0 +1,125 @@
+import os
+import queue
+import threading
+import cv2
+from app.config import ARTIFACT_LEVEL, ARTIFACT_QUEUE_SIZE
+
+# Niveles de artefactos de depuración, de menos a más
+ARTIFACT_LEVELS = ('none', 'text', 'full')
+
+class ArtifactWriter:
+    """Escribe los artefactos de depuración en segundo plano mediante una cola acotada"""
+
+    def __init__(self, output_dir, level=None, max_queue=None):
+        """
+        Inicializa el escritor de artefactos
+
+        Args:
+            output_dir (str): Directorio donde se guardan los artefactos
+            level (str, optional): 'none' (nada), 'text' (solo textos OCR) o 'full'
+                                   (textos e imágenes). Por defecto config.ARTIFACT_LEVEL
+            max_queue (int, optional): Artefactos pendientes como máximo; al llenarse la
+                                       cola el procesamiento espera. Por defecto
+                                       config.ARTIFACT_QUEUE_SIZE
+        """
+        self.output_dir = output_dir
+        self.level = (level or ARTIFACT_LEVEL).lower()
+        if self.level not in ARTIFACT_LEVELS:
+            raise ValueError(f"Nivel de artefactos desconocido: {self.level}")
+
+        self.bytes_written = 0
+        self._queue = queue.Queue(maxsize=max_queue or ARTIFACT_QUEUE_SIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def wants_text(self):
+        """True si se deben guardar los textos de depuración"""
+        return self.level in ('text', 'full')
+
+    @property
+    def wants_images(self):
+        """True si se deben guardar las imágenes intermedias"""
+        return self.level == 'full'
+
+    def _start(self):
+        """Arranca el hilo escritor la primera vez que se encola algo"""
+        with self._lock:
+            if self._thread is None:
+                os.makedirs(self.output_dir, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name="ArtifactWriter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """Bucle del hilo escritor: codifica y guarda cada artefacto de la cola"""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                kind, path, payload = item
+                if kind == 'image':
+                    ok, encoded = cv2.imencode(os.path.splitext(path)[1] or '.jpg', payload)
+                    if not ok:
+                        raise ValueError("no se pudo codificar la imagen")
+                    data = encoded.tobytes()
+                else:
+                    data = payload.encode('utf-8')
+                with open(path, 'wb') as f:
+                    f.write(data)
+                self.bytes_written += len(data)
+            except Exception as e:
+                print(f"Error al guardar el artefacto {item[1]}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def write_image(self, filename, image):
+        """
+        Encola una imagen intermedia (solo con nivel 'full')
+
+        La imagen no debe modificarse después de encolarla.
+
+        Args:
+            filename (str): Nombre del archivo dentro de output_dir
+            image (numpy.ndarray): Imagen a guardar
+
+        Returns:
+            str: Ruta del archivo o None si el nivel no guarda imágenes
+        """
+        if not self.wants_images:
+            return None
+        return self._put('image', filename, image)
+
+    def write_text(self, filename, text):
+        """
+        Encola un texto de depuración (con nivel 'text' o 'full')
+
+        Args:
+            filename (str): Nombre del archivo dentro de output_dir
+            text (str): Texto a guardar
+
+        Returns:
+            str: Ruta del archivo o None si el nivel no guarda textos
+        """
+        if not self.wants_text:
+            return None
+        return self._put('text', filename, text)
+
+    def _put(self, kind, filename, payload):
+        """Encola un artefacto, esperando si la cola está llena"""
+        self._start()
+        path = os.path.join(self.output_dir, filename)
+        self._queue.put((kind, path, payload))
+        return path
+
+    def flush(self):
+        """Espera a que se hayan escrito todos los artefactos encolados"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """Escribe los artefactos pendientes y detiene el hilo escritor"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
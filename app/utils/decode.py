@@ -0,0 +1,104 @@
+import hashlib
+import cv2
+import numpy as np
+
+# Reducciones que OpenCV aplica durante la decodificación (con JPEG, escalando la DCT:
+# mucho más rápido y con menos memoria que decodificar completa y reducir después)
+REDUCTIONS = (8, 4, 2)
+_FLAGS = {
+    (1, False): cv2.IMREAD_COLOR,
+    (1, True): cv2.IMREAD_GRAYSCALE,
+    (2, False): cv2.IMREAD_REDUCED_COLOR_2,
+    (2, True): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (4, False): cv2.IMREAD_REDUCED_COLOR_4,
+    (4, True): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (8, False): cv2.IMREAD_REDUCED_COLOR_8,
+    (8, True): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+class ImageSource:
+    """
+    Archivo de imagen leído una sola vez y decodificado a la escala que necesita cada etapa
+
+    Los bytes del archivo se leen con una sola lectura y sirven para el hash de la caché
+    OCR y para todas las decodificaciones: las etapas baratas (detección de la cédula,
+    orientación) usan copias reducidas en escala de grises y solo la imagen de la que
+    sale el OCR final se decodifica con la resolución que necesita.
+    """
+
+    def __init__(self, path):
+        """
+        Lee el archivo
+
+        Args:
+            path (str): Ruta a la imagen
+
+        Raises:
+            OSError: Si no se puede leer el archivo
+        """
+        self.path = path
+        self.data = np.fromfile(path, dtype=np.uint8)
+        self._size = None
+        self._digest = None
+
+    @property
+    def digest(self):
+        """Hash SHA-256 del contenido del archivo (el mismo que OCRCache.hash_file)"""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+    @property
+    def size(self):
+        """
+        Tamaño (ancho, alto) de la imagen completa, leído de la cabecera sin decodificarla
+
+        Es None si la cabecera no se puede leer; entonces no se usan reducciones.
+        """
+        if self._size is None:
+            from io import BytesIO
+            from PIL import Image
+            try:
+                # Image.open solo interpreta la cabecera: los píxeles se leen en load()
+                with Image.open(BytesIO(self.data)) as header:
+                    self._size = header.size
+            except Exception:
+                self._size = False
+        return self._size or None
+
+    def reduction_for(self, min_side):
+        """
+        Elige la mayor reducción con la que el lado mayor conserva al menos min_side píxeles
+
+        Args:
+            min_side (int): Lado mayor mínimo de la imagen decodificada
+
+        Returns:
+            int: 1, 2, 4 u 8
+        """
+        if self.size is None:
+            return 1
+        side = max(self.size)
+        for reduction in REDUCTIONS:
+            if side / reduction >= min_side:
+                return reduction
+        return 1
+
+    def decode(self, reduction=1, gray=False):
+        """
+        Decodifica la imagen
+
+        Args:
+            reduction (int): Divisor de cada lado (1, 2, 4 u 8)
+            gray (bool): Si se decodifica en escala de grises
+
+        Returns:
+            numpy.ndarray: Imagen decodificada o None si los bytes no son una imagen válida
+        """
+        if self.data.size == 0:
+            return None
+        return cv2.imdecode(self.data, _FLAGS[(reduction, gray)])
+
+    def release(self):
+        """Libera los bytes del archivo cuando ya no hacen falta más decodificaciones"""
+        self.data = None
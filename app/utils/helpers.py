@@ -1,9 +1,13 @@
 import os
-import cv2
+import logging
 from datetime import datetime
 import glob
 from app.config import VALID_EXTENSIONS
 
+def setup_logging():
+    """Configura el registro de mensajes (en el proceso principal y en cada proceso trabajador)"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
 def get_image_files(directory):
     """
     Obtiene todas las imágenes válidas en un directorio
@@ -77,6 +81,7 @@ def resize_image(image, max_width=800):
     new_height = int(aspect_ratio * new_width)
     
     # Redimensionar
+    import cv2
     resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
     
     return resized
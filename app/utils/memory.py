@@ -0,0 +1,76 @@
+import sys
+import tracemalloc
+
+# Escribir 5 en clear_refs reinicia el pico de RSS (VmHWM) del proceso (solo Linux)
+_CLEAR_REFS = '/proc/self/clear_refs'
+_STATUS = '/proc/self/status'
+
+def _read_hwm():
+    """Devuelve el pico de RSS (VmHWM) del proceso en bytes, o None si no está disponible"""
+    try:
+        with open(_STATUS, 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def _max_rss():
+    """Devuelve el pico de RSS desde que arrancó el proceso en bytes, o None (p. ej. en Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+class MemoryTracker:
+    """
+    Mide el pico de memoria mientras se procesa una imagen
+
+    Se usa como contexto: al salir, `report` contiene el pico de las asignaciones de
+    Python y numpy (tracemalloc, incluye los arrays que devuelve OpenCV) y el pico de RSS
+    del proceso. En Linux el pico de RSS se reinicia para cada imagen; en otros sistemas
+    es el máximo desde que arrancó el proceso. tracemalloc añade trabajo a cada
+    asignación, así que solo se usa cuando se pide el informe (config.MEMORY_REPORT).
+    """
+
+    def __init__(self):
+        """Inicializa el medidor sin empezar a medir"""
+        self.report = None
+        self._rss_reset = False
+
+    def __enter__(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+        try:
+            with open(_CLEAR_REFS, 'w') as f:
+                f.write('5')
+            self._rss_reset = True
+        except OSError:
+            self._rss_reset = False
+        return self
+
+    def __exit__(self, *exc):
+        _, python_peak = tracemalloc.get_traced_memory()
+        rss_peak = _read_hwm() if self._rss_reset else None
+        if rss_peak is None:
+            rss_peak = _max_rss()
+        self.report = {'python_peak_bytes': python_peak, 'rss_peak_bytes': rss_peak}
+        return False
+
+    def summary(self):
+        """
+        Devuelve el informe en una línea legible
+
+        Returns:
+            str: Picos de memoria en MB
+        """
+        text = f"Memoria: pico Python/numpy {self.report['python_peak_bytes'] / 2 ** 20:.1f} MB"
+        if self.report['rss_peak_bytes'] is not None:
+            text += f", pico RSS {self.report['rss_peak_bytes'] / 2 ** 20:.1f} MB"
+        return text
@@ -0,0 +1,260 @@
+import os
+import json
+import time
+import functools
+import contextlib
+from app.config import METRICS_ENABLED, METRICS_JSONL_PATH, METRICS_PROM_PATH
+
+# Contexto vacío compartido: con las métricas desactivadas cada etapa cuesta solo esto
+_NULL_STAGE = contextlib.nullcontext()
+
+class _Stage:
+    """Mide el tiempo de pared y de CPU de una etapa"""
+
+    __slots__ = ('metrics', 'name', 'wall', 'cpu')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_time(self.name, time.perf_counter() - self.wall, time.thread_time() - self.cpu)
+        return False
+
+class Metrics:
+    """
+    Medidas de la imagen en curso: tiempo por etapa, contadores y etiquetas
+
+    Las etapas se pueden anidar (process_image incluye auto_rotate, por ejemplo) y cada
+    una mide su tiempo total. El tiempo de CPU es el del hilo que ejecuta la etapa: no
+    incluye procesos externos como el tesseract que lanza pytesseract.
+    """
+
+    def __init__(self, enabled=None):
+        """
+        Inicializa las métricas
+
+        Args:
+            enabled (bool, optional): Si se registran medidas. Por defecto config.METRICS_ENABLED
+        """
+        self.enabled = METRICS_ENABLED if enabled is None else enabled
+        self.reset()
+
+    def reset(self):
+        """Empieza las medidas de una imagen nueva"""
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self.labels = {}
+
+    def stage(self, name):
+        """
+        Devuelve un contexto que mide una etapa
+
+        Args:
+            name (str): Nombre de la etapa
+
+        Returns:
+            Contexto para usar con `with`
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def add_time(self, name, wall, cpu):
+        """Suma el tiempo de una ejecución de una etapa"""
+        stage = self.stages.get(name)
+        if stage is None:
+            self.stages[name] = [wall, cpu, 1]
+        else:
+            stage[0] += wall
+            stage[1] += cpu
+            stage[2] += 1
+
+    def incr(self, name, amount=1):
+        """
+        Incrementa un contador
+
+        Args:
+            name (str): Nombre del contador
+            amount (int): Cantidad a sumar
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        """
+        Guarda un valor medido de la imagen (p. ej. un pico de memoria)
+
+        Args:
+            name (str): Nombre del valor
+            value (float): Valor medido
+        """
+        if self.enabled:
+            self.gauges[name] = value
+
+    def label(self, name, value):
+        """
+        Guarda una etiqueta de la imagen (p. ej. la estrategia OCR ganadora)
+
+        Args:
+            name (str): Nombre de la etiqueta
+            value (str): Valor
+        """
+        if self.enabled:
+            self.labels[name] = value
+
+    def snapshot(self, share=1, labels=None):
+        """
+        Devuelve las medidas de la imagen en curso en un dict serializable
+
+        Args:
+            share (int): Número de imágenes entre las que se reparten los tiempos y los
+                         contadores (las medidas de un bloque procesado de una vez)
+            labels (dict, optional): Etiquetas propias de la imagen que sustituyen a las medidas
+
+        Returns:
+            dict: 'stages' (segundos de pared y CPU y llamadas por etapa), 'counters',
+                  'gauges' y 'labels', o None si las métricas están desactivadas
+        """
+        if not self.enabled:
+            return None
+        part = (lambda value: value) if share == 1 else (lambda value: value / share)
+        return {
+            'stages': {
+                name: {'wall_s': part(wall), 'cpu_s': part(cpu), 'calls': part(calls)}
+                for name, (wall, cpu, calls) in self.stages.items()
+            },
+            'counters': {name: part(value) for name, value in self.counters.items()},
+            'gauges': dict(self.gauges),
+            'labels': dict(self.labels, **(labels or {})),
+        }
+
+def instrumented(stage):
+    """
+    Decorador que mide un método como etapa usando el atributo `metrics` de la instancia
+
+    Args:
+        stage (str): Nombre de la etapa
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.stage(stage):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+class MetricsExporter:
+    """
+    Exporta las medidas de cada imagen como JSON lines y los totales como textfile de Prometheus
+
+    Se usa solo en el proceso principal: los procesos trabajadores devuelven sus medidas
+    junto con cada resultado. El textfile se reescribe de forma atómica (para el textfile
+    collector de node_exporter) como mucho cada `interval` segundos y al cerrar.
+    """
+
+    def __init__(self, jsonl_path=None, prom_path=None, interval=5.0):
+        """
+        Abre los destinos de las métricas
+
+        Args:
+            jsonl_path (str, optional): Log JSON lines por imagen. Por defecto config.METRICS_JSONL_PATH
+            prom_path (str, optional): Textfile de Prometheus. Por defecto config.METRICS_PROM_PATH
+            interval (float): Segundos mínimos entre reescrituras del textfile
+        """
+        self.jsonl_path = jsonl_path or METRICS_JSONL_PATH
+        self.prom_path = prom_path or METRICS_PROM_PATH
+        self.interval = interval
+        self._last_write = 0.0
+
+        for path in (self.jsonl_path, self.prom_path):
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._log = open(self.jsonl_path, 'a', encoding='utf-8')
+
+        # Totales acumulados desde el arranque
+        self.images = {}
+        self.stage_totals = {}
+        self.counter_totals = {}
+        self.gauge_max = {}
+
+    def record(self, image_path, snapshot, status):
+        """
+        Registra las medidas de una imagen terminada
+
+        Args:
+            image_path (str): Ruta a la imagen
+            snapshot (dict): Resultado de Metrics.snapshot() (None si no hay medidas)
+            status (str): 'ok' o 'error'
+        """
+        if snapshot is None:
+            return
+
+        entry = dict(snapshot, image=os.path.basename(image_path), status=status,
+                     timestamp=time.strftime("%Y-%m-%d %H:%M:%S"))
+        self._log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._log.flush()
+
+        strategy = snapshot['labels'].get('strategy') or 'none'
+        key = (status, strategy)
+        self.images[key] = self.images.get(key, 0) + 1
+        for name, stage in snapshot['stages'].items():
+            totals = self.stage_totals.setdefault(name, [0.0, 0.0, 0])
+            totals[0] += stage['wall_s']
+            totals[1] += stage['cpu_s']
+            totals[2] += stage['calls']
+        for name, value in snapshot['counters'].items():
+            self.counter_totals[name] = self.counter_totals.get(name, 0) + value
+        for name, value in snapshot.get('gauges', {}).items():
+            if value is not None and value > self.gauge_max.get(name, value - 1):
+                self.gauge_max[name] = value
+
+        if time.monotonic() - self._last_write >= self.interval:
+            self.write_textfile()
+
+    def write_textfile(self):
+        """Reescribe el textfile de Prometheus con los totales actuales"""
+        lines = [
+            "# HELP idreader_images_total Imágenes procesadas por estado y estrategia OCR ganadora",
+            "# TYPE idreader_images_total counter",
+        ]
+        for (status, strategy), count in sorted(self.images.items()):
+            lines.append(f'idreader_images_total{{status="{status}",strategy="{strategy}"}} {count}')
+
+        for metric, index, help_text in (
+            ('idreader_stage_seconds_total', 0, "Tiempo de pared acumulado por etapa"),
+            ('idreader_stage_cpu_seconds_total', 1, "Tiempo de CPU acumulado por etapa"),
+            ('idreader_stage_calls_total', 2, "Ejecuciones por etapa"),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, totals in sorted(self.stage_totals.items()):
+                lines.append(f'{metric}{{stage="{name}"}} {totals[index]}')
+
+        for name, value in sorted(self.counter_totals.items()):
+            lines.append(f"# TYPE idreader_{name}_total counter")
+            lines.append(f"idreader_{name}_total {value}")
+
+        for name, value in sorted(self.gauge_max.items()):
+            lines.append(f"# HELP idreader_{name}_max Máximo por imagen desde el arranque")
+            lines.append(f"# TYPE idreader_{name}_max gauge")
+            lines.append(f"idreader_{name}_max {value}")
+
+        tmp_path = self.prom_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.prom_path)
+        self._last_write = time.monotonic()
+
+    def close(self):
+        """Escribe los totales finales y cierra el log"""
+        if not self._log.closed:
+            self.write_textfile()
+            self._log.close()
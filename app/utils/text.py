@@ -0,0 +1,134 @@
+import re
+import datetime
+import unicodedata
+from functools import lru_cache
+
+# Meses en español (abreviatura de tres letras, como aparecen en la cédula)
+MONTH_MAP = {
+    'ENE': '01', 'FEB': '02', 'MAR': '03', 'ABR': '04', 'MAY': '05', 'JUN': '06',
+    'JUL': '07', 'AGO': '08', 'SEP': '09', 'OCT': '10', 'NOV': '11', 'DIC': '12'
+}
+
+# Nombres completos y otras abreviaturas habituales de los meses
+MONTH_NAMES = dict(MONTH_MAP, **{
+    'ENERO': '01', 'FEBRERO': '02', 'MARZO': '03', 'ABRIL': '04', 'MAYO': '05', 'JUNIO': '06',
+    'JULIO': '07', 'AGOSTO': '08', 'SEPTIEMBRE': '09', 'SETIEMBRE': '09', 'SEPT': '09', 'SET': '09',
+    'OCTUBRE': '10', 'NOVIEMBRE': '11', 'DICIEMBRE': '12'
+})
+
+# Fechas con el día primero: 18'ENE'2003, 25-ENE-2021, 18 ENE 2003, 18.ENE.2003,
+# 12 de enero de 1990 y también con el mes en número (05-05-2001, 05/05/2001)
+_DATE_SEPARATOR = r"\s*(?:['\-./]|\bDEL?\b|\s)\s*"
+_DATE_PATTERN = re.compile(
+    rf"(?<!\d)(\d{{1,2}}){_DATE_SEPARATOR}([^\W\d_]+|\d{{1,2}}){_DATE_SEPARATOR}(\d{{4}})(?!\d)",
+    re.IGNORECASE
+)
+# Fechas con el año primero (2001-05-05)
+_ISO_DATE_PATTERN = re.compile(r"(?<!\d)(\d{4})[\-./](\d{1,2})[\-./](\d{1,2})(?!\d)")
+
+def strip_accents(text):
+    """
+    Elimina los acentos de un texto
+
+    Args:
+        text (str): Texto a normalizar
+
+    Returns:
+        str: Texto sin acentos
+    """
+    text = unicodedata.normalize('NFD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+class KeywordScorer:
+    """
+    Cuenta qué palabras clave de uno o varios grupos aparecen en un texto
+
+    Se puede crear con varios grupos de palabras clave (p. ej. las del anverso y las del
+    reverso) para puntuar todos los grupos con una sola conversión a mayúsculas y una sola
+    búsqueda por palabra clave distinta. La búsqueda de subcadenas de Python es más rápida
+    aquí que una expresión regular con todas las palabras alternadas.
+    """
+
+    def __init__(self, *groups):
+        """
+        Prepara los grupos de palabras clave
+
+        Args:
+            *groups (list): Uno o más grupos de palabras clave en mayúsculas
+        """
+        self.groups = [frozenset(group) for group in groups]
+        self.keywords = tuple(sorted(set().union(*self.groups)))
+
+    def find(self, text):
+        """
+        Devuelve las palabras clave que aparecen en el texto (sin distinguir mayúsculas)
+
+        Args:
+            text (str): Texto a analizar
+
+        Returns:
+            set: Palabras clave encontradas
+        """
+        text = text.upper()
+        return {keyword for keyword in self.keywords if keyword in text}
+
+    def scores(self, text):
+        """
+        Puntúa todos los grupos recorriendo el texto una sola vez
+
+        Args:
+            text (str): Texto a analizar
+
+        Returns:
+            tuple: Número de palabras clave distintas encontradas de cada grupo
+        """
+        found = self.find(text)
+        return tuple(len(found & group) for group in self.groups)
+
+    def score(self, text):
+        """
+        Puntúa el primer grupo de palabras clave
+
+        Args:
+            text (str): Texto a analizar
+
+        Returns:
+            int: Número de palabras clave distintas encontradas
+        """
+        return len(self.find(text) & self.groups[0])
+
+@lru_cache(maxsize=4096)
+def parse_spanish_date(date_str):
+    """
+    Convierte una fecha de la cédula (18'ENE'2003, 25-ENE-2021) a formato DD/MM/YYYY
+
+    Acepta como separadores comillas, guiones, puntos, barras, espacios y "de", y el mes
+    abreviado, con su nombre completo o en número. Un mes desconocido o un día que no
+    existe en ese mes dan None: nunca se completa una fecha con valores supuestos, así
+    que el resultado solo depende del texto y se puede memorizar (las mismas fechas se
+    repiten entre imágenes y pasadas).
+
+    Args:
+        date_str (str): Fecha tal como la reconoció el OCR
+
+    Returns:
+        str: Fecha en formato DD/MM/YYYY o None si no se reconoce ninguna fecha válida
+    """
+    match = _DATE_PATTERN.search(date_str)
+    if match:
+        day, month, year = match.groups()
+        if not month.isdigit():
+            month = MONTH_NAMES.get(strip_accents(month).upper())
+            if month is None:
+                return None
+    else:
+        match = _ISO_DATE_PATTERN.search(date_str)
+        if not match:
+            return None
+        year, month, day = match.groups()
+
+    try:
+        date = datetime.date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+    return date.strftime("%d/%m/%Y")
@@ -0,0 +1,5 @@
+"""Benchmarks de rendimiento del ID-Reader (se ejecutan con python -m benchmarks.<nombre>)"""
+from app import config
+
+# Los benchmarks leen la configuración al importarse, así que el archivo .env se aplica aquí
+config.load()
@@ -0,0 +1,211 @@
+"""
+Cédulas repetidas entre personas distintas con el mismo diseño impreso
+
+Todas las cédulas reales comparten el diseño: lo único que cambia entre personas son sus
+datos. Genera varias fotos de cada cédula sobre un fondo común (y "gemelos": cédulas con
+los mismos nombres y un número de documento que difiere en un dígito) y mide, para las
+fotos de la misma cédula y las de cédulas distintas del mismo lado, la distancia entre
+huellas y la similitud de las miniaturas con las que DedupIndex preselecciona los
+candidatos. Después comprueba la confirmación por campos (fields_agree) con los valores
+impresos y, si Tesseract está instalado, recorre las fotos con un índice real y cuenta
+las reutilizaciones: cualquier reutilización entre cédulas distintas es un error.
+
+Uso:
+    python -m benchmarks.bench_dedup [--count N] [--twins N] [--shots N] [--seed S]
+"""
+import os
+import sys
+import random
+import argparse
+import tempfile
+import itertools
+import cv2
+import numpy as np
+from app.config import DEDUP_MAX_DISTANCE, DEDUP_MIN_SIMILARITY, DEDUP_CANDIDATES
+from app.core.dedup import DedupIndex, similarity, fields_agree, check_fields, _POPCOUNT
+from app.core.results import ExtractedRecord
+from benchmarks.synthetic import random_identity, render_front, render_back, photograph, back_code
+
+# Semilla del fondo común a todas las cédulas
+DESIGN = 123
+
+def _twin(identity, rng):
+    """Misma persona salvo un dígito del número de documento"""
+    documento = list(identity['Documento'])
+    i = rng.randrange(1, len(documento))
+    documento[i] = str((int(documento[i]) + rng.randint(1, 9)) % 10)
+    return dict(identity, Documento=''.join(documento))
+
+def same_design_dataset(directory, count, twins, shots, seed=0):
+    """
+    Genera shots fotos de cada lado de count cédulas con el mismo diseño, más twins gemelos
+
+    Args:
+        directory (str): Directorio de salida
+        count (int): Número de personas
+        twins (int): Personas a las que se añade un gemelo
+        shots (int): Fotos de cada lado de cada cédula
+        seed (int): Semilla del generador aleatorio
+
+    Returns:
+        list: Tuplas (ruta, cédula, lado, identidad) con cédula = (persona, lado)
+    """
+    rng = random.Random(seed)
+    identities = [random_identity(rng) for _ in range(count)]
+    identities += [_twin(identity, rng) for identity in identities[:twins]]
+    photos = []
+    for person, identity in enumerate(identities):
+        for side, render in (('front', render_front), ('back', render_back)):
+            # Una sola cédula, fotografiada varias veces
+            card = render(identity, rng, design=DESIGN)
+            for shot in range(shots):
+                path = os.path.join(directory, f"{person:03d}_{side}_{shot}.jpg")
+                cv2.imwrite(path, photograph(card, rng, rotation=rng.choice((0, 90, 180, 270)),
+                                             jpeg_quality=rng.choice((70, 85, 95))))
+                photos.append((path, (person, side), side, identity))
+    return photos
+
+def stored_row(side, identity):
+    """Fila que habría extraído el OCR de una cédula (con el número del código en el reverso)"""
+    columns = ('Nombre', 'Apellido') if side == 'front' else ('Fecha_Nacimiento', 'Genero', 'Fecha_Expedicion')
+    row = {column: identity[column] for column in columns}
+    row['Documento'] = identity['Documento']
+    return row
+
+def printed_fields(side, identity):
+    """Campos de la plantilla tal como están impresos en la cédula"""
+    if side == 'front':
+        return {'Documento': f"NUMERO {int(identity['Documento']):,}".replace(',', '.'),
+                'Apellido': identity['Apellido'], 'Nombre': identity['Nombre']}
+    return {'Codigo': back_code(identity, random.Random(0))}
+
+def _distance(a, b):
+    """
+    Distancia entre dos huellas en la orientación más cercana, como en DedupIndex.find
+
+    Returns:
+        tuple: (distancia, si la más cercana es la de b girada 180 grados)
+    """
+    bits = lambda x, y: int(_POPCOUNT[np.frombuffer(x, dtype=np.uint8) ^ np.frombuffer(y, dtype=np.uint8)].sum())
+    direct, rotated = bits(a.hash, b.hash), bits(a.hash, b.rotated)
+    return min(direct, rotated), rotated < direct
+
+def prefilter_scores(photos, index):
+    """
+    Distancia y similitud de cada par de fotos del mismo lado
+
+    Returns:
+        tuple: (huellas por ruta, lista de (misma_cédula, distancia, similitud, foto_a, foto_b))
+    """
+    fingerprints = {path: index.fingerprint(path) for path, *_ in photos}
+    pairs = []
+    for a, b in itertools.combinations(photos, 2):
+        if a[2] != b[2] or fingerprints[a[0]] is None or fingerprints[b[0]] is None:
+            continue
+        distance, is_rotated = _distance(fingerprints[a[0]], fingerprints[b[0]])
+        image = fingerprints[b[0]].thumbnail
+        score = similarity(fingerprints[a[0]].thumbnail, cv2.rotate(image, cv2.ROTATE_180) if is_rotated else image)
+        pairs.append((a[1] == b[1], distance, score, a, b))
+    return fingerprints, pairs
+
+def _summary(values):
+    return f"min {min(values):.2f}, media {np.mean(values):.2f}, máx {max(values):.2f}" if values else "-"
+
+def run_index(photos, fingerprints, output_dir):
+    """
+    Recorre las fotos con un índice real y el OCR de ImageProcessor
+
+    Cada foto que no reutiliza un resultado se añade con la fila correcta de su cédula,
+    así que solo se mide la decisión de reutilizar, no la precisión del OCR.
+
+    Returns:
+        tuple: (reutilizaciones correctas, reutilizaciones entre cédulas distintas, fotos repetidas)
+    """
+    from app.core.image_processor import ImageProcessor
+    index = DedupIndex(os.path.join(output_dir, 'dedup_index.sqlite3'), DEDUP_MAX_DISTANCE,
+                       DEDUP_MIN_SIMILARITY, DEDUP_CANDIDATES)
+    processor = ImageProcessor(output_dir=output_dir, cache=False, dedup=False)
+    owners = {}
+    right = wrong = 0
+    seen = set()
+    repeated = 0
+    try:
+        for path, card, side, identity in photos:
+            fingerprint = fingerprints[path]
+            repeated += card in seen
+            seen.add(card)
+            if fingerprint is None:
+                continue
+            duplicate = index.find(fingerprint, processor.read_fields)
+            if duplicate is not None:
+                if owners[duplicate.image_path] == card:
+                    right += 1
+                else:
+                    wrong += 1
+                    print(f"  ERROR: {os.path.basename(path)} reutilizó {os.path.basename(duplicate.image_path)}")
+                continue
+            owners[os.path.abspath(path)] = card
+            index.add(path, fingerprint, ExtractedRecord.from_dict(stored_row(side, identity)), 1.0)
+    finally:
+        processor.close()
+        index.close()
+    return right, wrong, repeated
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cédulas repetidas con el mismo diseño impreso")
+    parser.add_argument("--count", type=int, default=10, help="Número de personas")
+    parser.add_argument("--twins", type=int, default=4, help="Personas con un gemelo (mismos nombres)")
+    parser.add_argument("--shots", type=int, default=3, help="Fotos de cada lado de cada cédula")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla del generador aleatorio")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix='idreader_dedup_')
+    photos = same_design_dataset(directory, args.count, args.twins, args.shots, args.seed)
+    index = DedupIndex(os.path.join(directory, 'scores.sqlite3'), DEDUP_MAX_DISTANCE, DEDUP_MIN_SIMILARITY)
+    fingerprints, pairs = prefilter_scores(photos, index)
+    index.close()
+
+    undetected = sum(f is None for f in fingerprints.values())
+    same = [(d, s) for is_same, d, s, *_ in pairs if is_same]
+    different = [(d, s) for is_same, d, s, *_ in pairs if not is_same]
+    passes = lambda d, s: d <= DEDUP_MAX_DISTANCE and s >= DEDUP_MIN_SIMILARITY
+    print(f"{len(photos)} fotos de {len({p[1] for p in photos})} cédulas con el mismo diseño "
+          f"({args.twins} gemelos), {undetected} sin cédula detectada (no se indexan)")
+    print(f"Misma cédula ({len(same)} pares): distancia {_summary([d for d, _ in same])}; "
+          f"similitud {_summary([s for _, s in same])}")
+    print(f"Cédulas distintas ({len(different)} pares): distancia {_summary([d for d, _ in different])}; "
+          f"similitud {_summary([s for _, s in different])}")
+    missed = sum(not passes(d, s) for d, s in same)
+    candidates = sum(passes(d, s) for d, s in different)
+    print(f"Preselección (DEDUP_MAX_DISTANCE={DEDUP_MAX_DISTANCE}, DEDUP_MIN_SIMILARITY={DEDUP_MIN_SIMILARITY}): "
+          f"{len(same) - missed}/{len(same)} pares de la misma cédula pasan, "
+          f"{candidates}/{len(different)} de cédulas distintas dependen de la lectura de campos")
+
+    # Confirmación con los campos impresos: solo el OCR puede fallar, no la comparación
+    disagreements = 0
+    for is_same, _, _, a, b in pairs:
+        row = stored_row(a[2], a[3])
+        fields = {name: value for name, value in printed_fields(b[2], b[3]).items() if name in check_fields(row)}
+        if fields_agree(row, fields) != is_same:
+            disagreements += 1
+    print(f"fields_agree con los campos impresos: {disagreements} decisiones incorrectas de {len(pairs)}")
+
+    wrong = 0
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+    except Exception:
+        print("Tesseract no está instalado: no se recorre el índice con OCR real")
+    else:
+        right, wrong, repeated = run_index(photos, fingerprints, directory)
+        print(f"Índice con OCR: {right}/{repeated} fotos repetidas reutilizaron su cédula, "
+              f"{wrong} reutilizaron la de otra persona")
+
+    if disagreements or wrong:
+        print("ERROR: se reutilizaría el resultado de otra cédula")
+        return 1
+    print("OK: ninguna reutilización entre cédulas distintas")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
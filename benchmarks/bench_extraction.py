@@ -0,0 +1,263 @@
+"""
+Microbenchmark de la extracción de datos sobre un corpus de textos OCR
+
+Compara el conteo de palabras clave y el análisis de fechas de la versión anterior
+(una búsqueda por palabra clave y dateutil) con KeywordScorer y parse_spanish_date,
+y mide el tiempo de DataExtractor.process_text por texto. Las fechas son un corpus de
+textos distintos en los formatos que devuelve el OCR; parse_spanish_date se mide sin
+memo (caché vacía) y con el memo lleno por separado, y sus resultados se comparan con
+los esperados y con los de la versión anterior.
+
+Uso:
+    python -m benchmarks.bench_extraction [directorio_con_textos] [--repeat N]
+
+Sin directorio se usan los textos de depuración (ocr_text_*.txt) de OUTPUT_DIR o, si
+no hay, un corpus sintético de anversos y reversos.
+"""
+import os
+import re
+import sys
+import datetime
+import glob
+import time
+import random
+import logging
+import argparse
+import tempfile
+import dateutil.parser
+from app.core.DataExtractor import DataExtractor
+from app.core.image_processor import ORIENTATION_KEYWORDS
+from app.utils.text import KeywordScorer, parse_spanish_date
+from app.config import OUTPUT_DIR
+
+FRONT_TEMPLATE = (
+    "REPUBLICA DE COLOMBIA\nIDENTIFICACION PERSONAL\nCEDULA DE CIUDADANIA\n"
+    "NUMERO {documento}\n{apellido}\nAPELLIDOS\n{nombre}\nNOMBRES\n"
+)
+BACK_TEMPLATE = (
+    "FECHA DE NACIMIENTO {nacimiento}\nLUGAR DE NACIMIENTO BOGOTA D.C.\n"
+    "1.{estatura} ESTATURA O+ G.S. RH {sexo} SEXO\n{expedicion} BOGOTA D.C.\n"
+    "FECHA Y LUGAR DE EXPEDICION\n"
+)
+MONTHS = ['ENE', 'FEB', 'MAR', 'ABR', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC']
+
+def synthetic_corpus(size, seed=0):
+    """
+    Genera textos OCR sintéticos de anversos y reversos
+
+    Args:
+        size (int): Número de textos
+        seed (int): Semilla del generador aleatorio
+
+    Returns:
+        list: Textos generados
+    """
+    rng = random.Random(seed)
+    texts = []
+    for i in range(size):
+        if i % 2 == 0:
+            documento = f"{rng.randint(1, 1999)}.{rng.randint(0, 999):03d}.{rng.randint(0, 999):03d}"
+            texts.append(FRONT_TEMPLATE.format(
+                documento=documento,
+                apellido=rng.choice(['CASTRO PADILLA', 'GOMEZ RUIZ', 'PEREZ DIAZ']),
+                nombre=rng.choice(['JUAN', 'MARIA', 'ANDRES'])
+            ))
+        else:
+            texts.append(BACK_TEMPLATE.format(
+                nacimiento=f"{rng.randint(1, 28):02d}'{rng.choice(MONTHS)}'{rng.randint(1950, 2005)}",
+                estatura=rng.randint(50, 90),
+                sexo=rng.choice('MF'),
+                expedicion=f"{rng.randint(1, 28):02d}-{rng.choice(MONTHS)}-{rng.randint(1970, 2023)}"
+            ))
+    return texts
+
+# Formatos de fecha del OCR
+DATE_FORMATS = [
+    "{d:02d}'{mon}'{y}", "{d:02d}-{mon}-{y}", "{d} {mon} {y}", "{d:02d}.{mon}.{y}",
+    "{d} de {month} de {y}", "{d:02d}-{m:02d}-{y}",
+]
+MONTH_NAMES = ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio', 'agosto',
+               'septiembre', 'octubre', 'noviembre', 'diciembre']
+
+def date_corpus(size, seed=0):
+    """
+    Genera fechas distintas en los formatos del OCR, con algunas inválidas
+
+    Args:
+        size (int): Número de fechas
+        seed (int): Semilla del generador aleatorio
+
+    Returns:
+        dict: Texto de la fecha -> resultado esperado (DD/MM/YYYY o None)
+    """
+    rng = random.Random(seed)
+    dates = {}
+    while len(dates) < size:
+        d, m, y = rng.randint(1, 31), rng.randint(1, 12), rng.randint(1940, 2025)
+        template = rng.choice(DATE_FORMATS)
+        mon = MONTHS[m - 1]
+        expected = f"{d:02d}/{m:02d}/{y}"
+        if '{mon}' in template and rng.random() < 0.05:
+            # Mes que no existe: no debe convertirse en enero
+            mon, expected = rng.choice(['XYZ', 'ENF', 'QQQ']), None
+        elif d > 28:
+            try:
+                datetime.date(y, m, d)
+            except ValueError:
+                expected = None
+        dates[template.format(d=d, m=m, y=y, mon=mon, month=MONTH_NAMES[m - 1])] = expected
+    return dates
+
+def load_corpus(directory, pattern="*.txt"):
+    """
+    Lee los textos OCR de un directorio
+
+    Args:
+        directory (str): Directorio con los textos
+        pattern (str): Patrón de los nombres de archivo
+
+    Returns:
+        list: Textos leídos
+    """
+    texts = []
+    for path in sorted(glob.glob(os.path.join(directory, pattern))):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            texts.append(f.read())
+    return texts
+
+def legacy_score(text, keywords):
+    """Conteo de palabras clave de la versión anterior (una búsqueda y un upper() por palabra)"""
+    return sum(1 for keyword in keywords if keyword in text.upper())
+
+def legacy_parse_date(date_str):
+    """Análisis de fechas de la versión anterior (tabla de meses por llamada y dateutil)"""
+    try:
+        if "'" in date_str:
+            day, month, year = re.findall(r"(\d+)'(\w+)'(\d+)", date_str)[0]
+            month_map = {
+                'ENE': '01', 'FEB': '02', 'MAR': '03', 'ABR': '04', 'MAY': '05', 'JUN': '06',
+                'JUL': '07', 'AGO': '08', 'SEP': '09', 'OCT': '10', 'NOV': '11', 'DIC': '12'
+            }
+            return f"{day.zfill(2)}/{month_map.get(month, '01')}/{year}"
+        elif "-" in date_str:
+            parts = date_str.split('-')
+            if len(parts) == 3:
+                day, month, year = parts
+                month_map = {
+                    'ENE': '01', 'FEB': '02', 'MAR': '03', 'ABR': '04', 'MAY': '05', 'JUN': '06',
+                    'JUL': '07', 'AGO': '08', 'SEP': '09', 'OCT': '10', 'NOV': '11', 'DIC': '12'
+                }
+                return f"{day.zfill(2)}/{month_map.get(month, '01')}/{year}"
+        return dateutil.parser.parse(date_str, fuzzy=True).strftime("%d/%m/%Y")
+    except Exception:
+        return None
+
+def time_loop(func, items, repeat):
+    """
+    Mide el tiempo medio por elemento de aplicar func a todos los elementos
+
+    Args:
+        func (callable): Función de un argumento
+        items (list): Elementos a procesar
+        repeat (int): Número de repeticiones del recorrido completo
+
+    Returns:
+        float: Microsegundos por elemento
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            func(item)
+    return (time.perf_counter() - start) / (repeat * len(items)) * 1e6
+
+def time_cached(func, items, repeat):
+    """
+    Mide por separado func con el memo vacío (fallos) y con el memo lleno (aciertos)
+
+    Args:
+        func (callable): Función memorizada con functools.lru_cache
+        items (list): Elementos distintos a procesar
+        repeat (int): Número de repeticiones del recorrido completo
+
+    Returns:
+        tuple: (µs por elemento sin memo, µs por elemento con el memo lleno)
+    """
+    misses = 0.0
+    for _ in range(repeat):
+        func.cache_clear()
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        misses += time.perf_counter() - start
+    hits = time_loop(func, items, repeat)
+    return misses / (repeat * len(items)) * 1e6, hits
+
+def main(argv=None):
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Microbenchmark de la extracción de datos")
+    parser.add_argument("directory", nargs="?", default=None, help="Directorio con textos OCR (*.txt)")
+    parser.add_argument("--size", type=int, default=2000, help="Textos del corpus sintético")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones de cada medición")
+    parser.add_argument("--dates", type=int, default=2000, help="Fechas distintas del corpus de fechas")
+    args = parser.parse_args(argv)
+
+    if args.directory:
+        texts = load_corpus(args.directory)
+    else:
+        texts = load_corpus(OUTPUT_DIR, "ocr_text_*.txt")
+    if not texts:
+        texts = synthetic_corpus(args.size)
+    print(f"Corpus: {len(texts)} textos OCR\n")
+
+    # Fechas distintas: con una sola fecha repetida solo se mediría el memo
+    expected = date_corpus(args.dates)
+    dates = list(expected)
+    wrong = [date for date in dates if parse_spanish_date(date) != expected[date]]
+    legacy_right = {date for date in dates if legacy_parse_date(date) == expected[date]}
+    regressions = [date for date in legacy_right if parse_spanish_date(date) != expected[date]]
+    print(f"Fechas: {len(dates)} distintas; correctas {len(dates) - len(wrong)} "
+          f"(versión anterior {len(legacy_right)}); distintas de la anterior donde esta acertaba: "
+          f"{len(regressions)}")
+    for date in (wrong + regressions)[:10]:
+        print(f"  ERROR: {date!r} -> {parse_spanish_date(date)!r} (esperado {expected[date]!r})")
+    print()
+
+    scorer = KeywordScorer(ORIENTATION_KEYWORDS)
+    mismatches = sum(1 for text in texts if scorer.score(text) != legacy_score(text, ORIENTATION_KEYWORDS))
+    if mismatches:
+        print(f"Aviso: {mismatches} textos con puntuación distinta a la versión anterior\n")
+
+    print(f"{'medición':40s} {'antes (µs)':>11s} {'después (µs)':>13s} {'mejora':>8s}")
+    rows = [
+        ("palabras clave por texto",
+         time_loop(lambda text: legacy_score(text, ORIENTATION_KEYWORDS), texts, args.repeat),
+         time_loop(scorer.score, texts, args.repeat)),
+    ]
+    legacy_dates = time_loop(legacy_parse_date, dates, args.repeat)
+    misses, hits = time_cached(parse_spanish_date, dates, args.repeat)
+    rows.append(("fechas distintas (sin memo)", legacy_dates, misses))
+    rows.append(("fechas repetidas (memo lleno)", legacy_dates, hits))
+    for label, before, after in rows:
+        print(f"{label:40s} {before:11.2f} {after:13.2f} {before / after:7.1f}x")
+
+    # Extracción completa por texto (sin registrar cada paso ni guardar artefactos)
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        extractor = DataExtractor(output_dir=tmp_dir)
+        extractor.artifacts.level = 'none'
+
+        def extract(text):
+            extractor.reset()
+            extractor.process_text(text)
+
+        print(f"\nDataExtractor.process_text: {time_loop(extract, texts, args.repeat):.2f} µs por texto")
+        extractor.close()
+    logging.disable(logging.NOTSET)
+
+    if wrong or regressions:
+        print("ERROR: hay fechas con un resultado incorrecto")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Compara la latencia de auto_rotate antes y después de la detección barata de orientación
+
+Uso:
+    python -m benchmarks.bench_orientation [directorio_de_imagenes] [--repeat N]
+"""
+import os
+import time
+import argparse
+import tempfile
+from app.core.image_processor import ImageProcessor
+from app.utils.helpers import get_image_files
+from app.config import INPUT_DIR
+
+def time_call(func, repeat):
+    """
+    Mide la latencia media de una llamada
+
+    Args:
+        func (callable): Función sin argumentos a medir
+        repeat (int): Número de repeticiones
+
+    Returns:
+        float: Segundos por llamada
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+def main(argv=None):
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Benchmark de auto_rotate")
+    parser.add_argument("directory", nargs="?", default=INPUT_DIR, help="Directorio con imágenes de cédulas")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeticiones por imagen")
+    args = parser.parse_args(argv)
+
+    image_files = get_image_files(args.directory)
+    if not image_files:
+        print(f"No se encontraron imágenes en {args.directory}")
+        return
+
+    # Sin caché OCR: se quiere medir el trabajo real de Tesseract
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor = ImageProcessor(output_dir=tmp_dir, cache=False, memo=False, dedup=False)
+
+        print(f"{'imagen':40s} {'antes (s)':>10s} {'después (s)':>12s} {'mejora':>8s}")
+        total_before = total_after = 0.0
+        count = 0
+        for image_path in image_files:
+            image = processor.load_image(image_path)
+            if image is None:
+                continue
+
+            before = time_call(lambda: processor.auto_rotate(image, fast=False), args.repeat)
+            after = time_call(lambda: processor.auto_rotate(image, fast=True), args.repeat)
+            total_before += before
+            total_after += after
+            count += 1
+
+            name = os.path.basename(image_path)[:40]
+            print(f"{name:40s} {before:10.3f} {after:12.3f} {before / max(after, 1e-9):7.1f}x")
+
+        if count:
+            print(f"\nMedia por imagen: antes {total_before / count:.3f} s, después {total_after / count:.3f} s")
+        processor.close()
+
+if __name__ == "__main__":
+    main()
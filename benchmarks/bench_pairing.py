@@ -0,0 +1,104 @@
+"""
+Emparejamiento de anversos y reversos de un lote desordenado y sin sufijos de lado
+
+Genera los textos OCR del anverso y del reverso (con el código impreso bajo el código
+de barras) de varias personas, los pasa por DataExtractor, desordena las filas y les da
+nombres de archivo sin sufijo de lado (IMG_00042.jpg), de modo que la única forma de
+emparejarlas es el número de documento. Comprueba que cada anverso se combina con su
+reverso y mide el tiempo de FrontBackPairer.
+
+Uso:
+    python -m benchmarks.bench_pairing [--count N] [--seed S]
+"""
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+from app.core.DataExtractor import DataExtractor
+from app.core.pairing import FrontBackPairer
+from benchmarks.synthetic import random_identity, back_code, MONTHS
+
+FRONT_TEXT = (
+    "REPUBLICA DE COLOMBIA\nIDENTIFICACION PERSONAL\nCEDULA DE CIUDADANIA\n"
+    "NUMERO {documento}\n{apellido}\nAPELLIDOS\n{nombre}\nNOMBRES\n"
+)
+BACK_TEXT = (
+    "FECHA DE NACIMIENTO {nacimiento}\nLUGAR DE NACIMIENTO BOGOTA D.C.\n"
+    "1.70 O+ {genero}\nESTATURA G.S. RH SEXO\n{expedicion} BOGOTA D.C.\n"
+    "FECHA Y LUGAR DE EXPEDICION\n{codigo}\n"
+)
+
+def _card_date(date, separator):
+    """Convierte DD/MM/YYYY al formato impreso en la cédula"""
+    day, month, year = date.split('/')
+    return separator.join([day, MONTHS[int(month) - 1], year])
+
+def shuffled_halves(count, seed=0):
+    """
+    Extrae las filas de count anversos y count reversos y las desordena
+
+    Args:
+        count (int): Número de personas
+        seed (int): Semilla del generador aleatorio
+
+    Returns:
+        tuple: (lista de (ruta, fila) desordenada, identidades por número de documento)
+    """
+    rng = random.Random(seed)
+    extractor = DataExtractor(output_dir=tempfile.mkdtemp(prefix='idreader_pairing_'))
+    rows = []
+    identities = {}
+    for _ in range(count):
+        identity = random_identity(rng)
+        identities[identity['Documento']] = identity
+        documento = f"{int(identity['Documento']):,}".replace(',', '.')
+        texts = (
+            FRONT_TEXT.format(documento=documento, apellido=identity['Apellido'], nombre=identity['Nombre']),
+            BACK_TEXT.format(nacimiento=_card_date(identity['Fecha_Nacimiento'], "'"), genero=identity['Genero'],
+                             expedicion=_card_date(identity['Fecha_Expedicion'], "-"),
+                             codigo=back_code(identity, rng)),
+        )
+        for text in texts:
+            extractor.reset()
+            extractor.process_text(text)
+            rows.append(extractor.to_record().as_dict())
+
+    extractor.close()
+    rng.shuffle(rows)
+    return [(f"IMG_{i:05d}.jpg", row) for i, row in enumerate(rows)], identities
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Emparejamiento de un lote desordenado")
+    parser.add_argument("--count", type=int, default=2000, help="Número de personas (anverso y reverso)")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla del generador aleatorio")
+    args = parser.parse_args(argv)
+
+    # DataExtractor registra cada fila extraída
+    logging.disable(logging.INFO)
+    items, identities = shuffled_halves(args.count, args.seed)
+
+    pairer = FrontBackPairer()
+    start = time.perf_counter()
+    combined = list(pairer.pair(items))
+    elapsed = time.perf_counter() - start
+
+    wrong = 0
+    for row in combined:
+        identity = identities.get(row['Documento'])
+        if identity is None or any(row[column] != identity[column] for column in
+                                   ('Fecha_Nacimiento', 'Genero', 'Fecha_Expedicion')):
+            wrong += 1
+
+    print(f"{len(items)} mitades desordenadas sin sufijo de lado: {pairer.pairs} parejas, "
+          f"{len(pairer.unmatched)} sin pareja, {pairer.unknown} de lado desconocido, {wrong} filas incorrectas")
+    print(f"FrontBackPairer: {elapsed * 1000:.1f} ms ({elapsed / len(items) * 1e6:.1f} µs por mitad)")
+    if pairer.pairs != args.count or wrong:
+        print("ERROR: hay anversos que no se combinaron con su reverso")
+        return 1
+    print("OK: cada anverso se combinó con su reverso")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
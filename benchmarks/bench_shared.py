@@ -0,0 +1,129 @@
+"""
+Prueba del modo compartido (main.py --shared) con varios nodos locales
+
+Lanza varios procesos main.py --shared sobre el mismo directorio de imágenes, como si
+fueran nodos distintos, y opcionalmente mata uno a mitad del lote para comprobar que sus
+reservas caducan y otro nodo las retoma. Al terminar lee los resultados de todos los
+nodos y comprueba que cada imagen tiene resultado, e informa de las que se procesaron
+más de una vez.
+
+Uso:
+    python -m benchmarks.bench_shared [directorio_de_imagenes] [--nodes N] [--kill-after S]
+
+Sin directorio genera cédulas sintéticas. Las imágenes se copian a un directorio temporal
+para que la cola empiece vacía.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import signal
+import argparse
+import tempfile
+import subprocess
+from app.core.work_queue import ResultShards
+from app.utils.helpers import get_image_files
+
+def launch_node(node_id, env, workers, log_dir):
+    """
+    Lanza un nodo main.py --shared
+
+    Args:
+        node_id (str): Nombre del nodo
+        env (dict): Variables de entorno comunes a todos los nodos
+        workers (int): Procesos trabajadores del nodo
+        log_dir (str): Directorio donde se guarda la salida del nodo
+
+    Returns:
+        tuple: (subprocess.Popen, archivo de salida)
+    """
+    log = open(os.path.join(log_dir, f"{node_id}.log"), 'w', encoding='utf-8')
+    process = subprocess.Popen(
+        [sys.executable, 'main.py', '--shared', '--workers', str(workers)],
+        env=dict(env, NODE_ID=node_id), stdout=log, stderr=subprocess.STDOUT,
+        start_new_session=True
+    )
+    return process, log
+
+def duplicates(work_dir):
+    """
+    Cuenta las imágenes que se procesaron más de una vez
+
+    Args:
+        work_dir (str): Directorio de la cola
+
+    Returns:
+        int: Resultados de más respecto al número de imágenes con resultado
+    """
+    names = []
+    for shard_path in glob.glob(os.path.join(work_dir, 'shards', '*.jsonl')):
+        with open(shard_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    names.append(json.loads(line)['name'])
+                except ValueError:
+                    continue
+    return len(names) - len(set(names))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Varios nodos main.py --shared en local")
+    parser.add_argument("images", nargs='?', help="Directorio de imágenes (por defecto, cédulas sintéticas)")
+    parser.add_argument("--count", type=int, default=20, help="Cédulas sintéticas a generar")
+    parser.add_argument("--nodes", type=int, default=3, help="Nodos a lanzar")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos trabajadores por nodo")
+    parser.add_argument("--kill-after", type=float, default=0,
+                        help="Segundos tras los que se mata el último nodo (0 = no matar ninguno)")
+    parser.add_argument("--lease-seconds", type=float, default=10, help="SHARED_LEASE_SECONDS de los nodos")
+    args = parser.parse_args(argv)
+
+    root = tempfile.mkdtemp(prefix='idreader_shared_')
+    input_dir = os.path.join(root, 'input')
+    if args.images:
+        os.makedirs(input_dir)
+        for path in get_image_files(args.images):
+            shutil.copy(path, input_dir)
+    else:
+        from benchmarks.synthetic import generate_dataset
+        generate_dataset(input_dir, count=args.count)
+    image_files = get_image_files(input_dir)
+    work_dir = os.path.join(root, 'work')
+
+    env = dict(
+        os.environ, INPUT_DIR=input_dir, OUTPUT_DIR=os.path.join(root, 'output'),
+        SHARED_WORK_DIR=work_dir, SHARED_LEASE_SECONDS=str(args.lease_seconds),
+        SHARED_POLL_INTERVAL=str(max(1.0, args.lease_seconds / 4)), ARTIFACT_LEVEL='none'
+    )
+    print(f"{len(image_files)} imágenes, {args.nodes} nodos, salida de cada nodo en {root}")
+
+    start = time.perf_counter()
+    nodes = [launch_node(f"nodo{i + 1}", env, args.workers, root) for i in range(args.nodes)]
+    if args.kill_after > 0:
+        time.sleep(args.kill_after)
+        victim = nodes[-1][0]
+        if victim.poll() is None:
+            # Matar también sus procesos trabajadores, como si se cayera la máquina
+            os.killpg(victim.pid, signal.SIGKILL)
+            print(f"nodo{args.nodes} terminado a los {args.kill_after:.0f} s")
+    for process, log in nodes:
+        process.wait()
+        log.close()
+    elapsed = time.perf_counter() - start
+
+    shards = ResultShards(input_dir, work_dir)
+    ok, failed = shards.counts()
+    missing = shards.missing(image_files)
+    print(f"\nTiempo total: {elapsed:.1f} s")
+    for node, count in sorted(shards.nodes.items()):
+        print(f"  {node}: {count} resultados")
+    print(f"Correctas: {ok}, con error: {failed}, sin resultado: {len(missing)}, "
+          f"procesadas más de una vez: {duplicates(work_dir)}")
+    if missing:
+        print("ERROR: hay imágenes sin resultado")
+        return 1
+    print("OK: todas las imágenes tienen resultado")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
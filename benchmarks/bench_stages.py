@@ -0,0 +1,265 @@
+"""
+Mide por separado cada etapa del procesamiento sobre cédulas sintéticas o reales
+
+Etapas: carga, recorte de la cédula, auto_rotate, is_reverse_side, preprocesamiento,
+cada pasada OCR de la escalera de estrategias, process_image completo y extracción de
+datos. Si el directorio tiene ground_truth.json (ver benchmarks.synthetic) también se
+mide cuántos campos se extraen correctamente. Los resultados se guardan en JSON para
+comparar ejecuciones a lo largo del tiempo.
+
+Uso:
+    python -m benchmarks.bench_stages [directorio_de_imagenes] [--count N] [--repeat N]
+                                      [--output resultados.json] [--compare anterior.json]
+
+Sin directorio se generan --count personas sintéticas en un directorio temporal.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import statistics
+import cv2
+from app.core.image_processor import ImageProcessor
+from app.core.DataExtractor import DataExtractor
+from app.utils.helpers import get_image_files
+from benchmarks.synthetic import generate_dataset
+
+# Campos que se comparan con ground_truth.json
+FRONT_FIELDS = ('Nombre', 'Apellido', 'Documento')
+BACK_FIELDS = ('Fecha_Nacimiento', 'Genero', 'Fecha_Expedicion')
+
+def timed(func, repeat):
+    """
+    Ejecuta una función varias veces y mide su tiempo
+
+    Args:
+        func (callable): Función sin argumentos
+        repeat (int): Número de repeticiones
+
+    Returns:
+        tuple: (resultado de la última llamada, segundos por llamada)
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+def ocr_variants(rotated, processed, inverted):
+    """Variantes de imagen de la escalera de estrategias (como en process_image)"""
+    variants = {'processed': processed, 'rotated': rotated, 'negative': cv2.bitwise_not(processed)}
+    if inverted is not None:
+        variants['inverted'] = inverted
+    return variants
+
+def bench_image(processor, extractor, image_path, repeat, truth=None):
+    """
+    Mide cada etapa para una imagen
+
+    Args:
+        processor (ImageProcessor): Procesador sin caché OCR
+        extractor (DataExtractor): Extractor de datos
+        image_path (str): Ruta a la imagen
+        repeat (int): Repeticiones de cada etapa
+        truth (dict, optional): Valores esperados de la imagen
+
+    Returns:
+        dict: Segundos por etapa y, si hay valores esperados, campos correctos
+    """
+    stages = {}
+    image, stages['load'] = timed(lambda: processor.load_image(image_path), repeat)
+    if image is None:
+        return None
+
+    (card, _, _, _), stages['card_crop'] = timed(lambda: processor.card_detector.crop(image), repeat)
+    rotated, stages['auto_rotate'] = timed(lambda: processor.auto_rotate(card), repeat)
+    is_reverse, stages['is_reverse_side'] = timed(lambda: processor.is_reverse_side(image_path), repeat)
+    (rotated, processed, inverted), stages['preprocess'] = timed(
+        lambda: processor.preprocess_for_colombian_id(rotated, is_reverse, rotate=False), repeat
+    )
+
+    # Cada pasada de la escalera por separado (todas, sin salida temprana)
+    variants = ocr_variants(rotated, processed, inverted)
+    branch = "reverse" if is_reverse else "front"
+    ladder = processor.reverse_ladder if is_reverse else processor.front_ladder
+    for variant, psm in ladder:
+        if variant not in variants:
+            continue
+        config = f'--psm {psm} --oem 3 -l spa'
+        _, stages[f'ocr:{variant}:{psm}'] = timed(
+            lambda: processor._ocr_data(variants[variant], config, branch), repeat
+        )
+
+    (text, _, _), stages['process_image'] = timed(
+        lambda: processor.process_image(image_path, save_intermediate=False), repeat
+    )
+
+    def extract():
+        extractor.reset()
+        if processor.last_fields:
+            extractor.process_fields(processor.last_fields)
+        elif text is not None:
+            extractor.process_text(text)
+        return extractor.to_record()
+    record, stages['extraction'] = timed(extract, repeat)
+
+    result = {
+        'image': os.path.basename(image_path),
+        'is_reverse': bool(is_reverse),
+        'strategy': processor.last_strategy,
+        'ocr_passes': processor.last_passes,
+        'stages': stages,
+    }
+    if truth is not None:
+        fields = BACK_FIELDS if truth['side'] == 'reverso' else FRONT_FIELDS
+        result['fields_correct'] = sum(1 for field in fields if getattr(record, field) == truth[field])
+        result['fields_total'] = len(fields)
+    return result
+
+def summarize(results):
+    """
+    Agrega los tiempos de todas las imágenes por etapa
+
+    Args:
+        results (list): Resultados de bench_image
+
+    Returns:
+        dict: Por etapa, número de muestras y media, mediana, p95, mínimo y máximo en ms
+    """
+    samples = {}
+    for result in results:
+        for stage, seconds in result['stages'].items():
+            samples.setdefault(stage, []).append(seconds * 1000)
+
+    summary = {}
+    for stage, values in samples.items():
+        values.sort()
+        summary[stage] = {
+            'n': len(values),
+            'mean_ms': statistics.fmean(values),
+            'median_ms': statistics.median(values),
+            'p95_ms': values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))],
+            'min_ms': values[0],
+            'max_ms': values[-1],
+        }
+    return summary
+
+def environment():
+    """Datos de la ejecución para poder comparar resultados entre máquinas y versiones"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    try:
+        import pytesseract
+        tesseract = str(pytesseract.get_tesseract_version())
+    except Exception:
+        tesseract = None
+    return {
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'commit': commit,
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'tesseract': tesseract,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def print_summary(summary, previous=None):
+    """Muestra la tabla de tiempos por etapa y, si se indica, la comparación con otra ejecución"""
+    header = f"{'etapa':28s} {'n':>4s} {'media (ms)':>11s} {'mediana':>9s} {'p95':>9s}"
+    if previous:
+        header += f" {'anterior':>10s} {'cambio':>8s}"
+    print(header)
+    for stage, stats in summary.items():
+        line = (f"{stage:28s} {stats['n']:4d} {stats['mean_ms']:11.2f} "
+                f"{stats['median_ms']:9.2f} {stats['p95_ms']:9.2f}")
+        before = (previous or {}).get(stage)
+        if before:
+            line += f" {before['mean_ms']:10.2f} {stats['mean_ms'] / before['mean_ms'] - 1:+8.1%}"
+        print(line)
+
+def main(argv=None):
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Benchmark por etapas del procesamiento de cédulas")
+    parser.add_argument("directory", nargs="?", default=None,
+                        help="Directorio con imágenes (por defecto se generan cédulas sintéticas)")
+    parser.add_argument("--count", type=int, default=5, help="Personas sintéticas a generar")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla del generador sintético")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeticiones de cada etapa")
+    parser.add_argument("--output", default=None, help="Archivo JSON de resultados")
+    parser.add_argument("--compare", default=None, help="JSON de una ejecución anterior para comparar")
+    args = parser.parse_args(argv)
+
+    # Los mensajes por imagen del procesador y el extractor no interesan aquí
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        directory = args.directory
+        if directory is None:
+            directory = os.path.join(tmp_dir, 'synthetic')
+            generate_dataset(directory, args.count, args.seed)
+
+        truth = {}
+        truth_path = os.path.join(directory, 'ground_truth.json')
+        if os.path.exists(truth_path):
+            with open(truth_path, 'r', encoding='utf-8') as f:
+                truth = json.load(f)
+
+        image_files = get_image_files(directory)
+        if not image_files:
+            print(f"No se encontraron imágenes en {directory}")
+            return
+
+        # Sin caché OCR, memo ni artefactos: se quiere medir el trabajo real
+        output_dir = os.path.join(tmp_dir, 'output')
+        processor = ImageProcessor(output_dir=output_dir, cache=False, memo=False, dedup=False)
+        processor.artifacts.level = 'none'
+        extractor = DataExtractor(output_dir=output_dir, artifacts=processor.artifacts)
+
+        results = []
+        for image_path in image_files:
+            print(f"Midiendo {os.path.basename(image_path)}...", file=sys.stderr)
+            # Silenciar los mensajes por imagen del procesador
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                result = bench_image(processor, extractor, image_path, args.repeat,
+                                     truth.get(os.path.basename(image_path)))
+            if result is not None:
+                results.append(result)
+        processor.close()
+
+    summary = summarize(results)
+    report = {
+        'environment': environment(),
+        'settings': {'repeat': args.repeat, 'directory': args.directory or f"synthetic:{args.count}:{args.seed}"},
+        'summary': summary,
+        'images': results,
+    }
+    if truth:
+        correct = sum(result.get('fields_correct', 0) for result in results)
+        total = sum(result.get('fields_total', 0) for result in results)
+        report['accuracy'] = {'fields_correct': correct, 'fields_total': total}
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f).get('summary')
+
+    print()
+    print_summary(summary, previous)
+    if truth:
+        print(f"\nCampos correctos: {report['accuracy']['fields_correct']} de {report['accuracy']['fields_total']}")
+
+    output = args.output or f"bench_stages_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en: {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Tiempo de arranque de la línea de comandos y control de importaciones pesadas
+
+Importa main en un proceso nuevo con `python -X importtime`, informa del tiempo total y
+de los módulos más lentos, y mide `python main.py --help` de principio a fin. Falla (código
+de salida 1) si al importar main se cargan módulos pesados (OpenCV, numpy, pandas, ...),
+que deben importarse dentro de las funciones que los usan, o si se supera el presupuesto.
+
+Uso:
+    python -m benchmarks.bench_startup [--budget-ms 150] [--top 10] [--repeat 5]
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['cv2', 'numpy', 'pandas', 'pytesseract', 'tesserocr', 'imutils',
+                 'dateutil', 'tqdm', 'PIL', 'pyarrow']
+
+def import_times(module='main'):
+    """
+    Importa un módulo en un proceso nuevo con -X importtime
+
+    Args:
+        module (str): Módulo a importar
+
+    Returns:
+        list: Tuplas (módulo, propio_us, acumulado_us) en orden de importación
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        # Formato: "import time:   self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # La sangría del nombre indica la profundidad en el árbol de importaciones
+        rows.append((name.rstrip()[1:], int(self_us), int(cumulative_us)))
+    return rows
+
+def help_time(repeat):
+    """
+    Mide `python main.py --help` de principio a fin
+
+    Args:
+        repeat (int): Número de ejecuciones
+
+    Returns:
+        float: Mejor tiempo en milisegundos
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, 'main.py', '--help'], cwd=ROOT,
+                       stdout=subprocess.DEVNULL, check=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(argv=None):
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Tiempo de arranque y control de importaciones pesadas")
+    parser.add_argument("--budget-ms", type=float, default=150.0,
+                        help="Tiempo máximo de importación de main en milisegundos")
+    parser.add_argument("--top", type=int, default=10, help="Módulos más lentos a mostrar")
+    parser.add_argument("--repeat", type=int, default=5, help="Ejecuciones de main.py --help")
+    args = parser.parse_args(argv)
+
+    rows = import_times()
+    # Los módulos de primer nivel tienen la suma de sus submódulos en el acumulado
+    total_ms = sum(cumulative for name, _, cumulative in rows if not name.startswith(' ')) / 1000
+    heavy = sorted({name.strip().split('.')[0] for name, _, _ in rows} & set(HEAVY_MODULES))
+
+    print(f"import main: {total_ms:.1f} ms ({len(rows)} módulos)")
+    print("Módulos más lentos (tiempo propio):")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"  {name.strip():<40} {self_us / 1000:8.2f} ms  (acumulado {cumulative_us / 1000:.2f} ms)")
+    print(f"main.py --help: {help_time(args.repeat):.1f} ms (mejor de {args.repeat})")
+
+    failed = False
+    if heavy:
+        print(f"ERROR: import main carga módulos pesados: {', '.join(heavy)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"ERROR: import main tarda {total_ms:.1f} ms, por encima de {args.budget_ms:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("OK: sin importaciones pesadas al arrancar")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Generador de cédulas colombianas sintéticas con valores de campo conocidos
+
+Dibuja el anverso y el reverso de cédulas amarillas con fondo de patrones de seguridad,
+las coloca rotadas sobre una mesa y añade ruido, desenfoque y compresión JPEG. Guarda
+también ground_truth.json con los valores de cada imagen para medir la precisión.
+
+Uso:
+    python -m benchmarks.synthetic directorio_de_salida [--count N] [--seed S]
+"""
+import os
+import json
+import random
+import argparse
+import cv2
+import numpy as np
+
+# Tamaño de la cédula dibujada (misma proporción que una tarjeta ID-1)
+CARD_SIZE = (1400, 882)
+
+FONT = cv2.FONT_HERSHEY_DUPLEX
+MONTHS = ['ENE', 'FEB', 'MAR', 'ABR', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC']
+NOMBRES = ['JUAN', 'MARIA', 'ANDRES', 'LUISA', 'CARLOS', 'PAULA', 'JORGE', 'DIANA']
+APELLIDOS = ['CASTRO', 'PADILLA', 'GOMEZ', 'RUIZ', 'PEREZ', 'DIAZ', 'TORRES', 'ROJAS', 'VARGAS']
+
+def random_identity(rng):
+    """
+    Genera los datos de una persona
+
+    Args:
+        rng (random.Random): Generador aleatorio
+
+    Returns:
+        dict: Valores de los campos con el mismo formato que el CSV de resultados
+    """
+    birth = (rng.randint(1, 28), rng.randint(1, 12), rng.randint(1950, 2005))
+    issued = (rng.randint(1, 28), rng.randint(1, 12), birth[2] + 18 + rng.randint(0, 15))
+    return {
+        'Nombre': rng.choice(NOMBRES),
+        'Apellido': f"{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}",
+        'Documento': str(rng.randint(10_000_000, 1_999_999_999)),
+        'Fecha_Nacimiento': "%02d/%02d/%04d" % birth,
+        'Genero': rng.choice('MF'),
+        'Fecha_Expedicion': "%02d/%02d/%04d" % issued,
+    }
+
+def _card_date(date, separator):
+    """Convierte DD/MM/YYYY al formato impreso en la cédula (18'ENE'2003 o 25-ENE-2021)"""
+    day, month, year = date.split('/')
+    return separator.join([day, MONTHS[int(month) - 1], year])
+
+def _security_background(rng, size):
+    """
+    Dibuja el fondo amarillo con guilloches (ondas finas) como en la cédula real
+
+    Args:
+        rng (random.Random): Generador aleatorio
+        size (tuple): (ancho, alto) de la cédula
+
+    Returns:
+        numpy.ndarray: Fondo BGR
+    """
+    w, h = size
+    card = np.zeros((h, w, 3), np.uint8)
+    card[:] = (120, 215, 245)
+
+    # Degradado suave para que el fondo no sea uniforme
+    gradient = np.linspace(-20, 20, w, dtype=np.float32)[None, :, None]
+    card = np.clip(card.astype(np.float32) + gradient, 0, 255).astype(np.uint8)
+
+    xs = np.arange(0, w, 2)
+    for i in range(rng.randint(25, 40)):
+        amplitude = rng.uniform(8, 30)
+        period = rng.uniform(80, 260)
+        phase = rng.uniform(0, 2 * np.pi)
+        offset = i * h / 30.0
+        ys = offset + amplitude * np.sin(xs / period * 2 * np.pi + phase)
+        points = np.stack([xs, ys], axis=1).astype(np.int32)
+        color = (rng.randint(60, 140), rng.randint(150, 200), rng.randint(190, 230))
+        cv2.polylines(card, [points], False, color, 1, cv2.LINE_AA)
+    return card
+
+def _put(card, text, x, y, scale, thickness=2, color=(20, 20, 20)):
+    """Escribe texto con la esquina inferior izquierda en fracciones (x, y) de la cédula"""
+    h, w = card.shape[:2]
+    cv2.putText(card, text, (int(x * w), int(y * h)), FONT, scale, color, thickness, cv2.LINE_AA)
+
+def render_front(identity, rng, design=None):
+    """
+    Dibuja el anverso de una cédula (campos en las regiones de app.core.layout)
+
+    Args:
+        identity (dict): Datos de la persona
+        rng (random.Random): Generador aleatorio
+        design (int, optional): Semilla del fondo. Con la misma semilla todas las cédulas
+                                comparten el diseño impreso, como las reales; por defecto
+                                cada una tiene su propio fondo
+
+    Returns:
+        numpy.ndarray: Anverso BGR de tamaño CARD_SIZE
+    """
+    card = _security_background(rng if design is None else random.Random(design), CARD_SIZE)
+    h, w = card.shape[:2]
+
+    _put(card, "REPUBLICA DE COLOMBIA", 0.03, 0.08, 1.6, 3)
+    _put(card, "IDENTIFICACION PERSONAL", 0.03, 0.15, 1.1)
+    _put(card, "CEDULA DE CIUDADANIA", 0.03, 0.22, 1.1)
+
+    documento = f"{int(identity['Documento']):,}".replace(',', '.')
+    _put(card, f"NUMERO {documento}", 0.03, 0.36, 1.5, 3)
+    _put(card, identity['Apellido'], 0.03, 0.49, 1.5, 3)
+    _put(card, "APELLIDOS", 0.03, 0.55, 0.8, 1)
+    _put(card, identity['Nombre'], 0.03, 0.65, 1.5, 3)
+    _put(card, "NOMBRES", 0.03, 0.71, 0.8, 1)
+
+    # Foto (silueta) y firma
+    cv2.rectangle(card, (int(0.70 * w), int(0.22 * h)), (int(0.96 * w), int(0.80 * h)), (170, 170, 170), -1)
+    cv2.circle(card, (int(0.83 * w), int(0.42 * h)), int(0.08 * w), (110, 110, 110), -1)
+    cv2.line(card, (int(0.05 * w), int(0.88 * h)), (int(0.45 * w), int(0.84 * h)), (60, 40, 20), 2, cv2.LINE_AA)
+    _put(card, "FIRMA", 0.03, 0.94, 0.7, 1)
+    return card
+
+def render_back(identity, rng, design=None):
+    """
+    Dibuja el reverso de una cédula (campos en las regiones de app.core.layout)
+
+    Args:
+        identity (dict): Datos de la persona
+        rng (random.Random): Generador aleatorio
+        design (int, optional): Semilla del fondo (ver render_front)
+
+    Returns:
+        numpy.ndarray: Reverso BGR de tamaño CARD_SIZE
+    """
+    card = _security_background(rng if design is None else random.Random(design + 1), CARD_SIZE)
+    h, w = card.shape[:2]
+
+    _put(card, "FECHA DE NACIMIENTO", 0.03, 0.14, 0.9, 2)
+    _put(card, _card_date(identity['Fecha_Nacimiento'], "'"), 0.32, 0.14, 1.3, 3)
+    _put(card, "BOGOTA D.C.", 0.03, 0.24, 1.0, 2)
+    _put(card, "LUGAR DE NACIMIENTO", 0.03, 0.29, 0.7, 1)
+    _put(card, f"1.{rng.randint(50, 90)}", 0.03, 0.38, 1.2, 2)
+    _put(card, f"{rng.choice(['O', 'A', 'B', 'AB'])}{rng.choice('+-')}", 0.30, 0.38, 1.2, 2)
+    _put(card, identity['Genero'], 0.55, 0.38, 1.2, 3)
+    _put(card, "ESTATURA    G.S. RH    SEXO", 0.03, 0.44, 0.7, 1)
+    _put(card, _card_date(identity['Fecha_Expedicion'], "-"), 0.04, 0.54, 1.2, 3)
+    _put(card, "BOGOTA D.C.", 0.36, 0.54, 1.0, 2)
+    _put(card, "FECHA Y LUGAR DE EXPEDICION", 0.03, 0.60, 0.7, 1)
+
+    # Huella, código de barras y, debajo, el código con el número de cédula
+    cv2.rectangle(card, (int(0.70 * w), int(0.06 * h)), (int(0.96 * w), int(0.62 * h)), (200, 200, 200), -1)
+    for r in range(10, int(0.11 * w), 9):
+        cv2.ellipse(card, (int(0.83 * w), int(0.34 * h)), (r, int(r * 1.3)), 0, 0, 360, (90, 90, 90), 2)
+    x = int(0.04 * w)
+    while x < int(0.95 * w):
+        bar = rng.randint(2, 7)
+        cv2.rectangle(card, (x, int(0.66 * h)), (x + bar, int(0.86 * h)), (10, 10, 10), -1)
+        x += bar + rng.randint(2, 6)
+    _put(card, back_code(identity, rng), 0.04, 0.955, 1.0, 2)
+    return card
+
+def back_code(identity, rng):
+    """
+    Código impreso bajo el código de barras del reverso
+
+    Args:
+        identity (dict): Datos de la persona
+        rng (random.Random): Generador aleatorio
+
+    Returns:
+        str: Código con el número de cédula (A-1500100-00223437-M-0012345678-20080101)
+    """
+    day, month, year = identity['Fecha_Expedicion'].split('/')
+    return (f"A-{rng.randint(1000000, 9999999)}-{rng.randint(0, 99999999):08d}-{identity['Genero']}-"
+            f"{int(identity['Documento']):010d}-{year}{month}{day}")
+
+def photograph(card, rng, rotation=0, noise=6.0, blur=True, jpeg_quality=85):
+    """
+    Simula la foto de una cédula: la coloca rotada sobre una mesa y añade ruido
+
+    Args:
+        card (numpy.ndarray): Cédula dibujada
+        rng (random.Random): Generador aleatorio
+        rotation (int): Rotación en grados (0, 90, 180 o 270)
+        noise (float): Desviación típica del ruido gaussiano
+        blur (bool): Si se aplica un desenfoque leve
+        jpeg_quality (int): Calidad JPEG simulada (0 para no comprimir)
+
+    Returns:
+        numpy.ndarray: Foto BGR
+    """
+    rotations = {90: cv2.ROTATE_90_CLOCKWISE, 180: cv2.ROTATE_180, 270: cv2.ROTATE_90_COUNTERCLOCKWISE}
+    if rotation in rotations:
+        card = cv2.rotate(card, rotations[rotation])
+
+    # Mesa más grande que la cédula, con una pequeña inclinación en perspectiva
+    h, w = card.shape[:2]
+    margin = int(0.2 * max(w, h))
+    table = np.full((h + 2 * margin, w + 2 * margin, 3), (rng.randint(40, 90),) * 3, np.uint8)
+    jitter = lambda: rng.uniform(-0.03, 0.03) * min(w, h)
+    src = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    dst = np.float32([
+        [margin + jitter(), margin + jitter()],
+        [margin + w + jitter(), margin + jitter()],
+        [margin + w + jitter(), margin + h + jitter()],
+        [margin + jitter(), margin + h + jitter()],
+    ])
+    matrix = cv2.getPerspectiveTransform(src, dst)
+    photo = cv2.warpPerspective(card, matrix, (table.shape[1], table.shape[0]),
+                                dst=table, borderMode=cv2.BORDER_TRANSPARENT)
+
+    if blur:
+        photo = cv2.GaussianBlur(photo, (3, 3), 0)
+    if noise > 0:
+        gaussian = np.random.default_rng(rng.randint(0, 2 ** 31)).normal(0, noise, photo.shape)
+        photo = np.clip(photo.astype(np.float32) + gaussian, 0, 255).astype(np.uint8)
+    if jpeg_quality:
+        ok, encoded = cv2.imencode('.jpg', photo, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        photo = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+    return photo
+
+def generate_dataset(directory, count=10, seed=0, rotations=(0, 90, 180, 270)):
+    """
+    Genera count personas (anverso y reverso) y su ground_truth.json
+
+    Args:
+        directory (str): Directorio de salida
+        count (int): Número de personas
+        seed (int): Semilla del generador aleatorio
+        rotations (tuple): Rotaciones posibles de cada foto
+
+    Returns:
+        dict: Valores esperados por nombre de archivo, con el lado y la rotación
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    truth = {}
+    for i in range(count):
+        identity = random_identity(rng)
+        for side, render in (('front', render_front), ('reverso', render_back)):
+            rotation = rng.choice(rotations)
+            filename = f"persona_{i:04d}_{side}.jpg"
+            photo = photograph(render(identity, rng), rng, rotation=rotation)
+            cv2.imwrite(os.path.join(directory, filename), photo)
+            truth[filename] = dict(identity, side=side, rotation=rotation)
+
+    with open(os.path.join(directory, 'ground_truth.json'), 'w', encoding='utf-8') as f:
+        json.dump(truth, f, indent=2, ensure_ascii=False)
+    return truth
+
+def main(argv=None):
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Generador de cédulas sintéticas")
+    parser.add_argument("directory", help="Directorio de salida")
+    parser.add_argument("--count", type=int, default=10, help="Número de personas (anverso y reverso)")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla del generador aleatorio")
+    args = parser.parse_args(argv)
+
+    truth = generate_dataset(args.directory, args.count, args.seed)
+    print(f"Se generaron {len(truth)} imágenes en {args.directory}")
+
+if __name__ == "__main__":
+    main()
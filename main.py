@@ -1,108 +1,208 @@
 import os
-import pandas as pd
-from tqdm import tqdm
-from app.core.image_processor import ImageProcessor
-from app.core.DataExtractor import DataExtractor
-from app.utils.helpers import get_image_files, print_execution_info
-from app.config import INPUT_DIR, OUTPUT_DIR
+import csv
+import argparse
+from app import config
 
-def process_single_image(image_path, processor, extractor, save_individual=True):
+# Los módulos de procesamiento (OpenCV, Tesseract...) se importan dentro de cada función,
+# después de config.load(): así --help y --rebuild-csv arrancan sin cargarlos
+
+def parse_args(argv=None):
     """
-    Procesa una sola imagen
-    
+    Interpreta los argumentos de línea de comandos
+
     Args:
-        image_path (str): Ruta a la imagen
-        processor (ImageProcessor): Instancia del procesador de imágenes
-        extractor (DataExtractor): Instancia del extractor de datos
-        save_individual (bool): Si se debe guardar un CSV individual
-        
+        argv (list, optional): Argumentos a interpretar. Por defecto sys.argv
+
     Returns:
-        pd.DataFrame: DataFrame con los datos extraídos
+        argparse.Namespace: Argumentos interpretados
     """
-    filename = os.path.basename(image_path)
-    print(f"Procesando imagen: {filename}")
+    parser = argparse.ArgumentParser(description="ID-Reader - Procesador de Documentos de Identidad")
+    parser.add_argument(
+        "--workers", type=int, default=config.WORKERS,
+        help="Número de procesos para el procesamiento por lotes (0 = todos los núcleos, 1 = en serie)"
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="Vigilar INPUT_DIR y procesar cada imagen nueva en cuanto llega; los resultados se añaden "
+             "sin emparejar a watch_extracted_data.csv (--rebuild-csv genera all_extracted_data.csv "
+             "con cada anverso combinado con su reverso)"
+    )
+    parser.add_argument(
+        "--serve", action="store_true",
+        help="Atender peticiones HTTP locales (POST /process con la imagen) con procesos ya cargados"
+    )
+    parser.add_argument(
+        "--host", default=config.SERVER_HOST,
+        help="Dirección en la que escucha --serve"
+    )
+    parser.add_argument(
+        "--port", type=int, default=config.SERVER_PORT,
+        help="Puerto en el que escucha --serve"
+    )
+    parser.add_argument(
+        "--shared", action="store_true",
+        help="Procesar INPUT_DIR junto con otros nodos que comparten SHARED_WORK_DIR (sin coordinador)"
+    )
+    parser.add_argument(
+        "--merge", action="store_true",
+        help="Combinar en all_extracted_data.csv los resultados de todos los nodos de --shared"
+    )
+    parser.add_argument(
+        "--retry-failed", action="store_true",
+        help="Volver a procesar las imágenes que fallaron en ejecuciones anteriores"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Procesar todas las imágenes aunque ya figuren como completadas en el manifiesto"
+    )
+    parser.add_argument(
+        "--rebuild-csv", action="store_true",
+        help="Reconstruir all_extracted_data.csv a partir del manifiesto, sin repetir el OCR"
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Función principal"""
+    # Configuración explícita: primero el archivo .env, después todo lo que depende de él
+    config.load()
+    args = parse_args(argv)
     
-    # Procesar imagen
-    text, processed_img, annotated_img = processor.process_image(image_path)
+    from app.core.manifest import Manifest
+    from app.utils.helpers import get_image_files, print_execution_info, setup_logging
+    setup_logging()
+    config.ensure_directories()
+    print_execution_info()
     
-    if text is None:
-        print(f"  Error: No se pudo extraer texto de la imagen")
-        return None
-        
-    # Extraer datos del texto
-    extractor.process_text(text, filename=filename)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
     
-    # Convertir a DataFrame
-    df = extractor.to_dataframe()
+    manifest = Manifest(config.MANIFEST_PATH)
     
-    # Guardar en CSV individual si se solicita
-    if save_individual:
-        base_name = os.path.splitext(os.path.basename(image_path))[0]
-        csv_file = f"{base_name}_data.csv"
-        extractor.save_to_csv(csv_file)
+    if args.rebuild_csv:
+        # Reconstruir el CSV combinado a partir del manifiesto, sin repetir el OCR
+        print(f"Reconstruyendo el CSV combinado a partir de {config.MANIFEST_PATH}")
+        save_combined(manifest.items())
+        return
     
-    return df
-
-def main():
-    """Función principal"""
-    print_execution_info()
+    if args.merge:
+        merge_shared()
+        return
     
-    # Crear instancias de las clases principales
-    processor = ImageProcessor(output_dir=OUTPUT_DIR)
-    extractor = DataExtractor(output_dir=OUTPUT_DIR)
+    if args.serve:
+        from app.core.server import run_server
+        run_server(args.host, args.port, workers=workers, output_dir=config.OUTPUT_DIR)
+        return
+    
+    from app.core.batch import run_batch, run_watch, run_shared
+    
+    if args.shared:
+        # Cada nodo guarda sus resultados en SHARED_WORK_DIR; se combinan con --merge
+        run_shared(config.INPUT_DIR, config.SHARED_WORK_DIR, workers=workers, output_dir=config.OUTPUT_DIR,
+                   retry_failed=args.retry_failed)
+        return
+    
+    if args.watch:
+        run_watch(config.INPUT_DIR, workers=workers, output_dir=config.OUTPUT_DIR, manifest=manifest,
+                  retry_failed=args.retry_failed, force=args.force)
+        return
     
     # Obtener lista de imágenes a procesar
-    image_files = get_image_files(INPUT_DIR)
+    image_files = get_image_files(config.INPUT_DIR)
     
     if not image_files:
-        print(f"No se encontraron imágenes en {INPUT_DIR}")
+        print(f"No se encontraron imágenes en {config.INPUT_DIR}")
         return
         
     print(f"\nSe encontraron {len(image_files)} imágenes para procesar\n")
     
-    # Lista para almacenar todos los DataFrames
-    all_data = []
+    # Omitir las imágenes que ya se completaron en una ejecución anterior
+    if args.force:
+        pending = image_files
+    else:
+        pending = [path for path in image_files if not manifest.is_done(path, retry_failed=args.retry_failed)]
+        skipped = len(image_files) - len(pending)
+        if skipped:
+            print(f"Se omiten {skipped} imágenes ya registradas en el manifiesto ({config.MANIFEST_PATH})\n")
     
-    # Procesar cada imagen
-    for image_path in tqdm(image_files, desc="Procesando imágenes"):
-        df = process_single_image(image_path, processor, extractor)
-        if df is not None:
-            all_data.append(df)
+    # Procesar las imágenes (cada proceso trabajador crea su propio procesador y extractor)
+    # y registrar cada una en el manifiesto en cuanto termina
+    succeeded, failed = run_batch(pending, workers=workers, output_dir=config.OUTPUT_DIR,
+                                  on_result=manifest.record_result)
     
-    # Combinar todos los DataFrames
-    if all_data:
-        combined_df = pd.concat(all_data, ignore_index=True)
-        
-        # Combinar datos de anverso y reverso de la misma cédula
-        # Toma los valores del anverso para Nombre, Apellido y Documento
-        # y los valores del reverso para el resto
-        result_df = combined_df.copy()
-        
-        # Si tenemos datos de la misma persona (anverso y reverso)
-        if len(combined_df) > 1 and combined_df.iloc[0]['Documento'] == combined_df.iloc[1]['Documento']:
-            # Crear un diccionario con los mejores valores
-            best_data = {}
-            for column in combined_df.columns:
-                # Para cada columna, tomar el primer valor no nulo
-                values = combined_df[column].dropna()
-                if len(values) > 0:
-                    best_data[column] = values.iloc[0]
-                else:
-                    best_data[column] = None
-            
-            # Crear un nuevo DataFrame con los mejores valores
-            result_df = pd.DataFrame([best_data])
-        
-        # Guardar el resultado final
-        combined_csv = os.path.join(OUTPUT_DIR, 'all_extracted_data.csv')
-        result_df.to_csv(combined_csv, index=False)
-        print(f"\nDatos combinados guardados en: {combined_csv}")
-        
-        # Mostrar resumen
-        print("\nResumen de datos extraídos:")
-        print(result_df)
-    else:
+    if failed:
+        print(f"\n{failed} de {succeeded + failed} imágenes no se pudieron procesar "
+              f"(se pueden reintentar con --retry-failed)")
+    
+    # El CSV combinado incluye también las imágenes completadas en ejecuciones anteriores
+    save_combined(manifest.items(image_files))
+
+def merge_shared():
+    """Combina los resultados que escribieron los nodos de --shared en SHARED_WORK_DIR"""
+    from app.core.work_queue import ResultShards
+    from app.utils.helpers import get_image_files
+    
+    shards = ResultShards(config.INPUT_DIR, config.SHARED_WORK_DIR)
+    ok, failed = shards.counts()
+    print(f"Combinando los resultados de {len(shards.nodes)} nodos en {config.SHARED_WORK_DIR}")
+    for node, count in sorted(shards.nodes.items()):
+        print(f"  {node}: {count} resultados")
+    print(f"Imágenes correctas: {ok}, con error: {failed}")
+    
+    image_files = get_image_files(config.INPUT_DIR)
+    missing = shards.missing(image_files)
+    if missing:
+        print(f"Imágenes sin resultado todavía: {len(missing)} (siguen en proceso o falta algún nodo)")
+        for path in missing[:10]:
+            print(f"    {os.path.basename(path)}")
+        if len(missing) > 10:
+            print("    ...")
+    
+    save_combined(shards.items(image_files))
+
+def save_combined(items):
+    """
+    Empareja anversos y reversos y guarda el resultado en all_extracted_data.csv (o .parquet)
+    
+    Las filas se escriben a medida que se emparejan, sin cargar el lote en memoria.
+    Las mitades sin pareja se guardan tal cual y se listan en unmatched_halves.csv.
+    
+    Args:
+        items (iterable): Pares (ruta de la imagen, fila de datos extraídos) en orden de entrada
+    """
+    from app.core.pairing import FrontBackPairer
+    from app.core.results import ExtractedRecord, open_sink
+    
+    pairer = FrontBackPairer()
+    
+    # Guardar el resultado final
+    combined_path = os.path.join(config.OUTPUT_DIR, 'all_extracted_data')
+    with open_sink(combined_path, config.RESULTS_FORMAT, row_group_size=config.RESULTS_ROW_GROUP_SIZE) as sink:
+        for row in pairer.pair(items):
+            sink.write(ExtractedRecord.from_dict(row))
+    
+    if sink.count == 0:
         print("\nNo se pudo extraer información de ninguna imagen.")
+        return
+    print(f"\nDatos combinados guardados en: {sink.path}")
+    
+    # Mostrar resumen
+    print(f"\nResumen: {sink.count} filas de datos extraídos")
+    print(f"  Cédulas con anverso y reverso combinados: {pairer.pairs}")
+    if pairer.unknown:
+        print(f"  Imágenes sin lado reconocible: {pairer.unknown}")
+    
+    unmatched_csv = os.path.join(config.OUTPUT_DIR, 'unmatched_halves.csv')
+    if pairer.unmatched:
+        with open(unmatched_csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Imagen', 'Lado'])
+            writer.writerows(pairer.unmatched)
+        print(f"  Mitades sin pareja: {len(pairer.unmatched)} (ver {unmatched_csv})")
+        for path, side in pairer.unmatched[:10]:
+            print(f"    {os.path.basename(path)} ({side})")
+        if len(pairer.unmatched) > 10:
+            print("    ...")
+    elif os.path.exists(unmatched_csv):
+        os.remove(unmatched_csv)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file